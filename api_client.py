@@ -4,23 +4,419 @@ This module handles communication with the external API
 """
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+import email.utils
+import gzip
+import hashlib
 import json
+import math
 import os
-from typing import Dict, List, Optional
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import bytes_uploaded, files_uploaded, request_retries, request_seconds
+from .response_cache import hash_api_key
+from .upload_io import inflight_budget, open_window, upload_bandwidth
+
+
+ASSET_TYPES = {
+    ".png": ("image", "image/png"),
+    ".jpg": ("image", "image/jpeg"),
+    ".jpeg": ("image", "image/jpeg"),
+    ".svg": ("image", "image/svg+xml"),
+    ".gif": ("image", "image/gif"),
+    ".webp": ("image", "image/webp"),
+    ".bmp": ("image", "image/bmp"),
+    ".mp4": ("video", "video/mp4"),
+    ".mov": ("video", "video/quicktime"),
+    ".avi": ("video", "video/x-msvideo"),
+    ".mkv": ("video", "video/x-matroska"),
+    ".txt": ("text", "text/plain"),
+    ".json": ("text", "application/json"),
+    ".mp3": ("audio", "audio/mpeg"),
+    ".wav": ("audio", "audio/wav"),
+    ".flac": ("audio", "audio/flac"),
+    ".obj": ("3D", "model/obj"),
+    ".fbx": ("3D", "model/fbx"),
+    ".gltf": ("3D", "model/gltf+json"),
+    ".glb": ("3D", "model/gltf-binary"),
+}
+
+
+def get_asset_type(file_path: str):
+    """
+    Get the asset type and content type for a file name
+
+    Returns:
+        Tuple of (asset type, MIME type); unknown extensions are sent as
+        images with application/octet-stream
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    return ASSET_TYPES.get(file_ext, ("image", "application/octet-stream"))
+
+
+def retry_delay(attempt: int, retry_after: Optional[str], backoff_base: float, backoff_max: float) -> float:
+    """
+    Get the wait before the next retry: Retry-After if the server sent one,
+    otherwise full-jitter exponential backoff
+
+    Args:
+        attempt: Number of retries so far
+        retry_after: Retry-After header of the failed response, if any
+        backoff_base: First backoff in seconds, doubled on every retry
+        backoff_max: Longest wait in seconds, also caps Retry-After
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), backoff_max)
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(retry_after).timestamp()
+                return min(max(0.0, retry_at - time.time()), backoff_max)
+            except (TypeError, ValueError):
+                pass
+
+    return random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+
+
+def build_resume_key(
+    file_path: str, project_id: str, folder_id: str = None, api_key_hash: str = ""
+) -> str:
+    """
+    Identify a file version, upload target and API key for saved multipart state
+    """
+    stat_info = os.stat(file_path)
+    identity = [
+        os.path.realpath(file_path),
+        stat_info.st_size,
+        stat_info.st_mtime_ns,
+        project_id,
+        folder_id or project_id,
+        api_key_hash,
+    ]
+    return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
+
+
+def build_json_body(
+    payload: Dict, metadata, transfer: Dict, compress: bool = False
+):
+    """
+    Encode a JSON request body, splicing in pre-serialized metadata
+
+    Args:
+        payload: JSON payload without metadata
+        metadata: PreparedMetadata to send as "metadata", or None to omit it
+        transfer: Byte counters updated with the size of the body
+        compress: gzip-compress the body
+
+    Returns:
+        Tuple of (body bytes, headers describing the body)
+    """
+    body = json.dumps(payload, separators=(",", ":"))
+    if metadata is not None:
+        body = f'{body[:-1]}{"," if payload else ""}"metadata":{metadata.json}}}'
+        transfer["metadata_bytes"] += metadata.size
+    body = body.encode("utf-8")
+
+    headers = {"Content-Type": "application/json"}
+    transfer["json_bytes_uncompressed"] += len(body)
+    if compress:
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    transfer["json_bytes"] += len(body)
+    return body, headers
+
+
+def plan_direct_uploads(
+    file_paths: List[str],
+    file_data: Optional[Dict[str, bytes]],
+    threshold: int,
+    max_files: int,
+    max_bytes: int,
+) -> Tuple[List[List[int]], List[int]]:
+    """
+    Split a batch into groups of small files sent in one direct request each
+
+    Args:
+        file_paths: Files of the batch
+        file_data: Optional in-memory content by file path
+        threshold: Files up to this many bytes are grouped; 0 groups none
+        max_files: Maximum files per group
+        max_bytes: Maximum content bytes per group
+
+    Returns:
+        Tuple of (groups as lists of indices into file_paths, indices of the
+        files to upload with multipart uploads)
+    """
+    groups = []
+    multipart = []
+    group = []
+    group_bytes = 0
+    for index, file_path in enumerate(file_paths):
+        data = (file_data or {}).get(file_path)
+        try:
+            size = len(data) if data is not None else os.path.getsize(file_path)
+        except OSError:
+            size = None
+        if not threshold or size is None or size > threshold:
+            multipart.append(index)
+            continue
+
+        if group and (len(group) >= max_files or group_bytes + size > max_bytes):
+            groups.append(group)
+            group = []
+            group_bytes = 0
+        group.append(index)
+        group_bytes += size
+    if group:
+        groups.append(group)
+    return groups, multipart
+
+
+def build_direct_body(
+    files: List[Tuple[str, bytes]], payload: Dict, metadata, transfer: Dict
+):
+    """
+    Encode a direct upload request as multipart/form-data
+
+    The "payload" field holds the JSON payload (with metadata spliced in),
+    followed by one field per file named like its "field" entry in the payload.
+
+    Args:
+        files: List of (file path, content) tuples, in payload order
+        payload: JSON payload without metadata
+        metadata: PreparedMetadata to send as "metadata", or None to omit it
+        transfer: Byte counters updated with the size of the JSON payload
+
+    Returns:
+        Tuple of (body bytes, headers describing the body)
+    """
+    boundary = uuid.uuid4().hex
+    payload_json, _ = build_json_body(payload, metadata, transfer)
+
+    chunks = [
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="payload"\r\n'
+        "Content-Type: application/json\r\n\r\n".encode("utf-8"),
+        payload_json,
+        b"\r\n",
+    ]
+    for entry, (file_path, content) in zip(payload["files"], files):
+        chunks.append(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{entry["field"]}"; '
+            f'filename="{os.path.basename(file_path)}"\r\n'
+            f"Content-Type: {entry['contentType']}\r\n\r\n".encode("utf-8")
+        )
+        chunks.append(content)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode("utf-8"))
+
+    return b"".join(chunks), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def build_direct_payload(
+    files: List[Tuple[str, bytes]],
+    project_id: str,
+    folder_id: str = None,
+    organization_id: str = None,
+) -> Dict:
+    """
+    Describe the files of a direct upload request
+
+    Returns:
+        JSON payload with the upload target and one entry per file
+    """
+    entries = []
+    for number, (file_path, content) in enumerate(files):
+        filename = os.path.basename(file_path)
+        asset_type, content_type = get_asset_type(file_path)
+        entries.append(
+            {
+                "field": f"file{number}",
+                "fileName": filename,
+                "fileSize": len(content),
+                "contentType": content_type,
+                "type": asset_type,
+                "title": f"comfyui_{filename}",
+            }
+        )
+    return {
+        "organizationId": organization_id,
+        "projectId": project_id,
+        "platform": "comfyui",
+        "folderId": folder_id or project_id,
+        "files": entries,
+    }
+
+
+class ChunkSizePolicy:
+    """Chooses multipart part sizes and part timeouts from file size and measured throughput"""
+
+    def __init__(
+        self,
+        min_part_size: int = 5 * 1024 * 1024,
+        max_part_size: int = 256 * 1024 * 1024,
+        max_parts: int = 10000,
+        target_part_seconds: float = 10.0,
+    ):
+        """
+        Initialize the policy
+
+        Args:
+            min_part_size: Smallest part the backend accepts (except the last part)
+            max_part_size: Largest part to send (bounds memory per part)
+            max_parts: Most parts the backend accepts per upload
+            target_part_seconds: How long one part should take at the measured throughput
+        """
+        self.min_part_size = min_part_size
+        self.max_part_size = max_part_size
+        self.max_parts = max_parts
+        self.target_part_seconds = target_part_seconds
+        self._throughput = None
+        self._lock = threading.Lock()
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Recent per-connection throughput in bytes per second, or None before the first part"""
+        return self._throughput
+
+    def record(self, nbytes: int, seconds: float):
+        """
+        Record a finished part transfer (exponentially weighted moving average)
+        """
+        if nbytes <= 0 or seconds <= 0:
+            return
+        sample = nbytes / seconds
+        with self._lock:
+            if self._throughput is None:
+                self._throughput = sample
+            else:
+                self._throughput = 0.7 * self._throughput + 0.3 * sample
+
+    def part_size(self, file_size: int, default_part_size: int, concurrency: int = 1) -> int:
+        """
+        Choose the part size for a file
+
+        Files up to min_part_size go in a single part. Larger files get parts
+        that take about target_part_seconds at the measured throughput
+        (default_part_size before anything was measured), split so all
+        concurrent streams get work, within the min/max part size and
+        max_parts limits.
+
+        Returns:
+            Part size in bytes
+        """
+        if file_size <= self.min_part_size:
+            return max(file_size, 1)
+
+        size = default_part_size
+        if self._throughput:
+            size = int(self._throughput * self.target_part_seconds)
+        size = min(size, math.ceil(file_size / max(1, concurrency)))
+        size = max(size, math.ceil(file_size / self.max_parts), self.min_part_size)
+        size = min(size, self.max_part_size)
+
+        # Round up to whole MiB, which keeps part boundaries page aligned
+        mib = 1024 * 1024
+        return math.ceil(size / mib) * mib
+
+    def part_timeout(self, part_size: int, base_timeout: float) -> float:
+        """
+        Choose the read timeout for a part: three times its expected transfer
+        time at the measured throughput, but never below twice base_timeout
+        (the timeout used before anything was measured)
+        """
+        if not self._throughput:
+            return base_timeout * 2
+        return max(base_timeout * 2, 3 * part_size / self._throughput)
+
+
+class PreparedMetadata:
+    """Upload metadata serialized once and shared by every file of a batch
+
+    The JSON text and its SHA-256 are computed once. In reference mode the
+    first create request of a batch carries the full metadata and every other
+    request only refers to it by metadataHash.
+    """
+
+    def __init__(self, metadata: Optional[Dict]):
+        """
+        Serialize the metadata
+
+        Args:
+            metadata: Metadata dictionary (ComfyUI workflow JSON) or None,
+                which is sent as null
+        """
+        self.present = metadata is not None
+        self.json = json.dumps(metadata, separators=(",", ":"))
+        self.size = len(self.json.encode("utf-8"))
+        self.sha256 = hashlib.sha256(self.json.encode("utf-8")).hexdigest()
+        self._sending = False
+        self._sent = False
+        self._condition = threading.Condition()
+
+    def begin_inline(self) -> bool:
+        """
+        Decide whether the caller has to send the full metadata
+
+        Waits while another request is sending it.
+
+        Returns:
+            True if the caller must inline the metadata and then call end_inline
+        """
+        with self._condition:
+            while self._sending:
+                self._condition.wait()
+            if self._sent:
+                return False
+            self._sending = True
+            return True
+
+    def end_inline(self, sent: bool):
+        with self._condition:
+            self._sending = False
+            self._sent = self._sent or sent
+            self._condition.notify_all()
 
 
 class AssetManagerAPIClient:
     """Client for communicating with the Asset Manager API"""
 
-    def __init__(self, api_key: str, base_url: str = None):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = None,
+        part_concurrency: int = 4,
+        file_concurrency: int = 4,
+        pool_size: int = None,
+        resume_store=None,
+        max_resume_attempts: int = 3,
+        resume_max_age: float = 24 * 60 * 60,
+    ):
         """
         Initialize the API client
 
         Args:
             api_key: API authentication key
             base_url: Base URL for the API (optional, can be set via config)
+            part_concurrency: Number of parts of one file uploaded at the same time
+            file_concurrency: Default number of files a batch uploads at the same time
+            pool_size: Keep-alive connections per host (defaults to enough for
+                file_concurrency x part_concurrency requests)
+            resume_store: Optional store for multipart state (see UploadLedger)
+                that lets failed or interrupted uploads resume
+            max_resume_attempts: Failed attempts before a saved upload is aborted
+            resume_max_age: Seconds before saved uploads are aborted
         """
         self.api_key = api_key
+        self.api_key_hash = hash_api_key(api_key)
         self.base_url = base_url or "https://api.folders.nodehaus.io/api"
         self.upload_base_url = "https://api.upload.nodehaus.io"
         self.headers = {
@@ -29,7 +425,34 @@ class AssetManagerAPIClient:
             "x-api-key": api_key,
         }
         self.timeout = 30
-        self.chunk_size = 10 * 1024 * 1024  #10MB chunks
+        self.chunk_size = 10 * 1024 * 1024  #10MB chunks until throughput is measured
+        self.chunk_policy = ChunkSizePolicy()
+        self.part_concurrency = max(1, part_concurrency)
+        self.file_concurrency = max(1, file_concurrency)
+        self.pool_size = pool_size or self.file_concurrency * self.part_concurrency + 2
+        self.resume_store = resume_store
+        self.max_resume_attempts = max(1, max_resume_attempts)
+        self.resume_max_age = resume_max_age
+        self.max_retries = 4  # retries per create/part/complete request
+        self.backoff_base = 0.5  # seconds, doubled on every retry
+        self.backoff_max = 30.0  # seconds, also caps Retry-After
+        self.compress_requests = False  # gzip JSON bodies (backend must accept Content-Encoding)
+        self.metadata_by_reference = False  # send metadata once per batch, then only metadataHash
+        # Files up to this many bytes skip create/part/complete and are sent in
+        # one request to /api/upload/direct (0 disables, backend must support it)
+        self.direct_upload_threshold = 0
+        self.direct_upload_max_files = 16  # small files grouped into one direct request
+        self.direct_upload_max_bytes = 8 * 1024 * 1024  # content bytes per direct request
+        self.direct_upload_supported = True  # cleared once the backend rejects the endpoint
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        """Close pooled connections held by this client"""
+        self.session.close()
 
     def get_organizations(self) -> Dict:
         """
@@ -41,7 +464,7 @@ class AssetManagerAPIClient:
         try:
             url = f"{self.base_url}/organizations"
 
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.session.get(url, headers=self.headers, timeout=self.timeout)
 
             if response.status_code == 200:
                 data = response.json()
@@ -83,7 +506,7 @@ class AssetManagerAPIClient:
             if organization_id:
                 params["organization_id"] = organization_id
 
-            response = requests.get(
+            response = self.session.get(
                 url, headers=self.headers, params=params, timeout=self.timeout
             )
 
@@ -113,7 +536,9 @@ class AssetManagerAPIClient:
         project_id: str,
         folder_id: str = None,
         organization_id: str = None,
-        metadata: Optional[Dict] = None,
+        metadata=None,
+        data: bytes = None,
+        progress=None,
     ) -> Dict:
         """
         Upload a single asset using multipart upload
@@ -123,49 +548,50 @@ class AssetManagerAPIClient:
             project_id: Target project ID
             folder_id: Target folder ID (defaults to project_id if not provided)
             organization_id: Organization ID
-            metadata: Optional metadata dictionary (ComfyUI workflow JSON)
+            metadata: Optional metadata dictionary (ComfyUI workflow JSON) or
+                PreparedMetadata shared by a batch
+            data: Optional in-memory file content. file_path then only names
+                the asset, and the upload cannot be resumed.
+            progress: Optional UploadProgress receiving part and byte progress,
+                keyed by file_path
 
         Returns:
             Dictionary containing upload status and result
         """
+        if not isinstance(metadata, PreparedMetadata):
+            metadata = PreparedMetadata(metadata)
+        transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+
         upload_id = None
         key = None
+        resume_key = None
+        resumed = False
 
         try:
-            file_size = os.path.getsize(file_path)
+            file_size = len(data) if data is not None else os.path.getsize(file_path)
             filename = os.path.basename(file_path)
-            file_ext = os.path.splitext(file_path)[1].lower()
-
-            type_mapping = {
-                ".png": ("image", "image/png"),
-                ".jpg": ("image", "image/jpeg"),
-                ".jpeg": ("image", "image/jpeg"),
-                ".svg": ("image", "image/svg+xml"),
-                ".gif": ("image", "image/gif"),
-                ".webp": ("image", "image/webp"),
-                ".bmp": ("image", "image/bmp"),
-                ".mp4": ("video", "video/mp4"),
-                ".mov": ("video", "video/quicktime"),
-                ".avi": ("video", "video/x-msvideo"),
-                ".mkv": ("video", "video/x-matroska"),
-                ".txt": ("text", "text/plain"),
-                ".json": ("text", "application/json"),
-                ".mp3": ("audio", "audio/mpeg"),
-                ".wav": ("audio", "audio/wav"),
-                ".flac": ("audio", "audio/flac"),
-                ".obj": ("3D", "model/obj"),
-                ".fbx": ("3D", "model/fbx"),
-                ".gltf": ("3D", "model/gltf+json"),
-                ".glb": ("3D", "model/gltf-binary"),
-            }
-            asset_type, content_type = type_mapping.get(
-                file_ext, ("image", "application/octet-stream")
+            asset_type, content_type = get_asset_type(file_path)
+
+            completed_parts = {}
+            chunk_size = self.chunk_policy.part_size(
+                file_size, self.chunk_size, self.part_concurrency
             )
+            if self.resume_store is not None and data is None:
+                resume_key = self._resume_key(file_path, project_id, folder_id)
+                state = self.resume_store.load_multipart(resume_key)
+                if state and time.time() - state["created_at"] > self.resume_max_age:
+                    self._abort_upload(state["upload_id"], state["key"])
+                    self.resume_store.delete_multipart(resume_key)
+                    state = None
+                if state:
+                    upload_id = state["upload_id"]
+                    key = state["key"]
+                    chunk_size = state["chunk_size"]
+                    completed_parts = state["parts"]
+                    resumed = True
 
-            create_response = requests.post(
-                f"{self.upload_base_url}/api/upload/create",
-                headers={"Content-Type": "application/json", "x-api-key": self.api_key},
-                json={
+            if upload_id is None:
+                create_payload = {
                     "organizationId": organization_id,
                     "projectId": project_id,
                     "platform": "comfyui",
@@ -175,89 +601,521 @@ class AssetManagerAPIClient:
                     "type": asset_type,
                     "title": f"comfyui_{filename}",
                     "folderId": folder_id or project_id,
-                    "metadata": metadata,
-                },
-                timeout=self.timeout,
-            )
-            create_response.raise_for_status()
-            create_result = create_response.json()
-            upload_id = create_result["uploadId"]
-            key = create_result["key"]
-
-            parts = []
-            with open(file_path, "rb") as f:
-                part_number = 1
-                while True:
-                    chunk = f.read(self.chunk_size)
-                    if not chunk:
-                        break
-
-                    part_response = requests.post(
-                        f"{self.upload_base_url}/api/upload/part",
-                        headers={
-                            "x-api-key": self.api_key,
-                            "X-Upload-Id": upload_id,
-                            "X-Part-Number": str(part_number),
-                            "X-Key": key,
-                        },
-                        data=chunk,
-                        timeout=self.timeout * 2,  #double timeout for large chunks
+                }
+                if self.metadata_by_reference:
+                    create_payload["metadataHash"] = metadata.sha256
+                    inline = metadata.begin_inline()
+                    sent = False
+                    try:
+                        create_response = self._post_json(
+                            f"{self.upload_base_url}/api/upload/create",
+                            create_payload,
+                            metadata if inline else None,
+                            transfer,
+                        )
+                        sent = True
+                    finally:
+                        if inline:
+                            metadata.end_inline(sent)
+                else:
+                    create_response = self._post_json(
+                        f"{self.upload_base_url}/api/upload/create",
+                        create_payload,
+                        metadata,
+                        transfer,
                     )
-                    part_response.raise_for_status()
-                    part_result = part_response.json()
-                    parts.append(
-                        {
-                            "partNumber": part_result["partNumber"],
-                            "etag": part_result["etag"],
-                        }
+                create_result = create_response.json()
+                upload_id = create_result["uploadId"]
+                key = create_result["key"]
+
+                if resume_key:
+                    self.resume_store.save_multipart(
+                        resume_key, upload_id, key, chunk_size, self.api_key_hash
                     )
-                    part_number += 1
 
-            complete_response = requests.post(
+            on_part = None
+            if resume_key:
+                on_part = lambda part: self.resume_store.add_part(
+                    resume_key, part["partNumber"], part["etag"]
+                )
+
+            parts = self._upload_parts(
+                file_path if data is None else data,
+                file_size,
+                upload_id,
+                key,
+                chunk_size,
+                completed_parts,
+                on_part,
+                progress,
+                file_path,
+            )
+
+            complete_payload = {
+                "uploadId": upload_id,
+                "key": key,
+                "parts": parts,
+                "type": asset_type,
+                "title": f"comfyui_{filename}",
+                "folderId": folder_id or project_id,
+                "organizationId": organization_id,
+                "projectId": project_id,
+                "platform": "comfyui",
+            }
+            complete_metadata = None
+            if self.metadata_by_reference:
+                complete_payload["metadataHash"] = metadata.sha256
+            else:
+                # complete has always sent {} rather than null without metadata
+                complete_metadata = metadata if metadata.present else PreparedMetadata({})
+            complete_response = self._post_json(
                 f"{self.upload_base_url}/api/upload/complete",
-                headers={"Content-Type": "application/json", "x-api-key": self.api_key},
-                json={
-                    "uploadId": upload_id,
-                    "key": key,
-                    "parts": parts,
-                    "type": asset_type,
-                    "title": f"comfyui_{filename}",
-                    "folderId": folder_id or project_id,
-                    "organizationId": organization_id,
-                    "projectId": project_id,
-                    "platform": "comfyui",
-                    "metadata": metadata if metadata else {},
-                },
-                timeout=self.timeout,
+                complete_payload,
+                complete_metadata,
+                transfer,
             )
-            complete_response.raise_for_status()
             complete_result = complete_response.json()
 
+            if resume_key:
+                self.resume_store.delete_multipart(resume_key)
+
             return {
                 "status": "success",
                 "message": f"Successfully uploaded {filename}",
                 "data": complete_result,
+                "route": "multipart",
+                "resumed_parts": len(completed_parts),
+                "chunk_size": chunk_size,
+                "throughput": self.chunk_policy.throughput,
+                "transfer": transfer,
             }
 
         except Exception as e:
+            if resumed and _is_missing_upload(e):
+                # The backend no longer knows the saved upload, start over
+                self.resume_store.delete_multipart(resume_key)
+                return self.upload_asset(
+                    file_path,
+                    project_id,
+                    folder_id,
+                    organization_id,
+                    metadata,
+                    progress=progress,
+                )
+
+            message = f"Upload failed: {str(e)}"
+            retryable = is_retryable_error(e)
             if upload_id and key:
-                try:
-                    requests.post(
-                        f"{self.upload_base_url}/api/upload/abort",
-                        headers={
-                            "Content-Type": "application/json",
-                            "x-api-key": self.api_key,
-                        },
-                        json={"uploadId": upload_id, "key": key},
-                        timeout=self.timeout,
-                    )
-                except Exception as abort_error:
-                    pass
+                # Fatal errors (401, other 4xx) would fail again, so only
+                # transient failures keep the upload for resuming
+                if resume_key and retryable and self._keep_for_resume(resume_key):
+                    message += " (progress saved, retry to resume)"
+                else:
+                    self._abort_upload(upload_id, key)
+                    if resume_key:
+                        self.resume_store.delete_multipart(resume_key)
 
             import traceback
 
             traceback.print_exc()
-            return {"status": "error", "message": f"Upload failed: {str(e)}"}
+            return {
+                "status": "error",
+                "message": message,
+                "retryable": retryable,
+                "transfer": transfer,
+            }
+
+    def _post_json(
+        self,
+        url: str,
+        payload: Dict,
+        metadata: Optional[PreparedMetadata],
+        transfer: Dict,
+    ):
+        """
+        POST a JSON body, splicing in pre-serialized metadata
+
+        The metadata JSON is inserted as text, so it is not serialized again
+        for every request. With compress_requests the body is gzip-compressed.
+
+        Args:
+            url: Request URL
+            payload: JSON payload without metadata
+            metadata: PreparedMetadata to send as "metadata", or None to omit it
+            transfer: Byte counters updated with the size of the body
+
+        Returns:
+            Response with a successful status code
+        """
+        body, headers = build_json_body(payload, metadata, transfer, self.compress_requests)
+        headers["x-api-key"] = self.api_key
+        return self._request("POST", url, headers=headers, data=body, timeout=self.timeout)
+
+    def _upload_direct(
+        self,
+        files: List[Tuple[str, bytes]],
+        project_id: str,
+        folder_id: str = None,
+        organization_id: str = None,
+        metadata: PreparedMetadata = None,
+        progress=None,
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Upload small files in a single request to /api/upload/direct
+
+        The request is not idempotent: when its response is lost the files may
+        be stored already, so it is sent once without retries.
+
+        Args:
+            files: List of (file path, content) tuples
+            project_id: Target project ID
+            folder_id: Target folder ID (defaults to project_id if not provided)
+            organization_id: Organization ID
+            metadata: PreparedMetadata shared by the batch
+            progress: Optional UploadProgress, keyed by file path
+
+        Returns:
+            Tuple of (one result dictionary per file, JSON/metadata byte counts)
+
+        Raises:
+            Exception: If the request itself failed
+        """
+        transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+        route = "single" if len(files) == 1 else "batch"
+        total_bytes = sum(len(content) for _, content in files)
+        payload = build_direct_payload(files, project_id, folder_id, organization_id)
+
+        if progress is not None:
+            for file_path, content in files:
+                progress.file_started(file_path, len(content), 1)
+
+        inline = True
+        if self.metadata_by_reference:
+            payload["metadataHash"] = metadata.sha256
+            inline = metadata.begin_inline()
+        sent = False
+        try:
+            body, headers = build_direct_body(
+                files, payload, metadata if inline else None, transfer
+            )
+            headers["x-api-key"] = self.api_key
+            # Sent block by block through the bandwidth limiter, like parts
+            with inflight_budget.reserve(total_bytes), open_window(
+                body, 0, len(body), None, upload_bandwidth.consume
+            ) as window:
+                response = self._request(
+                    "POST",
+                    f"{self.upload_base_url}/api/upload/direct",
+                    headers=headers,
+                    data=window,
+                    timeout=(
+                        self.timeout,
+                        self.chunk_policy.part_timeout(total_bytes, self.timeout),
+                    ),
+                    max_retries=0,
+                )
+            sent = True
+        finally:
+            if self.metadata_by_reference and inline:
+                metadata.end_inline(sent)
+
+        file_results = []
+        results = response.json().get("results") or []
+        for number, (file_path, content) in enumerate(files):
+            result = results[number] if number < len(results) else {}
+            if result.get("success"):
+                bytes_uploaded.inc(len(content))
+                if progress is not None:
+                    progress.bytes_sent(file_path, len(content))
+                    progress.part_done(file_path)
+                file_results.append(
+                    {
+                        "status": "success",
+                        "message": f"Successfully uploaded {os.path.basename(file_path)}",
+                        "data": result,
+                        "route": route,
+                    }
+                )
+            else:
+                file_results.append(
+                    {
+                        "status": "error",
+                        "message": f"Upload failed: {result.get('error', 'No result returned')}",
+                        "route": route,
+                    }
+                )
+        return file_results, transfer
+
+    def _request(self, method: str, url: str, stop_event=None, max_retries: int = None, **kwargs):
+        """
+        Send a request, retrying transient failures with jittered exponential backoff
+
+        Timeouts, connection errors, 408, 429 and 5xx responses are retried up
+        to max_retries times, honoring Retry-After. Other errors raise at once.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            stop_event: Optional event that ends waiting for a retry early
+            max_retries: Retries for this request (defaults to self.max_retries;
+                0 for requests that are not idempotent)
+            **kwargs: Passed to requests.Session.request
+
+        Every attempt is recorded in the request latency histogram, labelled
+        with the last URL segment as stage (create, part, complete).
+
+        Returns:
+            Response with a successful status code. Its transfer_seconds is the
+            duration of the successful attempt alone, without retry backoff and
+            without time the body spent waiting for the bandwidth limiter.
+        """
+        stage = url.rstrip("/").rsplit("/", 1)[-1]
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            body = kwargs.get("data")
+            if hasattr(body, "seek"):
+                # Rewind streamed bodies before every attempt
+                body.seek(0)
+            attempt_started = time.monotonic()
+            throttled_before = getattr(body, "throttled_seconds", 0.0)
+            with request_seconds.time(stage=stage, outcome="error") as labels:
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                    response.raise_for_status()
+                    labels["outcome"] = "success"
+                    response.transfer_seconds = (
+                        time.monotonic()
+                        - attempt_started
+                        - (getattr(body, "throttled_seconds", 0.0) - throttled_before)
+                    )
+                    return response
+                except Exception as e:
+                    if attempt >= max_retries or not is_retryable_error(e):
+                        raise
+                    delay = self._retry_delay(attempt, getattr(e, "response", None))
+
+            attempt += 1
+            request_retries.inc(stage=stage)
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    raise RuntimeError("Retry stopped after another part failed")
+            else:
+                time.sleep(delay)
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        return retry_delay(attempt, retry_after, self.backoff_base, self.backoff_max)
+
+    def _resume_key(self, file_path: str, project_id: str, folder_id: str = None) -> str:
+        return build_resume_key(file_path, project_id, folder_id, self.api_key_hash)
+
+    def _keep_for_resume(self, resume_key: str) -> bool:
+        """
+        Record a failed attempt and decide whether to keep the upload for resuming
+
+        Returns:
+            True while fewer than max_resume_attempts attempts have failed
+        """
+        attempts = self.resume_store.record_failure(resume_key)
+        return attempts < self.max_resume_attempts
+
+    def _abort_upload(self, upload_id: str, key: str):
+        try:
+            with request_seconds.time(stage="abort", outcome="error") as labels:
+                response = self.session.post(
+                    f"{self.upload_base_url}/api/upload/abort",
+                    headers={
+                        "Content-Type": "application/json",
+                        "x-api-key": self.api_key,
+                    },
+                    json={"uploadId": upload_id, "key": key},
+                    timeout=self.timeout,
+                )
+                if response.ok:
+                    labels["outcome"] = "success"
+        except Exception as abort_error:
+            pass
+
+    def abort_expired_uploads(self) -> int:
+        """
+        Abort saved multipart uploads of this API key older than resume_max_age
+
+        Returns:
+            Number of aborted uploads
+        """
+        if self.resume_store is None:
+            return 0
+
+        expired = self.resume_store.expired_multipart(
+            self.resume_max_age, self.api_key_hash
+        )
+        for state in expired:
+            self._abort_upload(state["upload_id"], state["key"])
+            self.resume_store.delete_multipart(state["resume_key"])
+        return len(expired)
+
+    def _upload_part(
+        self,
+        source,
+        file_size: int,
+        part_number: int,
+        upload_id: str,
+        key: str,
+        chunk_size: int,
+        stop_event,
+        on_part=None,
+        on_read=None,
+    ) -> Dict:
+        """
+        Upload a single part of a multipart upload
+
+        The part is streamed from a memory-mapped window of the file (or a
+        slice of in-memory content), its bytes count against the process-wide
+        in-flight budget while it is sent, and reads are paced by the shared
+        bandwidth limiter.
+
+        Args:
+            source: File path, or bytes-like object with the file content
+            on_part: Optional callback invoked with the uploaded part
+            on_read: Optional callback(nbytes) for part bytes as they are sent
+
+        Returns:
+            Dictionary with partNumber and etag of the uploaded part
+        """
+        if stop_event.is_set():
+            raise RuntimeError(f"Part {part_number} skipped after another part failed")
+
+        offset = (part_number - 1) * chunk_size
+        length = min(chunk_size, file_size - offset)
+
+        with inflight_budget.reserve(length, stop_event), open_window(
+            source, offset, length, on_read, upload_bandwidth.consume
+        ) as window:
+            part_response = self._request(
+                "POST",
+                f"{self.upload_base_url}/api/upload/part",
+                headers={
+                    "x-api-key": self.api_key,
+                    "X-Upload-Id": upload_id,
+                    "X-Part-Number": str(part_number),
+                    "X-Key": key,
+                },
+                data=window,
+                timeout=(self.timeout, self.chunk_policy.part_timeout(length, self.timeout)),
+                stop_event=stop_event,
+            )
+            self.chunk_policy.record(length, part_response.transfer_seconds)
+        bytes_uploaded.inc(length)
+
+        part_result = part_response.json()
+        part = {"partNumber": part_result["partNumber"], "etag": part_result["etag"]}
+
+        if on_part is not None:
+            on_part(part)
+        return part
+
+    def _upload_parts(
+        self,
+        source,
+        file_size: int,
+        upload_id: str,
+        key: str,
+        chunk_size: int,
+        completed_parts: Optional[Dict[int, str]] = None,
+        on_part: Optional[Callable[[Dict], None]] = None,
+        progress=None,
+        progress_key: str = None,
+    ) -> List[Dict]:
+        """
+        Upload all missing parts of a file with up to part_concurrency parts in flight
+
+        Parts are streamed from the file without being read into memory as a
+        whole (see _upload_part). The first failing part stops the remaining
+        ones and its exception is raised.
+
+        Args:
+            source: File path, or bytes-like object with the file content
+            completed_parts: Already uploaded parts as {partNumber: etag}
+            on_part: Optional callback invoked with each newly uploaded part
+            progress: Optional UploadProgress receiving part and byte progress
+            progress_key: File key reported to progress
+
+        Returns:
+            List of parts ordered by partNumber
+        """
+        completed_parts = completed_parts or {}
+        part_count = math.ceil(file_size / chunk_size)
+        parts = [
+            {"partNumber": part_number, "etag": etag}
+            for part_number, etag in completed_parts.items()
+            if part_number <= part_count
+        ]
+        missing = [
+            part_number
+            for part_number in range(1, part_count + 1)
+            if part_number not in completed_parts
+        ]
+        if progress is not None:
+            progress.file_started(
+                progress_key,
+                file_size,
+                part_count,
+                part_count - len(missing),
+                file_size - sum(
+                    min(chunk_size, file_size - (part_number - 1) * chunk_size)
+                    for part_number in missing
+                ),
+            )
+        if not missing:
+            return sorted(parts, key=lambda part: part["partNumber"])
+
+        on_read = None
+        part_callback = on_part
+        if progress is not None:
+            on_read = lambda nbytes: progress.bytes_sent(progress_key, nbytes)
+
+            def part_callback(part):
+                progress.part_done(progress_key)
+                if on_part is not None:
+                    on_part(part)
+
+        stop_event = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.part_concurrency, len(missing)),
+            thread_name_prefix="asset-manager-part",
+        )
+        try:
+            futures = [
+                executor.submit(
+                    self._upload_part,
+                    source,
+                    file_size,
+                    part_number,
+                    upload_id,
+                    key,
+                    chunk_size,
+                    stop_event,
+                    part_callback,
+                    on_read,
+                )
+                for part_number in missing
+            ]
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+            failed = [future for future in futures if future in done and future.exception()]
+            if failed:
+                stop_event.set()
+                for future in not_done:
+                    future.cancel()
+                raise failed[0].exception()
+
+            parts.extend(future.result() for future in futures)
+        finally:
+            executor.shutdown(wait=True)
+
+        parts.sort(key=lambda part: part["partNumber"])
+        return parts
 
     def batch_upload_assets(
         self,
@@ -265,45 +1123,231 @@ class AssetManagerAPIClient:
         project_id: str,
         folder_id: str = None,
         organization_id: str = None,
-        metadata: Optional[Dict] = None,
+        metadata=None,
+        max_concurrent_files: int = None,
+        on_file_status: Optional[Callable[[str, str, Optional[str]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        file_data: Optional[Dict[str, bytes]] = None,
+        progress=None,
     ) -> Dict:
         """
-        Upload multiple assets in batches
+        Upload multiple assets with up to max_concurrent_files files in flight
+
+        With direct_upload_threshold set, files up to that size are grouped and
+        sent in single requests to /api/upload/direct instead of three
+        sequential multipart requests each. If the backend rejects the endpoint,
+        the client falls back to multipart uploads.
 
         Args:
             file_paths: List of file paths to upload
             project_id: Target project ID
             folder_id: Target folder ID (defaults to project_id if not provided)
             organization_id: Organization ID
-            metadata: Optional metadata dictionary
+            metadata: Optional metadata dictionary, serialized once for the whole batch
+            max_concurrent_files: Files uploaded at the same time (defaults to file_concurrency)
+            on_file_status: Optional callback(file_path, status, error) for per-file state changes
+            cancel_event: Optional event; files not started yet are skipped once it is set
+            file_data: Optional in-memory content by file path, uploaded instead
+                of reading those files from disk
+            progress: Optional UploadProgress receiving part and byte progress,
+                keyed by file path
 
         Returns:
-            Dictionary containing batch upload status and results
+            Dictionary containing batch upload status, results, per-file timing
+            and route (multipart, single or batch), file counts per route, and
+            JSON/metadata byte counts
         """
+        if not isinstance(metadata, PreparedMetadata):
+            metadata = PreparedMetadata(metadata)
+
         results = {
             "status": "success",
             "total": len(file_paths),
             "successful": 0,
             "failed": 0,
+            "cancelled": 0,
             "errors": [],
+            "files": [],
         }
+        file_results = [None] * len(file_paths)
+        transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+        transfer_lock = threading.Lock()
+        batch_started = time.monotonic()
 
-        for file_path in file_paths:
+        try:
+            self.abort_expired_uploads()
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+
+        def notify(file_path, status, error=None):
+            if on_file_status is None:
+                return
+            try:
+                on_file_status(file_path, status, error)
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
+
+        def cancelled(indices):
+            if cancel_event is None or not cancel_event.is_set():
+                return False
+            for index in indices:
+                file_results[index] = {
+                    "file": file_paths[index],
+                    "status": "cancelled",
+                    "seconds": 0.0,
+                }
+                notify(file_paths[index], "cancelled")
+            return True
+
+        def add_transfer(counts):
+            with transfer_lock:
+                for name, value in counts.items():
+                    transfer[name] += value
+
+        def record(index, result, file_started):
+            file_path = file_paths[index]
+            entry = {
+                "file": file_path,
+                "status": result["status"],
+                "route": result.get("route", "multipart"),
+                "seconds": round(time.monotonic() - file_started, 3),
+            }
+            if result["status"] != "success":
+                entry["error"] = result.get("message", "Unknown error")
+            files_uploaded.inc(outcome=entry["status"])
+            file_results[index] = entry
+            notify(file_path, entry["status"], entry.get("error"))
+
+        def upload_one(index):
+            if cancelled([index]):
+                return
+
+            file_path = file_paths[index]
+            notify(file_path, "uploading")
+            file_started = time.monotonic()
             result = self.upload_asset(
-                file_path, project_id, folder_id, organization_id, metadata
+                file_path,
+                project_id,
+                folder_id,
+                organization_id,
+                metadata,
+                data=(file_data or {}).get(file_path),
+                progress=progress,
+            )
+            add_transfer(result.get("transfer", {}))
+            record(index, result, file_started)
+
+        def upload_group(indices):
+            if cancelled(indices):
+                return
+
+            if self.direct_upload_supported:
+                for index in indices:
+                    notify(file_paths[index], "uploading")
+                group_started = time.monotonic()
+                try:
+                    files = []
+                    for index in indices:
+                        data = (file_data or {}).get(file_paths[index])
+                        if data is None:
+                            with open(file_paths[index], "rb") as f:
+                                data = f.read()
+                        files.append((file_paths[index], data))
+                    group_results, counts = self._upload_direct(
+                        files, project_id, folder_id, organization_id, metadata, progress
+                    )
+                except Exception as e:
+                    if _is_unsupported_route(e):
+                        if self.direct_upload_supported:
+                            self.direct_upload_supported = False
+                            print(
+                                "Warning: Direct uploads are not supported by the API, "
+                                "using multipart uploads"
+                            )
+                    elif _was_not_stored(e):
+                        print(
+                            f"Warning: Direct upload failed, retrying with multipart uploads: {e}"
+                        )
+                    else:
+                        # The server may have stored the files; uploading them
+                        # again could store them twice
+                        for index in indices:
+                            record(
+                                index,
+                                {
+                                    "status": "error",
+                                    "message": f"Direct upload failed: {e}",
+                                    "route": "single" if len(indices) == 1 else "batch",
+                                },
+                                group_started,
+                            )
+                        return
+                else:
+                    add_transfer(counts)
+                    for index, result in zip(indices, group_results):
+                        record(index, result, group_started)
+                    return
+
+            for index in indices:
+                upload_one(index)
+
+        groups, multipart = [], list(range(len(file_paths)))
+        if self.direct_upload_threshold and self.direct_upload_supported:
+            groups, multipart = plan_direct_uploads(
+                file_paths,
+                file_data,
+                self.direct_upload_threshold,
+                self.direct_upload_max_files,
+                self.direct_upload_max_bytes,
             )
 
-            if result["status"] == "success":
+        max_workers = max(
+            1, min(max_concurrent_files or self.file_concurrency, len(file_paths))
+        )
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="asset-manager-file"
+        ) as executor:
+            futures = [executor.submit(upload_group, group) for group in groups]
+            futures += [executor.submit(upload_one, index) for index in multipart]
+            for future in futures:
+                future.result()
+
+        for entry in file_results:
+            results["files"].append(entry)
+            if entry["status"] == "success":
                 results["successful"] += 1
+            elif entry["status"] == "cancelled":
+                results["cancelled"] += 1
             else:
                 results["failed"] += 1
                 results["errors"].append(
-                    {"file": file_path, "error": result.get("message", "Unknown error")}
+                    {"file": entry["file"], "error": entry.get("error", "Unknown error")}
                 )
 
-        if results["failed"] > 0:
+        if results["failed"] > 0 or results["cancelled"] > 0:
             results["status"] = "partial"
 
+        routes = {}
+        for entry in file_results:
+            if entry["status"] != "cancelled":
+                routes[entry["route"]] = routes.get(entry["route"], 0) + 1
+        results["routes"] = routes
+
+        # Before metadata was prepared per batch, every file sent it twice
+        attempted = len(file_paths) - results["cancelled"]
+        transfer["metadata_bytes_saved"] = max(
+            0, 2 * metadata.size * attempted - transfer["metadata_bytes"]
+        )
+        transfer["compression_bytes_saved"] = (
+            transfer["json_bytes_uncompressed"] - transfer["json_bytes"]
+        )
+        results["transfer"] = transfer
+
+        results["seconds"] = round(time.monotonic() - batch_started, 3)
         results["message"] = (
             f"Uploaded {results['successful']}/{results['total']} assets successfully"
         )
@@ -320,7 +1364,7 @@ class AssetManagerAPIClient:
         try:
             url = f"{self.base_url}/health"
 
-            response = requests.get(url, headers=self.headers, timeout=5)
+            response = self.session.get(url, headers=self.headers, timeout=5)
 
             if response.status_code == 200:
                 return {"status": "success", "message": "API connection successful"}
@@ -332,3 +1376,100 @@ class AssetManagerAPIClient:
 
         except Exception as e:
             return {"status": "error", "message": f"Connection failed: {str(e)}"}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Classify an upload error as transient (worth retrying) or fatal
+
+    Timeouts, connection errors, 408, 429 and 5xx responses other than 501
+    are transient; 401, 403, 501 and other 4xx responses are fatal.
+    """
+    if isinstance(
+        error,
+        (
+            requests.exceptions.Timeout,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    ):
+        return True
+
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.exceptions.HTTPError) and response is not None:
+        return response.status_code in (408, 429) or (
+            response.status_code >= 500 and response.status_code != 501
+        )
+
+    return False
+
+
+def _was_not_stored(error: Exception) -> bool:
+    """
+    Check whether a failed request certainly did not reach the server
+
+    Only connection failures and 4xx responses qualify; after timeouts,
+    dropped connections and 5xx responses the server may have processed it.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], "reason", error.args[0])
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500
+
+
+def _is_unsupported_route(error: Exception) -> bool:
+    """
+    Check whether an error means the backend does not offer an endpoint
+    """
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in (404, 405, 501)
+
+
+def _is_missing_upload(error: Exception) -> bool:
+    """
+    Check whether an error means the backend no longer knows a multipart upload
+    """
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in (404, 410)
+
+
+_client_cache = OrderedDict()
+_client_cache_lock = threading.Lock()
+CLIENT_CACHE_SIZE = 8
+
+
+def get_client(api_key: str, resume_store=None) -> AssetManagerAPIClient:
+    """
+    Get a pooled API client for an API key
+
+    Clients are cached per API key so repeated calls reuse keep-alive
+    connections. The least recently used client is closed once more than
+    CLIENT_CACHE_SIZE keys are cached; its in-flight requests still finish.
+
+    Args:
+        api_key: API authentication key
+        resume_store: Optional multipart state store to attach to the client
+
+    Returns:
+        Cached AssetManagerAPIClient for the key
+    """
+    with _client_cache_lock:
+        client = _client_cache.get(api_key)
+        if client is not None:
+            _client_cache.move_to_end(api_key)
+            if resume_store is not None:
+                client.resume_store = resume_store
+            return client
+
+        client = AssetManagerAPIClient(api_key=api_key, resume_store=resume_store)
+        _client_cache[api_key] = client
+
+        while len(_client_cache) > CLIENT_CACHE_SIZE:
+            _, evicted = _client_cache.popitem(last=False)
+            evicted.close()
+
+        return client
@@ -3,19 +3,237 @@ API routes for Asset Manager custom node
 These routes should be registered with ComfyUI's server
 """
 
+import asyncio
+import hashlib
+import heapq
 import os
+import random
+import shutil
+import tempfile
+import threading
+import time
 import json
 from pathlib import Path
-from urllib.parse import quote
 import folder_paths
 from aiohttp import web
-from .api_client import AssetManagerAPIClient
+from .api_client import get_client
+from .async_api_client import get_async_client
+from .metrics import (
+    files_uploaded,
+    recompress_bytes_saved,
+    recompress_cpu_seconds,
+    registry,
+    scan_seconds,
+)
+from .image_encoding import (
+    build_png_text,
+    start_encoding,
+    reserve_output_names,
+    write_output_file,
+)
+from .output_index import get_output_index
+from .output_watcher import OutputWatcher
+from .recompression import RECOMPRESS_FORMATS, recompress_files
+from .response_cache import StaleWhileRevalidateCache, hash_api_key
+from .settings_store import SettingsStore
+from .thumbnails import (
+    DEFAULT_THUMBNAIL_SIZE,
+    MAX_THUMBNAIL_SIZE,
+    THUMBNAIL_CONTENT_TYPE,
+    can_thumbnail,
+    get_thumbnail_cache,
+    read_thumbnail,
+)
+from .upload_leases import LEASE_DIR_NAME, get_lease_store, lease_key, release_all
+from .upload_ledger import get_upload_ledger
+from .upload_io import upload_bandwidth
+from .upload_jobs import PRIORITY_AUTOMATIC, PRIORITY_MANUAL, upload_queue
+
+
+def get_data_directory():
+    """
+    Get the directory where Asset Manager keeps its local state
+
+    Returns:
+        Path of the data directory (created if needed)
+    """
+    try:
+        base_dir = folder_paths.get_user_directory()
+    except AttributeError:
+        base_dir = os.path.dirname(os.path.realpath(__file__))
+
+    data_dir = os.path.join(base_dir, "asset-manager")
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+def get_ledger():
+    """
+    Get the upload ledger stored in the data directory
+    """
+    return get_upload_ledger(os.path.join(get_data_directory(), "upload_ledger.sqlite3"))
+
+
+_server = None
+_settings_store = None
+_watcher = None
+_watcher_lock = threading.Lock()
+# Output files another instance held the lease of, by first seen time
+_deferred_uploads = {}
+_deferred_lock = threading.Lock()
+_leased_jobs = []
+# Deferred files are given up after a day
+DEFERRED_MAX_AGE = 24 * 3600
+# Workflow of the last queued prompt, sent with automatic uploads
+_last_prompt = {"workflow": None, "prompt": None}
+_last_prompt_lock = threading.Lock()
+
+
+def remember_prompt(json_data):
+    """
+    On-prompt handler keeping the workflow of the last queued prompt
+
+    Automatic uploads send it as metadata, like the browser did with the
+    graph it had open, so outputs without embedded PNG text (video, WebP)
+    keep their workflow.
+
+    Args:
+        json_data: Body of the POST /prompt request
+
+    Returns:
+        json_data unchanged
+    """
+    try:
+        extra_pnginfo = (json_data.get("extra_data") or {}).get("extra_pnginfo") or {}
+        with _last_prompt_lock:
+            _last_prompt["workflow"] = extra_pnginfo.get("workflow")
+            _last_prompt["prompt"] = json_data.get("prompt")
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+    return json_data
+
+
+def get_settings_store():
+    """
+    Get the server-side settings stored in the data directory
+    """
+    global _settings_store
+
+    if _settings_store is None:
+        _settings_store = SettingsStore(os.path.join(get_data_directory(), "settings.json"))
+    return _settings_store
+
+
+def notify_clients(event, data):
+    """
+    Send an event to connected browsers through the ComfyUI websocket
+
+    Args:
+        event: Event name
+        data: JSON-serializable event data
+    """
+    if _server is None:
+        return
+    try:
+        _server.send_sync(event, data)
+    except Exception as e:
+        print(f"Warning: Could not send Asset Manager event {event}: {e}")
+
+
+def get_index(output_dir):
+    """
+    Get the output index with the scan options of the server-side settings
+
+    Args:
+        output_dir: ComfyUI output directory
+
+    Returns:
+        Shared OutputIndex for output_dir
+    """
+    settings = get_settings_store().get()
+    exclude = [
+        pattern.strip() for pattern in settings["scan_exclude"].split(",") if pattern.strip()
+    ]
+    # Upload leases (see upload_leases) are never output files
+    exclude.append(LEASE_DIR_NAME)
+    return get_output_index(
+        output_dir,
+        max_depth=settings["scan_max_depth"] if settings["scan_max_depth"] >= 0 else None,
+        exclude=exclude,
+        max_workers=settings["scan_workers"],
+    )
+
+
+def build_listing_filter(
+    file_types=None,
+    extensions=None,
+    modified_after=None,
+    modified_before=None,
+    exclude_paths=None,
+    exclude_uploaded_project=None,
+):
+    """
+    Build the file filter of get_output_images
 
+    Args:
+        See get_output_images
 
-def get_output_images():
+    Returns:
+        Function taking a file entry and returning whether it matches
+    """
+    file_types = set(file_types) if file_types else None
+    extensions = (
+        {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions}
+        if extensions
+        else None
+    )
+    exclude_paths = set(exclude_paths or [])
+    if exclude_uploaded_project:
+        exclude_paths.update(get_ledger().uploaded_paths(exclude_uploaded_project))
+    exclude_paths = exclude_paths or None
+
+    def matches(image):
+        return (
+            (file_types is None or image["file_type"] in file_types)
+            and (extensions is None or image["extension"] in extensions)
+            and (modified_after is None or image["modified"] > modified_after)
+            and (modified_before is None or image["modified"] < modified_before)
+            and (exclude_paths is None or image["path"] not in exclude_paths)
+        )
+
+    return matches
+
+
+def get_output_images(
+    limit=None,
+    offset=0,
+    file_types=None,
+    extensions=None,
+    modified_after=None,
+    modified_before=None,
+    exclude_paths=None,
+    exclude_uploaded_project=None,
+):
     """
     Get list of files from ComfyUI output folder
     Returns a list of file information including paths, metadata, and file types
+
+    Args:
+        limit: Maximum number of files to return (None returns every match)
+        offset: Number of newest matching files to skip
+        file_types: Optional collection of file types (image, video, ...) to include
+        extensions: Optional collection of extensions (".png", ...) to include
+        modified_after: Optional UNIX timestamp; only newer files are included
+        modified_before: Optional UNIX timestamp; only older files are included
+        exclude_paths: Optional collection of relative paths to leave out
+        exclude_uploaded_project: Optional project ID; files the upload ledger
+            records as uploaded to it are left out
+
+    Returns:
+        Dictionary with the newest matching files first. count is the number
+        of matching files, has_more tells whether another page exists.
     """
     try:
         output_dir = folder_paths.get_output_directory()
@@ -27,81 +245,37 @@ def get_output_images():
                 "images": [],
             }
 
-        images = []
-
-        file_type_map = {
-            # images
-            ".png": "image",
-            ".jpg": "image",
-            ".jpeg": "image",
-            ".webp": "image",
-            ".svg": "image",
-            # videos
-            ".mp4": "video",
-            ".mov": "video",
-            ".avi": "video",
-            # audio
-            ".mp3": "audio",
-            ".wav": "audio",
-            ".flac": "audio",
-            # text
-            ".txt": "text",
-            ".json": "text",
-            # 3D
-            ".obj": "3D",
-            ".fbx": "3D",
-            ".gltf": "3D",
-            ".glb": "3D",
-        }
+        index = get_index(output_dir)
+        index.refresh()
+
+        with scan_seconds.time(operation="listing"):
+            matches_filter = build_listing_filter(
+                file_types,
+                extensions,
+                modified_after,
+                modified_before,
+                exclude_paths,
+                exclude_uploaded_project,
+            )
+            matches = [image for image in index.list_files() if matches_filter(image)]
 
-        file_count = 0
-        for root, dirs, files in os.walk(output_dir):
-            for file in files:
-                file_count += 1
-
-                # Use proper extension extraction instead of endswith matching
-                file_ext = os.path.splitext(file.lower())[1]
-
-                # Check if this extension is supported
-                if file_ext in file_type_map:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, output_dir)
-
-                    # Normalize path separators to forward slashes for URLs (works on all OS)
-                    relative_path_normalized = relative_path.replace(os.sep, "/")
-
-                    stat_info = os.stat(file_path)
-                    file_type = file_type_map[file_ext]
-
-                    # Build URL with subfolder parameter if file is in a subdirectory
-                    # ComfyUI's /view endpoint expects: filename=basename&subfolder=path&type=output
-                    if "/" in relative_path_normalized:
-                        # File is in a subfolder
-                        subfolder = relative_path_normalized.rsplit("/", 1)[0]
-                        basename = relative_path_normalized.rsplit("/", 1)[1]
-                        encoded_basename = quote(basename)
-                        encoded_subfolder = quote(subfolder, safe="/")
-                        view_url = f"/view?filename={encoded_basename}&subfolder={encoded_subfolder}&type=output"
-                    else:
-                        # File is in root output directory
-                        encoded_basename = quote(relative_path_normalized)
-                        view_url = f"/view?filename={encoded_basename}&type=output"
-
-
-                    images.append(
-                        {
-                            "name": file,
-                            "path": relative_path_normalized,
-                            "url": view_url,
-                            "size": stat_info.st_size,
-                            "modified": stat_info.st_mtime,
-                            "file_type": file_type,
-                            "extension": file_ext,
-                        }
-                    )
-
-        images.sort(key=lambda x: x["modified"], reverse=True)
-        return {"status": "success", "images": images, "count": len(images)}
+            offset = max(0, offset or 0)
+            if limit is None:
+                images = sorted(matches, key=lambda x: x["modified"], reverse=True)[offset:]
+            else:
+                # Only the newest offset + limit entries are ordered, not the whole list
+                images = heapq.nlargest(
+                    offset + max(0, limit), matches, key=lambda x: x["modified"]
+                )[offset:]
+
+        return {
+            "status": "success",
+            "images": images,
+            "count": len(matches),
+            "offset": offset,
+            "has_more": offset + len(images) < len(matches),
+            "cursor": index.cursor,
+        }
 
     except Exception as e:
         import traceback
@@ -110,7 +284,211 @@ def get_output_images():
         return {"status": "error", "message": str(e), "images": []}
 
 
-def upload_assets(data):
+def stream_output_images(on_images, **options):
+    """
+    List output files while the output folder is scanned
+
+    Instead of waiting for the whole scan, on_images receives the matching
+    files of each directory as soon as it is scanned, in no particular
+    order. A slow first scan of a large (e.g. network mounted) folder
+    therefore shows results early.
+
+    Args:
+        on_images: Called with lists of matching file entries
+        options: Filters as for get_output_images; limit and offset are ignored
+
+    Returns:
+        Status dictionary with the number of matching files and the index cursor
+    """
+    try:
+        output_dir = folder_paths.get_output_directory()
+
+        if not os.path.exists(output_dir):
+            return {"status": "error", "message": "Output directory not found"}
+
+        options.pop("limit", None)
+        options.pop("offset", None)
+        matches_filter = build_listing_filter(**options)
+        count = 0
+
+        def on_directory(entries):
+            nonlocal count
+            images = [image for image in entries if matches_filter(image)]
+            if images:
+                count += len(images)
+                on_images(images)
+
+        index = get_index(output_dir)
+        index.refresh(on_directory=on_directory)
+        return {"status": "success", "count": count, "cursor": index.cursor}
+
+    except Exception as e:
+        import traceback
+
+        traceback.print_exc()
+        return {"status": "error", "message": str(e)}
+
+
+def parse_listing_options(params):
+    """
+    Convert get_output_images query/body parameters into keyword arguments
+
+    Args:
+        params: Mapping with optional limit, offset, file_type, extension,
+            modified_after, modified_before, exclude, exclude_uploaded and
+            project_id values. file_type, extension and exclude accept comma
+            separated strings or lists of strings.
+
+    Returns:
+        Keyword arguments for get_output_images
+
+    Raises:
+        TypeError, ValueError: If a parameter has the wrong type or format
+    """
+
+    def as_list(value):
+        if not value:
+            return None
+        if isinstance(value, str):
+            value = value.split(",")
+        items = []
+        for item in value:
+            if not isinstance(item, str):
+                raise ValueError(f"expected a string, got {item!r}")
+            if item.strip():
+                items.append(item.strip())
+        return items or None
+
+    def as_number(value, cast):
+        if value is None or value == "":
+            return None
+        return cast(value)
+
+    return {
+        "limit": as_number(params.get("limit"), int),
+        "offset": as_number(params.get("offset"), int) or 0,
+        "file_types": as_list(params.get("file_type")),
+        "extensions": as_list(params.get("extension")),
+        "modified_after": as_number(params.get("modified_after"), float),
+        "modified_before": as_number(params.get("modified_before"), float),
+        "exclude_paths": as_list(params.get("exclude")),
+        "exclude_uploaded_project": (
+            params.get("project_id") or None
+            if str(params.get("exclude_uploaded", "")).lower() in ("1", "true")
+            else None
+        ),
+    }
+
+
+def get_output_changes(since=None):
+    """
+    Get files added to or removed from the output folder since a cursor
+
+    Args:
+        since: Cursor from a previous get_output_images/get_output_changes call
+
+    Returns:
+        Dictionary with added file entries, removed paths and the new cursor.
+        reset is True when the cursor is unknown; added then lists every file.
+    """
+    try:
+        output_dir = folder_paths.get_output_directory()
+
+        if not os.path.exists(output_dir):
+            return {
+                "status": "error",
+                "message": "Output directory not found",
+                "added": [],
+                "removed": [],
+            }
+
+        index = get_index(output_dir)
+        index.refresh()
+
+        changes = index.changes_since(since)
+        changes["added"].sort(key=lambda x: x["modified"], reverse=True)
+        return {"status": "success", **changes}
+
+    except Exception as e:
+        import traceback
+
+        traceback.print_exc()
+        return {"status": "error", "message": str(e), "added": [], "removed": []}
+
+
+def validate_upload_request(data):
+    """
+    Check an upload request before it is queued
+
+    Args:
+        data: Upload request dictionary (see upload_assets)
+
+    Returns:
+        Error dictionary, or None if the request is valid
+    """
+    if not data.get("api_key"):
+        return {"status": "error", "message": "API key is required"}
+
+    if not data.get("assets"):
+        return {"status": "error", "message": "No assets selected for upload"}
+
+    if not data.get("project_id"):
+        return {"status": "error", "message": "Project ID is required"}
+
+    return None
+
+
+def configure_client(client, settings):
+    """
+    Apply the server-side upload client options to a pooled client
+
+    Args:
+        client: AssetManagerAPIClient or AsyncAssetManagerAPIClient
+        settings: Settings dictionary (see settings_store.DEFAULT_SETTINGS)
+    """
+    client.compress_requests = settings["compress_requests"]
+    client.metadata_by_reference = settings["metadata_by_reference"]
+    client.max_resume_attempts = max(1, settings["resume_max_attempts"])
+    client.resume_max_age = max(0.0, settings["resume_max_age_hours"]) * 3600
+    client.direct_upload_threshold = max(0, settings["direct_upload_threshold_kb"]) * 1024
+    client.direct_upload_max_files = max(1, settings["direct_upload_max_files"])
+    client.direct_upload_max_bytes = max(1, settings["direct_upload_max_kb"]) * 1024
+
+
+def batch_upload(api_key, settings, file_paths, **options):
+    """
+    Upload a batch from an upload job thread
+
+    On a running ComfyUI server the batch is uploaded by the asyncio client
+    on the server's event loop, with parts and files as tasks sharing one
+    aiohttp session; the job thread only waits for the result. Without a
+    running loop the threaded client uploads it.
+
+    Args:
+        api_key: API authentication key
+        settings: Settings dictionary applied with configure_client
+        file_paths: Files to upload
+        **options: Passed to batch_upload_assets
+
+    Returns:
+        Result of batch_upload_assets
+    """
+    ledger = get_ledger()
+    loop = getattr(_server, "loop", None)
+    if loop is None or not loop.is_running():
+        client = get_client(api_key, resume_store=ledger)
+        configure_client(client, settings)
+        return client.batch_upload_assets(file_paths, **options)
+
+    async def upload():
+        client = get_async_client(api_key, resume_store=ledger)
+        configure_client(client, settings)
+        return await client.batch_upload_assets(file_paths, **options)
+
+    return asyncio.run_coroutine_threadsafe(upload(), loop).result()
+
+
+def upload_assets(data, job=None):
     """
     Upload selected assets and metadata to external API
 
@@ -122,75 +500,181 @@ def upload_assets(data):
             - organization_id: Organization ID
             - metadata: Additional metadata (workflow, nodes, etc.)
             - api_key: API authentication key
+            - force: Upload even if the ledger records the content as uploaded
+            - recompress: Optional "png", "webp" or "" overriding the
+              recompress_images setting
+        job: Optional UploadJob that receives per-file status and cancellation
     """
+    temp_dir = None
     try:
-        assets = data.get("assets", [])
+        assets = list(dict.fromkeys(data.get("assets", [])))
         project_id = data.get("project_id")
         folder_id = data.get("folder_id")
         organization_id = data.get("organization_id")
         metadata = data.get("metadata", {})
         api_key = data.get("api_key")
 
-        if not api_key:
-            return {"status": "error", "message": "API key is required"}
-
-        if not assets:
-            return {"status": "error", "message": "No assets selected for upload"}
-
-        if not project_id:
-            return {"status": "error", "message": "Project ID is required"}
+        error = validate_upload_request(data)
+        if error:
+            return error
 
         output_dir = folder_paths.get_output_directory()
 
-        from .api_client import AssetManagerAPIClient
-
-        client = AssetManagerAPIClient(api_key=api_key)
-
-        results = {
-            "status": "success",
-            "total": len(assets),
-            "successful": 0,
-            "failed": 0,
-            "errors": [],
-        }
+        ledger = get_ledger()
+        settings = get_settings_store().get()
 
+        missing = set()
+        asset_by_full_path = {}
         for asset_path in assets:
             # Convert forward slashes back to OS-specific separators
             normalized_asset_path = asset_path.replace("/", os.sep)
             full_path = os.path.join(output_dir, normalized_asset_path)
 
             if not os.path.exists(full_path):
-                results["failed"] += 1
-                results["errors"].append(
-                    {"file": asset_path, "error": "File not found"}
-                )
+                missing.add(asset_path)
+                if job:
+                    job.set_file_status(asset_path, "error", "File not found")
                 continue
 
-            result = client.upload_asset(
-                file_path=full_path,
-                project_id=project_id,
-                folder_id=folder_id,
-                organization_id=organization_id,
-                metadata=metadata,
-            )
+            asset_by_full_path[full_path] = asset_path
+
+        progress = job.progress if job else None
+        if progress is not None:
+            for asset_path in missing:
+                progress.add_file(asset_path, asset_path, status="error")
+        # Skip content the ledger already uploaded to this project, and
+        # identical files within the batch
+        hash_by_asset = {}
+        skipped = {}
+        first_by_hash = {}
+        for full_path, asset_path in list(asset_by_full_path.items()):
+            try:
+                sha256 = ledger.file_hash(asset_path, full_path)
+            except OSError:
+                continue
+            hash_by_asset[asset_path] = sha256
 
-            if result["status"] == "success":
-                results["successful"] += 1
+            previous = None if data.get("force") else ledger.find_upload(sha256, project_id)
+            if previous:
+                skipped[asset_path] = f"Already uploaded as {previous['path']}"
+            elif sha256 in first_by_hash:
+                skipped[asset_path] = f"Same content as {first_by_hash[sha256]}"
             else:
-                results["failed"] += 1
-                results["errors"].append(
-                    {
-                        "file": asset_path,
-                        "error": result.get("message", "Unknown error"),
-                    }
-                )
+                first_by_hash[sha256] = asset_path
+                continue
+
+            del asset_by_full_path[full_path]
+            if job:
+                job.set_file_status(asset_path, "skipped")
+                progress.add_file(full_path, asset_path, status="skipped")
+
+        # Upload losslessly re-encoded copies of images that got smaller
+        recompress = data.get("recompress", settings["recompress_images"])
+        recompressed = {}
+        recompression = None
+        if recompress in RECOMPRESS_FORMATS and asset_by_full_path:
+            temp_dir = tempfile.mkdtemp(prefix="asset-manager-recompress-")
+            recompressed, recompression = recompress_files(
+                list(asset_by_full_path),
+                temp_dir,
+                recompress,
+                cancel_event=job.cancel_event if job else None,
+            )
+            recompress_bytes_saved.inc(
+                recompression["bytes_saved"], format=recompress, project=project_id
+            )
+            recompress_cpu_seconds.inc(
+                recompression["cpu_seconds"], format=recompress, project=project_id
+            )
+            for full_path, result in recompressed.items():
+                asset_by_full_path[result["path"]] = asset_by_full_path.pop(full_path)
+
+        size_by_path = {}
+        for full_path, asset_path in asset_by_full_path.items():
+            try:
+                size_by_path[full_path] = os.path.getsize(full_path)
+            except OSError:
+                size_by_path[full_path] = 0
+            if progress is not None:
+                progress.add_file(full_path, asset_path, size_by_path[full_path])
+
+        def on_file_status(full_path, status, error=None):
+            asset_path = asset_by_full_path[full_path]
+            if status == "success" and asset_path in hash_by_asset:
+                ledger.record_upload(hash_by_asset[asset_path], project_id, asset_path)
+            if job:
+                job.set_file_status(asset_path, status, error)
+                progress.set_file_status(full_path, status, error)
+
+        # Small files first, so images are not held up by large videos
+        batch_results = batch_upload(
+            api_key,
+            settings,
+            sorted(asset_by_full_path, key=size_by_path.get),
+            project_id=project_id,
+            folder_id=folder_id,
+            organization_id=organization_id,
+            metadata=metadata,
+            on_file_status=on_file_status,
+            cancel_event=job.cancel_event if job else None,
+            progress=progress,
+        )
+
+        file_entries = {}
+        for entry in batch_results["files"]:
+            file_entries[asset_by_full_path[entry["file"]]] = dict(
+                entry, file=asset_by_full_path[entry["file"]]
+            )
+        for full_path, result in recompressed.items():
+            file_entries[asset_by_full_path[result["path"]]]["recompressed"] = {
+                "uploaded_as": os.path.basename(result["path"]),
+                "original_size": result["original_size"],
+                "size": result["size"],
+            }
+        for asset_path in missing:
+            file_entries[asset_path] = {
+                "file": asset_path,
+                "status": "error",
+                "error": "File not found",
+                "seconds": 0.0,
+            }
+        files_uploaded.inc(len(skipped), outcome="skipped")
+        for asset_path, reason in skipped.items():
+            file_entries[asset_path] = {
+                "file": asset_path,
+                "status": "skipped",
+                "reason": reason,
+                "seconds": 0.0,
+            }
+
+        results = {
+            "status": "success",
+            "total": len(assets),
+            "successful": batch_results["successful"],
+            "failed": batch_results["failed"] + len(missing),
+            "cancelled": batch_results["cancelled"],
+            "skipped": len(skipped),
+            "errors": [],
+            "files": [],
+            "seconds": batch_results["seconds"],
+            "routes": batch_results["routes"],
+            "transfer": batch_results["transfer"],
+            "recompression": recompression,
+        }
+        for asset_path in assets:
+            entry = file_entries[asset_path]
+            results["files"].append(entry)
+            if entry["status"] == "error":
+                results["errors"].append({"file": asset_path, "error": entry["error"]})
 
-        if results["failed"] > 0:
+        if results["failed"] > 0 or results["cancelled"] > 0:
             results["status"] = "partial"
 
         results["message"] = (
             f"Uploaded {results['successful']}/{results['total']} assets successfully"
         )
+        if skipped:
+            results["message"] += f" ({len(skipped)} already uploaded)"
 
         return results
 
@@ -200,6 +684,396 @@ def upload_assets(data):
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
 
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def get_assets_size(assets):
+    """
+    Get the total size of output files, ignoring missing ones
+
+    Args:
+        assets: Paths relative to the output directory
+
+    Returns:
+        Size in bytes
+    """
+    output_dir = folder_paths.get_output_directory()
+    total = 0
+    for asset_path in assets:
+        try:
+            total += os.path.getsize(os.path.join(output_dir, asset_path.replace("/", os.sep)))
+        except OSError:
+            pass
+    return total
+
+
+def submit_upload_job(data, on_finished=None):
+    """
+    Queue an upload request as a background job
+
+    Browsers are notified with an "asset-manager.upload_finished" event when
+    the job is done. Automatic uploads (metadata automatic_upload) are queued
+    behind manual ones, and smaller jobs start first.
+
+    Args:
+        data: Upload request dictionary (see upload_assets)
+        on_finished: Optional callback run with the job when it finished
+
+    Returns:
+        The queued UploadJob
+    """
+
+    automatic = bool((data.get("metadata") or {}).get("automatic_upload"))
+    assets = data.get("assets", [])
+
+    def run(job):
+        job.progress.emit = lambda snapshot: notify_clients(
+            "asset-manager.upload_progress", snapshot
+        )
+        result = upload_assets(data, job=job)
+        job.progress.flush()
+        notify_clients(
+            "asset-manager.upload_finished",
+            {"job_id": job.job_id, "automatic": automatic, "result": result},
+        )
+        return result
+
+    return upload_queue.submit(
+        assets,
+        run,
+        priority=PRIORITY_AUTOMATIC if automatic else PRIORITY_MANUAL,
+        size=get_assets_size(assets),
+        on_finished=on_finished,
+    )
+
+
+def get_lease_directory(settings):
+    """
+    Get the directory holding upload leases
+
+    Args:
+        settings: Server-side settings
+
+    Returns:
+        The lease_directory setting, or a hidden folder in the output directory
+    """
+    return settings["lease_directory"] or os.path.join(
+        folder_paths.get_output_directory(), LEASE_DIR_NAME
+    )
+
+
+def claim_output_files(paths, settings):
+    """
+    Take upload leases for output files shared with other instances
+
+    Files are tried in random order and at most lease_batch_size are
+    claimed, so instances watching the same folder split new files between
+    them. Files another instance holds stay deferred and are tried again on
+    later calls, which picks up leases of crashed instances once they expire.
+
+    Args:
+        paths: New paths relative to the output directory
+        settings: Server-side settings
+
+    Returns:
+        Tuple of (LeaseStore, lease key by claimed path)
+    """
+    leases = get_lease_store(get_lease_directory(settings), max(10.0, settings["lease_seconds"]))
+    output_dir = folder_paths.get_output_directory()
+    now = time.monotonic()
+
+    with _deferred_lock:
+        for path in paths:
+            _deferred_uploads.setdefault(path, now)
+        for path, first_seen in list(_deferred_uploads.items()):
+            if now - first_seen > DEFERRED_MAX_AGE:
+                del _deferred_uploads[path]
+        # Leave new files to idle instances while a claimed batch still waits here
+        if any(job.status == "queued" for job in _leased_jobs):
+            return leases, {}
+        candidates = list(_deferred_uploads)
+
+    random.shuffle(candidates)
+    server_now = leases.server_time()
+    claimed = {}
+    finished = []
+    for path in candidates:
+        if len(claimed) >= max(1, settings["lease_batch_size"]):
+            break
+        try:
+            stat_info = os.stat(os.path.join(output_dir, path.replace("/", os.sep)))
+        except OSError:
+            finished.append(path)
+            continue
+
+        key = lease_key(path, stat_info)
+        state = leases.acquire(key, path, now=server_now)
+        if state == "acquired":
+            claimed[path] = key
+        if state != "held":
+            finished.append(path)
+
+    with _deferred_lock:
+        for path in finished:
+            _deferred_uploads.pop(path, None)
+
+    leases.prune()
+    return leases, claimed
+
+
+def auto_upload_files(paths):
+    """
+    Upload new output files found by the output watcher
+
+    With coordinate_uploads, only files this instance holds the lease of
+    are uploaded (see claim_output_files).
+
+    Args:
+        paths: Paths relative to the output directory
+    """
+    settings = get_settings_store().get()
+    with _last_prompt_lock:
+        metadata = dict(_last_prompt, automatic_upload=True, count=len(paths))
+    data = {
+        "assets": paths,
+        "project_id": settings["project_id"],
+        "folder_id": settings["project_id"],
+        "organization_id": settings["organization_id"],
+        "api_key": settings["api_key"],
+        "metadata": metadata,
+    }
+    if not settings["coordinate_uploads"]:
+        if validate_upload_request(data) is None:
+            submit_upload_job(data)
+        return
+
+    if not settings["api_key"] or not settings["project_id"]:
+        return
+    leases, claimed = claim_output_files(paths, settings)
+    if not claimed:
+        return
+    data["assets"] = list(claimed)
+    data["metadata"]["count"] = len(claimed)
+
+    def on_finished(job):
+        done = [
+            asset
+            for asset, entry in job.files.items()
+            if entry.get("status") in ("success", "skipped")
+        ]
+        release_all(leases, claimed, done)
+        with _deferred_lock:
+            if job in _leased_jobs:
+                _leased_jobs.remove(job)
+
+    with _deferred_lock:
+        _leased_jobs.append(submit_upload_job(data, on_finished=on_finished))
+
+
+def retry_deferred_uploads():
+    """
+    Try again to claim files other instances held the lease of
+    """
+    with _deferred_lock:
+        if not _deferred_uploads:
+            return
+    auto_upload_files([])
+
+
+def submit_image_upload(
+    images,
+    filename_prefix="ComfyUI",
+    save_local=False,
+    prompt=None,
+    extra_pnginfo=None,
+    project_id=None,
+    compress_level=4,
+):
+    """
+    Queue an upload of IMAGE tensors without writing them to disk first
+
+    Frames are PNG-encoded on the encode pool right away, so queued jobs hold
+    PNG bytes rather than the tensor, and uploaded from memory. With save_local the same bytes are written to the output folder
+    after the upload, and the ledger already knows them, so the output
+    watcher does not upload them again.
+
+    Args:
+        images: IMAGE tensor of shape (batch, height, width, channels)
+        filename_prefix: Output file name prefix, as for SaveImage
+        save_local: Also write the encoded images to the output folder
+        prompt: Prompt of the current execution, embedded in the PNGs
+        extra_pnginfo: Extra PNG info (workflow), embedded in the PNGs
+        project_id: Target project ID (defaults to the server-side setting)
+        compress_level: PNG compression level (0-9)
+
+    Returns:
+        The queued UploadJob
+
+    Raises:
+        ValueError: If no API key or project is configured
+    """
+    settings = get_settings_store().get()
+    project_id = project_id or settings["project_id"]
+    if not settings["api_key"]:
+        raise ValueError("Asset Manager has no API key configured on the server")
+    if not project_id:
+        raise ValueError("Asset Manager has no project configured on the server")
+
+    names = reserve_output_names(
+        filename_prefix, images.shape[2], images.shape[1], images.shape[0]
+    )
+    assets = [relative_path for relative_path, _ in names]
+    text = build_png_text(prompt, extra_pnginfo)
+    metadata = {
+        "node_upload": True,
+        "count": len(assets),
+        "workflow": (extra_pnginfo or {}).get("workflow"),
+        "prompt": prompt,
+    }
+
+    encoding = start_encoding(images, text, compress_level)
+    # Encoded sizes are not known yet; raw pixel bytes order jobs well enough
+    size = images.shape[0] * images.shape[1] * images.shape[2] * 3
+
+    def run(job):
+        job.progress.emit = lambda snapshot: notify_clients(
+            "asset-manager.upload_progress", snapshot
+        )
+        contents = [future.result() for future in encoding]
+        content_by_asset = dict(zip(assets, contents))
+        for asset, content in content_by_asset.items():
+            job.progress.add_file(asset, asset, len(content))
+
+        ledger = get_ledger()
+        hash_by_asset = {
+            asset: hashlib.sha256(content).hexdigest()
+            for asset, content in content_by_asset.items()
+        }
+
+        def on_file_status(asset_path, status, error=None):
+            if status == "success":
+                ledger.record_upload(hash_by_asset[asset_path], project_id, asset_path)
+            job.set_file_status(asset_path, status, error)
+            job.progress.set_file_status(asset_path, status, error)
+
+        result = batch_upload(
+            settings["api_key"],
+            settings,
+            assets,
+            project_id=project_id,
+            folder_id=project_id,
+            organization_id=settings["organization_id"],
+            metadata=metadata,
+            on_file_status=on_file_status,
+            cancel_event=job.cancel_event,
+            file_data=content_by_asset,
+            progress=job.progress,
+        )
+
+        if save_local:
+            for relative_path, full_path in names:
+                try:
+                    write_output_file(full_path, content_by_asset[relative_path])
+                    ledger.file_hash(relative_path, full_path)
+                except OSError as e:
+                    print(f"Warning: Could not save {relative_path}: {e}")
+
+        job.progress.flush()
+        notify_clients(
+            "asset-manager.upload_finished",
+            {"job_id": job.job_id, "automatic": True, "result": result},
+        )
+        return result
+
+    return upload_queue.submit(assets, run, priority=PRIORITY_AUTOMATIC, size=size)
+
+
+def configure_upload_bandwidth():
+    """
+    Apply the server-side bandwidth limit to all uploads
+    """
+    limit = get_settings_store().get()["upload_bandwidth_limit"]
+    upload_bandwidth.set_rate(max(0.0, limit) * 1024 * 1024)
+
+
+def configure_auto_upload():
+    """
+    Start or stop the output watcher to match the server-side settings
+    """
+    global _watcher
+
+    settings = get_settings_store().get()
+    enabled = (
+        settings["auto_upload"]
+        and settings["api_key"]
+        and settings["project_id"]
+    )
+
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.stop()
+            _watcher = None
+
+        if enabled:
+            _watcher = OutputWatcher(
+                lambda: get_index(folder_paths.get_output_directory()),
+                auto_upload_files,
+                poll_interval=settings["poll_interval"],
+                settle_seconds=settings["settle_seconds"],
+                on_poll=retry_deferred_uploads if settings["coordinate_uploads"] else None,
+            )
+            _watcher.start()
+
+
+def get_auto_upload_settings():
+    """
+    Get the server-side settings without exposing the API key
+
+    Returns:
+        Dictionary with the settings, has_api_key and watcher state
+    """
+    settings = get_settings_store().get()
+    settings["has_api_key"] = bool(settings.pop("api_key"))
+    settings["watcher_running"] = _watcher is not None and _watcher.running
+    settings["native_events"] = _watcher is not None and _watcher.native_events
+    with _deferred_lock:
+        settings["deferred_uploads"] = len(_deferred_uploads)
+    return {"status": "success", "settings": settings}
+
+
+def update_auto_upload_settings(values):
+    """
+    Update the server-side settings and restart the output watcher
+
+    Args:
+        values: Setting values to change (see settings_store.DEFAULT_SETTINGS)
+
+    Returns:
+        Status dictionary with the new settings
+    """
+    try:
+        lease_directory = values.get("lease_directory")
+        if lease_directory and not (
+            os.path.isabs(str(lease_directory)) and os.path.isdir(str(lease_directory))
+        ):
+            return {
+                "status": "error",
+                "message": "lease_directory must be the absolute path of an existing directory",
+            }
+
+        get_settings_store().update(values)
+        configure_upload_bandwidth()
+        configure_auto_upload()
+        return get_auto_upload_settings()
+
+    except Exception as e:
+        import traceback
+
+        traceback.print_exc()
+        return {"status": "error", "message": str(e)}
+
 
 def delete_image(image_path):
     """
@@ -240,10 +1114,84 @@ def delete_image(image_path):
         return {"status": "error", "message": str(e)}
 
 
-def get_organizations(api_key):
+def resolve_output_path(relative_path):
+    """
+    Resolve a path relative to the output folder
+
+    Args:
+        relative_path: Path with forward slashes
+
+    Returns:
+        Absolute path, or None if it points outside the output folder
+    """
+    output_dir = folder_paths.get_output_directory()
+    full_path = os.path.join(output_dir, relative_path.replace("/", os.sep))
+
+    real_output_dir = os.path.realpath(output_dir)
+    if not os.path.realpath(full_path).startswith(real_output_dir + os.sep):
+        return None
+    return full_path
+
+
+def get_thumbnail(relative_path, size=DEFAULT_THUMBNAIL_SIZE):
+    """
+    Get a cached preview of an image in the output folder
+
+    Resolves the path and stats files, so it runs in an executor; rendering
+    happens on the thumbnail pool.
+
+    Args:
+        relative_path: Path relative to the output dir
+        size: Longest side of the preview in pixels
+
+    Returns:
+        Future resolving to the path of the preview file
+
+    Raises:
+        ValueError: If the path is invalid or the file cannot be previewed
+    """
+    full_path = resolve_output_path(relative_path)
+    if full_path is None:
+        raise ValueError("Invalid file path - security violation")
+    if not can_thumbnail(full_path):
+        raise ValueError("No preview available for this file type")
+
+    cache = get_thumbnail_cache(os.path.join(get_data_directory(), "thumbnails"))
+    return cache.get(full_path, max(16, min(int(size), MAX_THUMBNAIL_SIZE)))
+
+
+# Organizations and projects rarely change; only successful responses are cached
+_account_cache = StaleWhileRevalidateCache(
+    ttl=300.0,
+    max_stale=24 * 3600.0,
+    is_cacheable=lambda result: result.get("status") == "success",
+)
+
+
+def invalidate_account_cache(api_key=None):
+    """
+    Drop cached organizations and projects
+
+    Args:
+        api_key: Only drop entries of this API key (optional)
+
+    Returns:
+        Number of removed entries
+    """
+    if not api_key:
+        return _account_cache.invalidate()
+
+    key_hash = hash_api_key(api_key)
+    return _account_cache.invalidate(lambda key: key[0] == key_hash)
+
+
+async def get_organizations(api_key):
     """
     Get list of organizations from external API
 
+    Responses are cached per API key (see _account_cache) and fetched with
+    the asyncio client, so the event loop is never blocked.
+
     Args:
         api_key: API authentication key
 
@@ -258,18 +1206,22 @@ def get_organizations(api_key):
                 "organizations": [],
             }
 
-        client = AssetManagerAPIClient(api_key=api_key)
-        result = client.get_organizations()
-        return result
+        return await _account_cache.get_async(
+            (hash_api_key(api_key), "organizations"),
+            lambda: get_async_client(api_key).get_organizations(),
+        )
 
     except Exception as e:
         return {"status": "error", "message": str(e), "organizations": []}
 
 
-def get_projects(api_key, organization_id=None):
+async def get_projects(api_key, organization_id=None):
     """
     Get list of projects for an organization from external API
 
+    Responses are cached per API key and organization (see _account_cache)
+    and fetched with the asyncio client.
+
     Args:
         api_key: API authentication key
         organization_id: Organization ID (optional)
@@ -281,9 +1233,10 @@ def get_projects(api_key, organization_id=None):
         if not api_key:
             return {"status": "error", "message": "API key is required", "projects": []}
 
-        client = AssetManagerAPIClient(api_key=api_key)
-        result = client.get_projects(organization_id=organization_id)
-        return result
+        return await _account_cache.get_async(
+            (hash_api_key(api_key), "projects", organization_id or ""),
+            lambda: get_async_client(api_key).get_projects(organization_id=organization_id),
+        )
 
     except Exception as e:
         return {"status": "error", "message": str(e), "projects": []}
@@ -296,16 +1249,215 @@ def register_routes(server):
     Args:
         server: ComfyUI PromptServer instance
     """
+    global _server
+
+    _server = server
+    if hasattr(server, "add_on_prompt_handler"):
+        server.add_on_prompt_handler(remember_prompt)
+
+    try:
+        configure_upload_bandwidth()
+        configure_auto_upload()
+    except Exception as e:
+        print(f"Warning: Could not start Asset Manager automatic upload: {e}")
+
+    async def respond_with_output_images(params):
+        try:
+            options = parse_listing_options(params)
+        except (TypeError, ValueError) as e:
+            return web.json_response(
+                {"status": "error", "message": f"Invalid parameter: {e}", "images": []}
+            )
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, lambda: get_output_images(**options)
+        )
+        return web.json_response(result)
 
     @server.routes.get("/asset-manager/get_output_images")
     async def api_get_output_images(request):
-        result = get_output_images()
+        return await respond_with_output_images(request.query)
+
+    @server.routes.post("/asset-manager/get_output_images")
+    async def api_post_output_images(request):
+        # POST accepts the same options plus an "exclude" list that is too
+        # long for a query string (e.g. paths already uploaded or hidden)
+        data = await request.json()
+        return await respond_with_output_images(data)
+
+    @server.routes.post("/asset-manager/get_output_images_stream")
+    async def api_stream_output_images(request):
+        # Newline-delimited JSON: {"type": "images", "images": [...]} lines
+        # while the folder is scanned, then one {"type": "done", ...} line
+        try:
+            options = parse_listing_options(await request.json())
+        except (TypeError, ValueError) as e:
+            return web.json_response({"status": "error", "message": f"Invalid parameter: {e}"})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        loop = asyncio.get_running_loop()
+        batches = asyncio.Queue()
+        listing = loop.run_in_executor(
+            None,
+            lambda: stream_output_images(
+                lambda images: loop.call_soon_threadsafe(batches.put_nowait, images),
+                **options,
+            ),
+        )
+        listing.add_done_callback(lambda _: batches.put_nowait(None))
+
+        finished = False
+        while not finished:
+            images = await batches.get()
+            if images is None:
+                break
+            # Send what arrived meanwhile in one line
+            while not batches.empty():
+                more = batches.get_nowait()
+                if more is None:
+                    finished = True
+                    break
+                images = images + more
+            line = json.dumps({"type": "images", "images": images}) + "\n"
+            await response.write(line.encode("utf-8"))
+
+        result = await listing
+        await response.write((json.dumps(dict(result, type="done")) + "\n").encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    @server.routes.get("/asset-manager/get_output_changes")
+    async def api_get_output_changes(request):
+        since = request.query.get("since", "")
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, get_output_changes, since)
         return web.json_response(result)
 
+    @server.routes.get("/asset-manager/thumbnail")
+    async def api_get_thumbnail(request):
+        relative_path = request.query.get("path", "")
+        size = request.query.get("size", DEFAULT_THUMBNAIL_SIZE)
+        loop = asyncio.get_running_loop()
+        try:
+            body = None
+            for _ in range(2):
+                future = await loop.run_in_executor(None, get_thumbnail, relative_path, size)
+                thumbnail_path = await asyncio.wrap_future(future)
+                try:
+                    body = await loop.run_in_executor(None, read_thumbnail, thumbnail_path)
+                    break
+                except FileNotFoundError:
+                    # Evicted by another render in between; the next lookup renders it again
+                    continue
+            if body is None:
+                return web.json_response(
+                    {"status": "error", "message": "Preview could not be cached"}
+                )
+        except FileNotFoundError:
+            return web.json_response({"status": "error", "message": "File not found"})
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)})
+
+        # The URL carries the file's mtime, so the preview never changes
+        return web.Response(
+            body=body,
+            headers={
+                "Content-Type": THUMBNAIL_CONTENT_TYPE,
+                "Cache-Control": "public, max-age=31536000, immutable",
+            },
+        )
+
     @server.routes.post("/asset-manager/upload_assets")
     async def api_upload_assets(request):
         data = await request.json()
-        result = upload_assets(data)
+        error = validate_upload_request(data)
+        if error:
+            return web.json_response(error)
+
+        # Sizing the job stats every file, keep that off the event loop
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(None, submit_upload_job, data)
+        return web.json_response(
+            {
+                "status": "queued",
+                "job_id": job.job_id,
+                "total": len(job.files),
+                "message": f"Queued {len(job.files)} assets for upload",
+            }
+        )
+
+    @server.routes.get("/asset-manager/upload_jobs")
+    async def api_list_upload_jobs(request):
+        jobs = [job.to_dict() for job in upload_queue.list_jobs()]
+        return web.json_response({"status": "success", "jobs": jobs})
+
+    @server.routes.get("/asset-manager/upload_jobs/{job_id}")
+    async def api_get_upload_job(request):
+        job = upload_queue.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response(
+                {"status": "error", "message": "Upload job not found"}
+            )
+        return web.json_response({"status": "success", "job": job.to_dict()})
+
+    @server.routes.get("/asset-manager/upload_jobs/{job_id}/progress")
+    async def api_get_upload_progress(request):
+        job = upload_queue.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response(
+                {"status": "error", "message": "Upload job not found"}
+            )
+        return web.json_response(
+            {
+                "status": "success",
+                "job_status": job.status,
+                "progress": job.progress.snapshot(),
+            }
+        )
+
+    @server.routes.post("/asset-manager/upload_jobs/{job_id}/cancel")
+    async def api_cancel_upload_job(request):
+        job_id = request.match_info["job_id"]
+        if upload_queue.cancel(job_id):
+            return web.json_response(
+                {"status": "success", "message": f"Cancelling upload job {job_id}"}
+            )
+        return web.json_response(
+            {"status": "error", "message": "Upload job not found or already finished"}
+        )
+
+    @server.routes.get("/asset-manager/uploaded_assets")
+    async def api_uploaded_assets(request):
+        project_id = request.query.get("project_id", "")
+        loop = asyncio.get_running_loop()
+        paths = await loop.run_in_executor(
+            None, lambda: get_ledger().uploaded_paths(project_id or None)
+        )
+        return web.json_response({"status": "success", "paths": paths})
+
+    @server.routes.post("/asset-manager/forget_uploads")
+    async def api_forget_uploads(request):
+        data = await request.json()
+        loop = asyncio.get_running_loop()
+        removed = await loop.run_in_executor(
+            None, lambda: get_ledger().forget(data.get("project_id") or None)
+        )
+        return web.json_response(
+            {"status": "success", "message": f"Forgot {removed} uploads"}
+        )
+
+    @server.routes.get("/asset-manager/auto_upload_settings")
+    async def api_get_auto_upload_settings(request):
+        return web.json_response(get_auto_upload_settings())
+
+    @server.routes.post("/asset-manager/auto_upload_settings")
+    async def api_update_auto_upload_settings(request):
+        data = await request.json()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, update_auto_upload_settings, data)
         return web.json_response(result)
 
     @server.routes.post("/asset-manager/delete_image")
@@ -318,12 +1470,29 @@ def register_routes(server):
     @server.routes.get("/asset-manager/get_organizations")
     async def api_get_organizations(request):
         api_key = request.query.get("api_key", "")
-        result = get_organizations(api_key)
+        result = await get_organizations(api_key)
         return web.json_response(result)
 
     @server.routes.get("/asset-manager/get_projects")
     async def api_get_projects(request):
         api_key = request.query.get("api_key", "")
         organization_id = request.query.get("organization_id", "")
-        result = get_projects(api_key, organization_id)
+        result = await get_projects(api_key, organization_id)
         return web.json_response(result)
+
+    @server.routes.get("/asset-manager/metrics")
+    async def api_get_metrics(request):
+        if request.query.get("format") == "json":
+            return web.json_response({"status": "success", "metrics": registry.to_dict()})
+        return web.Response(
+            text=registry.render_prometheus(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    @server.routes.post("/asset-manager/invalidate_cache")
+    async def api_invalidate_cache(request):
+        data = await request.json()
+        removed = invalidate_account_cache(data.get("api_key") or None)
+        return web.json_response(
+            {"status": "success", "message": f"Removed {removed} cached responses"}
+        )
@@ -0,0 +1,1274 @@
+"""
+Asyncio API client for Asset Manager
+Counterpart of AssetManagerAPIClient built on aiohttp, for code running on ComfyUI's event loop
+"""
+
+import asyncio
+import functools
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .api_client import (
+    ChunkSizePolicy,
+    PreparedMetadata,
+    build_direct_body,
+    build_direct_payload,
+    build_json_body,
+    build_resume_key,
+    get_asset_type,
+    plan_direct_uploads,
+    retry_delay,
+)
+from .metrics import bytes_uploaded, files_uploaded, request_retries, request_seconds
+from .response_cache import hash_api_key
+from .upload_io import (
+    READ_BLOCK_SIZE,
+    BytesWindow,
+    inflight_budget,
+    open_window,
+    upload_bandwidth,
+)
+
+
+# How often a part waiting for the shared byte budget checks it again
+POLL_INTERVAL = 0.05
+
+
+def run_blocking(func, *args):
+    """Run a blocking call (SQLite, disk, user callbacks) on the default executor"""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(None, functools.partial(func, *args))
+
+
+@asynccontextmanager
+async def reserve_budget(nbytes: int, stop_event: Optional[asyncio.Event] = None):
+    """
+    Reserve bytes in the process-wide in-flight budget without blocking the event loop
+
+    The budget is shared with the threaded client, so both together stay
+    within its limit.
+
+    Raises:
+        RuntimeError: If stop_event is set while waiting
+    """
+    while not inflight_budget.try_acquire(nbytes):
+        if stop_event is not None and stop_event.is_set():
+            raise RuntimeError("Stopped while waiting for upload memory budget")
+        await asyncio.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        inflight_budget.release(nbytes)
+
+
+def _read_block(window) -> bytes:
+    return bytes(window.read(READ_BLOCK_SIZE))
+
+
+async def iter_window(window):
+    """
+    Yield a window block by block, paced by the shared bandwidth limiter
+
+    File windows are read on the executor, so page faults on the mapping do
+    not stall the event loop. Time spent waiting for the limiter is added to
+    window.throttled_seconds, as the blocking throttle does for the threaded
+    client.
+    """
+    window.seek(0)
+    while True:
+        if isinstance(window, BytesWindow):
+            block = _read_block(window)
+        else:
+            block = await run_blocking(_read_block, window)
+        if not block:
+            break
+        delay = upload_bandwidth.reserve(len(block))
+        if delay > 0:
+            await asyncio.sleep(delay)
+            window.throttled_seconds += delay
+        yield block
+
+
+class AsyncAssetManagerAPIClient:
+    """Asyncio client for communicating with the Asset Manager API
+
+    Methods mirror AssetManagerAPIClient and return the same dictionaries.
+    All requests share one aiohttp ClientSession whose connector bounds
+    the number of open connections. Parts of a file and files of a batch
+    are uploaded as tasks on the running loop instead of worker threads.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = None,
+        part_concurrency: int = 4,
+        file_concurrency: int = 4,
+        pool_size: int = None,
+        resume_store=None,
+        max_resume_attempts: int = 3,
+        resume_max_age: float = 24 * 60 * 60,
+    ):
+        """
+        Initialize the API client
+
+        Args:
+            api_key: API authentication key
+            base_url: Base URL for the API (optional, can be set via config)
+            part_concurrency: Number of parts of one file uploaded at the same time
+            file_concurrency: Default number of files a batch uploads at the same time
+            pool_size: Connection limit of the session (defaults to enough for
+                file_concurrency x part_concurrency requests)
+            resume_store: Optional store for multipart state (see UploadLedger)
+                that lets failed or interrupted uploads resume
+            max_resume_attempts: Failed attempts before a saved upload is aborted
+            resume_max_age: Seconds before saved uploads are aborted
+        """
+        self.api_key = api_key
+        self.api_key_hash = hash_api_key(api_key)
+        self.base_url = base_url or "https://api.folders.nodehaus.io/api"
+        self.upload_base_url = "https://api.upload.nodehaus.io"
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "x-api-key": api_key,
+        }
+        self.timeout = 30
+        self.chunk_size = 10 * 1024 * 1024  #10MB chunks until throughput is measured
+        self.chunk_policy = ChunkSizePolicy()
+        self.part_concurrency = max(1, part_concurrency)
+        self.file_concurrency = max(1, file_concurrency)
+        self.pool_size = pool_size or self.file_concurrency * self.part_concurrency + 2
+        self.resume_store = resume_store
+        self.max_resume_attempts = max(1, max_resume_attempts)
+        self.resume_max_age = resume_max_age
+        self.max_retries = 4  # retries per create/part/complete request
+        self.backoff_base = 0.5  # seconds, doubled on every retry
+        self.backoff_max = 30.0  # seconds, also caps Retry-After
+        self.compress_requests = False  # gzip JSON bodies (backend must accept Content-Encoding)
+        self.metadata_by_reference = False  # send metadata once per batch, then only metadataHash
+        # See AssetManagerAPIClient for the direct upload options
+        self.direct_upload_threshold = 0
+        self.direct_upload_max_files = 16
+        self.direct_upload_max_bytes = 8 * 1024 * 1024
+        self.direct_upload_supported = True
+
+        self._session = None
+        self._session_loop = None
+        self._active = 0  # calls in progress, see _in_use
+        self._retired = False  # close once the last call finishes
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session, created on first use in the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if self._session is not None and not self._session.closed:
+                _close_session(self._session, self._session_loop)
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Close pooled connections held by this client"""
+        session, self._session = self._session, None
+        if session is None or session.closed:
+            return
+        if self._session_loop is asyncio.get_running_loop():
+            await session.close()
+        else:
+            _close_session(session, self._session_loop)
+
+    async def retire(self):
+        """Close the client once the calls still using it have finished"""
+        self._retired = True
+        if self._active == 0:
+            await self.close()
+
+    @asynccontextmanager
+    async def _in_use(self):
+        """Count a call as in progress, so retire() does not close its session"""
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._retired and self._active == 0:
+                await self.close()
+
+    async def get_organizations(self) -> Dict:
+        """
+        Fetch list of organizations from API
+
+        Returns:
+            Dictionary containing status and organizations list
+        """
+        try:
+            url = f"{self.base_url}/organizations"
+
+            async with self._in_use(), self.session.get(
+                url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    if data.get("success") and data.get("organizations"):
+                        return {
+                            "status": "success",
+                            "organizations": data.get("organizations", []),
+                        }
+                    else:
+                        return {
+                            "status": "error",
+                            "message": data.get("error", "Failed to load organizations"),
+                            "organizations": [],
+                        }
+                else:
+                    return {
+                        "status": "error",
+                        "message": f"HTTP error! status: {response.status}",
+                        "organizations": [],
+                    }
+
+        except Exception as e:
+            return {"status": "error", "message": str(e) or repr(e), "organizations": []}
+
+    async def get_projects(self, organization_id: str = None) -> Dict:
+        """
+        Fetch list of projects for an organization
+
+        Args:
+            organization_id: Organization ID (optional)
+
+        Returns:
+            Dictionary containing status and projects list
+        """
+        try:
+            url = f"{self.base_url}/projects"
+
+            params = {}
+            if organization_id:
+                params["organization_id"] = organization_id
+
+            async with self._in_use(), self.session.get(
+                url,
+                headers=self.headers,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    if data.get("success") and data.get("folders"):
+                        return {"status": "success", "projects": data.get("folders", [])}
+                    else:
+                        return {
+                            "status": "error",
+                            "message": data.get("error", "Failed to load projects"),
+                            "projects": [],
+                        }
+                else:
+                    return {
+                        "status": "error",
+                        "message": f"HTTP error! status: {response.status}",
+                        "projects": [],
+                    }
+
+        except Exception as e:
+            return {"status": "error", "message": str(e) or repr(e), "projects": []}
+
+    async def upload_asset(
+        self,
+        file_path: str,
+        project_id: str,
+        folder_id: str = None,
+        organization_id: str = None,
+        metadata=None,
+        data: bytes = None,
+        progress=None,
+    ) -> Dict:
+        """
+        Upload a single asset using multipart upload
+
+        Args:
+            file_path: Path to the file to upload
+            project_id: Target project ID
+            folder_id: Target folder ID (defaults to project_id if not provided)
+            organization_id: Organization ID
+            metadata: Optional metadata dictionary (ComfyUI workflow JSON) or
+                PreparedMetadata shared by a batch
+            data: Optional in-memory file content. file_path then only names
+                the asset, and the upload cannot be resumed.
+            progress: Optional UploadProgress receiving part and byte progress,
+                keyed by file_path
+
+        Returns:
+            Dictionary containing upload status and result
+        """
+        async with self._in_use():
+            return await self._upload_asset(
+                file_path, project_id, folder_id, organization_id, metadata, data, progress
+            )
+
+    async def _upload_asset(
+        self,
+        file_path: str,
+        project_id: str,
+        folder_id: str = None,
+        organization_id: str = None,
+        metadata=None,
+        data: bytes = None,
+        progress=None,
+    ) -> Dict:
+        if not isinstance(metadata, PreparedMetadata):
+            metadata = PreparedMetadata(metadata)
+        transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+        store = self.resume_store
+
+        upload_id = None
+        key = None
+        resume_key = None
+        resumed = False
+
+        try:
+            file_size = len(data) if data is not None else os.path.getsize(file_path)
+            filename = os.path.basename(file_path)
+            asset_type, content_type = get_asset_type(file_path)
+
+            completed_parts = {}
+            chunk_size = self.chunk_policy.part_size(
+                file_size, self.chunk_size, self.part_concurrency
+            )
+            if store is not None and data is None:
+                resume_key = build_resume_key(file_path, project_id, folder_id, self.api_key_hash)
+                state = await run_blocking(store.load_multipart, resume_key)
+                if state and time.time() - state["created_at"] > self.resume_max_age:
+                    await self._abort_upload(state["upload_id"], state["key"])
+                    await run_blocking(store.delete_multipart, resume_key)
+                    state = None
+                if state:
+                    upload_id = state["upload_id"]
+                    key = state["key"]
+                    chunk_size = state["chunk_size"]
+                    completed_parts = state["parts"]
+                    resumed = True
+
+            if upload_id is None:
+                create_payload = {
+                    "organizationId": organization_id,
+                    "projectId": project_id,
+                    "platform": "comfyui",
+                    "fileName": filename,
+                    "fileSize": file_size,
+                    "contentType": content_type,
+                    "type": asset_type,
+                    "title": f"comfyui_{filename}",
+                    "folderId": folder_id or project_id,
+                }
+                if self.metadata_by_reference:
+                    create_payload["metadataHash"] = metadata.sha256
+                    # begin_inline waits while another file sends the metadata
+                    inline = await run_blocking(metadata.begin_inline)
+                    sent = False
+                    try:
+                        create_result = await self._post_json(
+                            f"{self.upload_base_url}/api/upload/create",
+                            create_payload,
+                            metadata if inline else None,
+                            transfer,
+                        )
+                        sent = True
+                    finally:
+                        if inline:
+                            metadata.end_inline(sent)
+                else:
+                    create_result = await self._post_json(
+                        f"{self.upload_base_url}/api/upload/create",
+                        create_payload,
+                        metadata,
+                        transfer,
+                    )
+                upload_id = create_result["uploadId"]
+                key = create_result["key"]
+
+                if resume_key:
+                    await run_blocking(
+                        store.save_multipart,
+                        resume_key,
+                        upload_id,
+                        key,
+                        chunk_size,
+                        self.api_key_hash,
+                    )
+
+            on_part = None
+            if resume_key:
+                on_part = lambda part: run_blocking(
+                    store.add_part, resume_key, part["partNumber"], part["etag"]
+                )
+
+            parts = await self._upload_parts(
+                file_path if data is None else data,
+                file_size,
+                upload_id,
+                key,
+                chunk_size,
+                completed_parts,
+                on_part,
+                progress,
+                file_path,
+            )
+
+            complete_payload = {
+                "uploadId": upload_id,
+                "key": key,
+                "parts": parts,
+                "type": asset_type,
+                "title": f"comfyui_{filename}",
+                "folderId": folder_id or project_id,
+                "organizationId": organization_id,
+                "projectId": project_id,
+                "platform": "comfyui",
+            }
+            complete_metadata = None
+            if self.metadata_by_reference:
+                complete_payload["metadataHash"] = metadata.sha256
+            else:
+                # complete has always sent {} rather than null without metadata
+                complete_metadata = metadata if metadata.present else PreparedMetadata({})
+            complete_result = await self._post_json(
+                f"{self.upload_base_url}/api/upload/complete",
+                complete_payload,
+                complete_metadata,
+                transfer,
+            )
+
+            if resume_key:
+                await run_blocking(store.delete_multipart, resume_key)
+
+            return {
+                "status": "success",
+                "message": f"Successfully uploaded {filename}",
+                "data": complete_result,
+                "route": "multipart",
+                "resumed_parts": len(completed_parts),
+                "chunk_size": chunk_size,
+                "throughput": self.chunk_policy.throughput,
+                "transfer": transfer,
+            }
+
+        except Exception as e:
+            if resumed and _is_missing_upload(e):
+                # The backend no longer knows the saved upload, start over
+                await run_blocking(store.delete_multipart, resume_key)
+                return await self._upload_asset(
+                    file_path,
+                    project_id,
+                    folder_id,
+                    organization_id,
+                    metadata,
+                    progress=progress,
+                )
+
+            message = f"Upload failed: {str(e) or repr(e)}"
+            retryable = is_retryable_error(e)
+            if upload_id and key:
+                # Fatal errors (401, other 4xx) would fail again, so only
+                # transient failures keep the upload for resuming
+                if resume_key and retryable and await self._keep_for_resume(resume_key):
+                    message += " (progress saved, retry to resume)"
+                else:
+                    await self._abort_upload(upload_id, key)
+                    if resume_key:
+                        await run_blocking(store.delete_multipart, resume_key)
+
+            import traceback
+
+            traceback.print_exc()
+            return {
+                "status": "error",
+                "message": message,
+                "retryable": retryable,
+                "transfer": transfer,
+            }
+
+    async def _post_json(
+        self,
+        url: str,
+        payload: Dict,
+        metadata: Optional[PreparedMetadata],
+        transfer: Dict,
+    ) -> Dict:
+        """
+        POST a JSON body, splicing in pre-serialized metadata (see build_json_body)
+
+        Returns:
+            Parsed JSON response
+        """
+        body, headers = build_json_body(payload, metadata, transfer, self.compress_requests)
+        headers["x-api-key"] = self.api_key
+        result, _ = await self._request("POST", url, headers, body=body)
+        return result
+
+    async def _upload_direct(
+        self,
+        files: List[Tuple[str, bytes]],
+        project_id: str,
+        folder_id: str = None,
+        organization_id: str = None,
+        metadata: PreparedMetadata = None,
+        progress=None,
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Upload small files in a single request to /api/upload/direct
+
+        The request is not idempotent, so it is sent once without retries
+        (see AssetManagerAPIClient._upload_direct).
+
+        Returns:
+            Tuple of (one result dictionary per file, JSON/metadata byte counts)
+
+        Raises:
+            Exception: If the request itself failed
+        """
+        transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+        route = "single" if len(files) == 1 else "batch"
+        total_bytes = sum(len(content) for _, content in files)
+        payload = build_direct_payload(files, project_id, folder_id, organization_id)
+
+        if progress is not None:
+            for file_path, content in files:
+                progress.file_started(file_path, len(content), 1)
+
+        inline = True
+        if self.metadata_by_reference:
+            payload["metadataHash"] = metadata.sha256
+            inline = await run_blocking(metadata.begin_inline)
+        sent = False
+        try:
+            body, headers = build_direct_body(
+                files, payload, metadata if inline else None, transfer
+            )
+            headers["x-api-key"] = self.api_key
+            headers["Content-Length"] = str(len(body))
+            async with reserve_budget(total_bytes):
+                with open_window(body, 0, len(body)) as window:
+                    response, _ = await self._request(
+                        "POST",
+                        f"{self.upload_base_url}/api/upload/direct",
+                        headers,
+                        window=window,
+                        timeout=aiohttp.ClientTimeout(
+                            sock_connect=self.timeout,
+                            sock_read=self.chunk_policy.part_timeout(total_bytes, self.timeout),
+                        ),
+                        max_retries=0,
+                    )
+            sent = True
+        finally:
+            if self.metadata_by_reference and inline:
+                metadata.end_inline(sent)
+
+        file_results = []
+        results = response.get("results") or []
+        for number, (file_path, content) in enumerate(files):
+            result = results[number] if number < len(results) else {}
+            if result.get("success"):
+                bytes_uploaded.inc(len(content))
+                if progress is not None:
+                    progress.bytes_sent(file_path, len(content))
+                    progress.part_done(file_path)
+                file_results.append(
+                    {
+                        "status": "success",
+                        "message": f"Successfully uploaded {os.path.basename(file_path)}",
+                        "data": result,
+                        "route": route,
+                    }
+                )
+            else:
+                file_results.append(
+                    {
+                        "status": "error",
+                        "message": f"Upload failed: {result.get('error', 'No result returned')}",
+                        "route": route,
+                    }
+                )
+        return file_results, transfer
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict,
+        body: bytes = None,
+        window=None,
+        timeout: aiohttp.ClientTimeout = None,
+        stop_event: Optional[asyncio.Event] = None,
+        max_retries: int = None,
+    ) -> Tuple[Dict, float]:
+        """
+        Send a request, retrying transient failures with jittered exponential backoff
+
+        Timeouts, connection errors, 408, 429 and 5xx responses are retried up
+        to max_retries times, honoring Retry-After. Other errors raise at once.
+        Every attempt is recorded in the request latency histogram.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            headers: Request headers
+            body: Request body bytes
+            window: Window streamed block by block instead of body; headers
+                must carry its Content-Length
+            timeout: Request timeout (defaults to self.timeout in total)
+            stop_event: Optional event that ends waiting for a retry early
+            max_retries: Retries for this request (defaults to self.max_retries;
+                0 for requests that are not idempotent)
+
+        Returns:
+            Tuple of (parsed JSON response, seconds the successful attempt took
+            without time the body spent waiting for the bandwidth limiter)
+        """
+        stage = url.rstrip("/").rsplit("/", 1)[-1]
+        timeout = timeout or aiohttp.ClientTimeout(total=self.timeout)
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            attempt_started = time.monotonic()
+            throttled_before = getattr(window, "throttled_seconds", 0.0)
+            with request_seconds.time(stage=stage, outcome="error") as labels:
+                try:
+                    async with self.session.request(
+                        method,
+                        url,
+                        headers=headers,
+                        data=body if window is None else iter_window(window),
+                        timeout=timeout,
+                    ) as response:
+                        response.raise_for_status()
+                        result = await response.json(content_type=None)
+                    labels["outcome"] = "success"
+                    return result, (
+                        time.monotonic()
+                        - attempt_started
+                        - (getattr(window, "throttled_seconds", 0.0) - throttled_before)
+                    )
+                except Exception as e:
+                    if attempt >= max_retries or not is_retryable_error(e):
+                        raise
+                    error_headers = getattr(e, "headers", None) or {}
+                    delay = retry_delay(
+                        attempt,
+                        error_headers.get("Retry-After"),
+                        self.backoff_base,
+                        self.backoff_max,
+                    )
+
+            attempt += 1
+            request_retries.inc(stage=stage)
+            if stop_event is None:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await asyncio.wait_for(stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                continue
+            raise RuntimeError("Retry stopped after another part failed")
+
+    async def _keep_for_resume(self, resume_key: str) -> bool:
+        """
+        Record a failed attempt and decide whether to keep the upload for resuming
+
+        Returns:
+            True while fewer than max_resume_attempts attempts have failed
+        """
+        attempts = await run_blocking(self.resume_store.record_failure, resume_key)
+        return attempts < self.max_resume_attempts
+
+    async def _abort_upload(self, upload_id: str, key: str):
+        try:
+            with request_seconds.time(stage="abort", outcome="error") as labels:
+                async with self.session.post(
+                    f"{self.upload_base_url}/api/upload/abort",
+                    headers={
+                        "Content-Type": "application/json",
+                        "x-api-key": self.api_key,
+                    },
+                    json={"uploadId": upload_id, "key": key},
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                ) as response:
+                    if response.ok:
+                        labels["outcome"] = "success"
+        except Exception as abort_error:
+            pass
+
+    async def abort_expired_uploads(self) -> int:
+        """
+        Abort saved multipart uploads of this API key older than resume_max_age
+
+        Returns:
+            Number of aborted uploads
+        """
+        store = self.resume_store
+        if store is None:
+            return 0
+
+        expired = await run_blocking(
+            store.expired_multipart, self.resume_max_age, self.api_key_hash
+        )
+        for state in expired:
+            await self._abort_upload(state["upload_id"], state["key"])
+            await run_blocking(store.delete_multipart, state["resume_key"])
+        return len(expired)
+
+    async def _upload_part(
+        self,
+        source,
+        file_size: int,
+        part_number: int,
+        upload_id: str,
+        key: str,
+        chunk_size: int,
+        stop_event: asyncio.Event,
+        on_part=None,
+        on_read=None,
+    ) -> Dict:
+        """
+        Upload a single part of a multipart upload
+
+        The part is streamed block by block from a memory-mapped window of the
+        file (or a slice of in-memory content) with an explicit Content-Length,
+        and its bytes count against the process-wide in-flight budget while it
+        is sent.
+
+        Args:
+            source: File path, or bytes-like object with the file content
+            on_part: Optional coroutine function awaited with the uploaded part
+            on_read: Optional callback(nbytes) for part bytes as they are sent
+
+        Returns:
+            Dictionary with partNumber and etag of the uploaded part
+        """
+        if stop_event.is_set():
+            raise RuntimeError(f"Part {part_number} skipped after another part failed")
+
+        offset = (part_number - 1) * chunk_size
+        length = min(chunk_size, file_size - offset)
+
+        async with reserve_budget(length, stop_event):
+            window = await run_blocking(open_window, source, offset, length, on_read)
+            with window:
+                part_result, transfer_seconds = await self._request(
+                    "POST",
+                    f"{self.upload_base_url}/api/upload/part",
+                    {
+                        "x-api-key": self.api_key,
+                        "X-Upload-Id": upload_id,
+                        "X-Part-Number": str(part_number),
+                        "X-Key": key,
+                        # A known length avoids chunked transfer encoding
+                        "Content-Length": str(length),
+                    },
+                    window=window,
+                    timeout=aiohttp.ClientTimeout(
+                        sock_connect=self.timeout,
+                        sock_read=self.chunk_policy.part_timeout(length, self.timeout),
+                    ),
+                    stop_event=stop_event,
+                )
+                self.chunk_policy.record(length, transfer_seconds)
+        bytes_uploaded.inc(length)
+
+        part = {"partNumber": part_result["partNumber"], "etag": part_result["etag"]}
+
+        if on_part is not None:
+            await on_part(part)
+        return part
+
+    async def _upload_parts(
+        self,
+        source,
+        file_size: int,
+        upload_id: str,
+        key: str,
+        chunk_size: int,
+        completed_parts: Optional[Dict[int, str]] = None,
+        on_part=None,
+        progress=None,
+        progress_key: str = None,
+    ) -> List[Dict]:
+        """
+        Upload all missing parts of a file with up to part_concurrency parts in flight
+
+        The first failing part stops the remaining ones and its exception is raised.
+
+        Args:
+            source: File path, or bytes-like object with the file content
+            completed_parts: Already uploaded parts as {partNumber: etag}
+            on_part: Optional coroutine function awaited with each newly uploaded part
+            progress: Optional UploadProgress receiving part and byte progress
+            progress_key: File key reported to progress
+
+        Returns:
+            List of parts ordered by partNumber
+        """
+        completed_parts = completed_parts or {}
+        part_count = math.ceil(file_size / chunk_size)
+        parts = [
+            {"partNumber": part_number, "etag": etag}
+            for part_number, etag in completed_parts.items()
+            if part_number <= part_count
+        ]
+        missing = [
+            part_number
+            for part_number in range(1, part_count + 1)
+            if part_number not in completed_parts
+        ]
+        if progress is not None:
+            progress.file_started(
+                progress_key,
+                file_size,
+                part_count,
+                part_count - len(missing),
+                file_size - sum(
+                    min(chunk_size, file_size - (part_number - 1) * chunk_size)
+                    for part_number in missing
+                ),
+            )
+        if not missing:
+            return sorted(parts, key=lambda part: part["partNumber"])
+
+        on_read = None
+        part_callback = on_part
+        if progress is not None:
+            on_read = lambda nbytes: progress.bytes_sent(progress_key, nbytes)
+
+            async def part_callback(part):
+                progress.part_done(progress_key)
+                if on_part is not None:
+                    await on_part(part)
+
+        stop_event = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.part_concurrency)
+
+        async def upload(part_number):
+            async with semaphore:
+                return await self._upload_part(
+                    source,
+                    file_size,
+                    part_number,
+                    upload_id,
+                    key,
+                    chunk_size,
+                    stop_event,
+                    part_callback,
+                    on_read,
+                )
+
+        tasks = [asyncio.ensure_future(upload(part_number)) for part_number in missing]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+
+            failed = [
+                task for task in tasks if task in done and not task.cancelled() and task.exception()
+            ]
+            if failed:
+                stop_event.set()
+                raise failed[0].exception()
+
+            parts.extend(task.result() for task in tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        parts.sort(key=lambda part: part["partNumber"])
+        return parts
+
+    async def batch_upload_assets(
+        self,
+        file_paths: List[str],
+        project_id: str,
+        folder_id: str = None,
+        organization_id: str = None,
+        metadata=None,
+        max_concurrent_files: int = None,
+        on_file_status: Optional[Callable[[str, str, Optional[str]], None]] = None,
+        cancel_event=None,
+        file_data: Optional[Dict[str, bytes]] = None,
+        progress=None,
+    ) -> Dict:
+        """
+        Upload multiple assets with up to max_concurrent_files files in flight
+
+        Small files are grouped into direct upload requests as in
+        AssetManagerAPIClient.batch_upload_assets.
+
+        Args:
+            file_paths: List of file paths to upload
+            project_id: Target project ID
+            folder_id: Target folder ID (defaults to project_id if not provided)
+            organization_id: Organization ID
+            metadata: Optional metadata dictionary, serialized once for the whole batch
+            max_concurrent_files: Files uploaded at the same time (defaults to file_concurrency)
+            on_file_status: Optional callback(file_path, status, error) for per-file
+                state changes, called on the executor since it may block
+            cancel_event: Optional asyncio or threading event; files not started
+                yet are skipped once it is set
+            file_data: Optional in-memory content by file path, uploaded instead
+                of reading those files from disk
+            progress: Optional UploadProgress receiving part and byte progress,
+                keyed by file path
+
+        Returns:
+            Dictionary containing batch upload status, results, per-file timing
+            and route, file counts per route, and JSON/metadata byte counts
+        """
+        async with self._in_use():
+            return await self._batch_upload_assets(
+                file_paths,
+                project_id,
+                folder_id,
+                organization_id,
+                metadata,
+                max_concurrent_files,
+                on_file_status,
+                cancel_event,
+                file_data,
+                progress,
+            )
+
+    async def _batch_upload_assets(
+        self,
+        file_paths: List[str],
+        project_id: str,
+        folder_id: str = None,
+        organization_id: str = None,
+        metadata=None,
+        max_concurrent_files: int = None,
+        on_file_status=None,
+        cancel_event=None,
+        file_data: Optional[Dict[str, bytes]] = None,
+        progress=None,
+    ) -> Dict:
+        if not isinstance(metadata, PreparedMetadata):
+            metadata = PreparedMetadata(metadata)
+
+        results = {
+            "status": "success",
+            "total": len(file_paths),
+            "successful": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "errors": [],
+            "files": [],
+        }
+        file_results = [None] * len(file_paths)
+        transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+        batch_started = time.monotonic()
+
+        try:
+            await self.abort_expired_uploads()
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+
+        async def notify(file_path, status, error=None):
+            if on_file_status is None:
+                return
+            try:
+                await run_blocking(on_file_status, file_path, status, error)
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
+
+        async def cancelled(indices):
+            if cancel_event is None or not cancel_event.is_set():
+                return False
+            for index in indices:
+                file_results[index] = {
+                    "file": file_paths[index],
+                    "status": "cancelled",
+                    "seconds": 0.0,
+                }
+                await notify(file_paths[index], "cancelled")
+            return True
+
+        def add_transfer(counts):
+            for name, value in counts.items():
+                transfer[name] += value
+
+        async def record(index, result, file_started):
+            file_path = file_paths[index]
+            entry = {
+                "file": file_path,
+                "status": result["status"],
+                "route": result.get("route", "multipart"),
+                "seconds": round(time.monotonic() - file_started, 3),
+            }
+            if result["status"] != "success":
+                entry["error"] = result.get("message", "Unknown error")
+            files_uploaded.inc(outcome=entry["status"])
+            file_results[index] = entry
+            await notify(file_path, entry["status"], entry.get("error"))
+
+        def read_files(indices):
+            files = []
+            for index in indices:
+                data = (file_data or {}).get(file_paths[index])
+                if data is None:
+                    with open(file_paths[index], "rb") as f:
+                        data = f.read()
+                files.append((file_paths[index], data))
+            return files
+
+        async def upload_one(index):
+            if await cancelled([index]):
+                return
+
+            file_path = file_paths[index]
+            await notify(file_path, "uploading")
+            file_started = time.monotonic()
+            result = await self.upload_asset(
+                file_path,
+                project_id,
+                folder_id,
+                organization_id,
+                metadata,
+                data=(file_data or {}).get(file_path),
+                progress=progress,
+            )
+            add_transfer(result.get("transfer", {}))
+            await record(index, result, file_started)
+
+        async def upload_group(indices):
+            if await cancelled(indices):
+                return
+
+            if self.direct_upload_supported:
+                for index in indices:
+                    await notify(file_paths[index], "uploading")
+                group_started = time.monotonic()
+                try:
+                    files = await run_blocking(read_files, indices)
+                    group_results, counts = await self._upload_direct(
+                        files, project_id, folder_id, organization_id, metadata, progress
+                    )
+                except Exception as e:
+                    if _is_unsupported_route(e):
+                        if self.direct_upload_supported:
+                            self.direct_upload_supported = False
+                            print(
+                                "Warning: Direct uploads are not supported by the API, "
+                                "using multipart uploads"
+                            )
+                    elif _was_not_stored(e):
+                        print(
+                            f"Warning: Direct upload failed, retrying with multipart uploads: {e}"
+                        )
+                    else:
+                        # The server may have stored the files; uploading them
+                        # again could store them twice
+                        for index in indices:
+                            await record(
+                                index,
+                                {
+                                    "status": "error",
+                                    "message": f"Direct upload failed: {str(e) or repr(e)}",
+                                    "route": "single" if len(indices) == 1 else "batch",
+                                },
+                                group_started,
+                            )
+                        return
+                else:
+                    add_transfer(counts)
+                    for index, result in zip(indices, group_results):
+                        await record(index, result, group_started)
+                    return
+
+            for index in indices:
+                await upload_one(index)
+
+        groups, multipart = [], list(range(len(file_paths)))
+        if self.direct_upload_threshold and self.direct_upload_supported:
+            groups, multipart = await run_blocking(
+                plan_direct_uploads,
+                file_paths,
+                file_data,
+                self.direct_upload_threshold,
+                self.direct_upload_max_files,
+                self.direct_upload_max_bytes,
+            )
+
+        semaphore = asyncio.Semaphore(
+            max(1, min(max_concurrent_files or self.file_concurrency, len(file_paths) or 1))
+        )
+
+        async def limited(upload, *args):
+            async with semaphore:
+                await upload(*args)
+
+        await asyncio.gather(
+            *(limited(upload_group, group) for group in groups),
+            *(limited(upload_one, index) for index in multipart),
+        )
+
+        for entry in file_results:
+            results["files"].append(entry)
+            if entry["status"] == "success":
+                results["successful"] += 1
+            elif entry["status"] == "cancelled":
+                results["cancelled"] += 1
+            else:
+                results["failed"] += 1
+                results["errors"].append(
+                    {"file": entry["file"], "error": entry.get("error", "Unknown error")}
+                )
+
+        if results["failed"] > 0 or results["cancelled"] > 0:
+            results["status"] = "partial"
+
+        routes = {}
+        for entry in file_results:
+            if entry["status"] != "cancelled":
+                routes[entry["route"]] = routes.get(entry["route"], 0) + 1
+        results["routes"] = routes
+
+        # Before metadata was prepared per batch, every file sent it twice
+        attempted = len(file_paths) - results["cancelled"]
+        transfer["metadata_bytes_saved"] = max(
+            0, 2 * metadata.size * attempted - transfer["metadata_bytes"]
+        )
+        transfer["compression_bytes_saved"] = (
+            transfer["json_bytes_uncompressed"] - transfer["json_bytes"]
+        )
+        results["transfer"] = transfer
+
+        results["seconds"] = round(time.monotonic() - batch_started, 3)
+        results["message"] = (
+            f"Uploaded {results['successful']}/{results['total']} assets successfully"
+        )
+
+        return results
+
+    async def test_connection(self) -> Dict:
+        """
+        Test the API connection
+
+        Returns:
+            Dictionary containing connection test result
+        """
+        try:
+            url = f"{self.base_url}/health"
+
+            async with self._in_use(), self.session.get(
+                url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                if response.status == 200:
+                    return {"status": "success", "message": "API connection successful"}
+                else:
+                    return {
+                        "status": "error",
+                        "message": f"API returned status code {response.status}",
+                    }
+
+        except Exception as e:
+            return {"status": "error", "message": f"Connection failed: {str(e) or repr(e)}"}
+
+
+def _close_session(session: aiohttp.ClientSession, loop):
+    """
+    Close a session created on another event loop
+
+    The close is scheduled on that loop while it still runs. A session of a
+    loop that has stopped can no longer be closed and is left to the
+    garbage collector.
+    """
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Classify an aiohttp error as transient (worth retrying) or fatal
+
+    Timeouts, connection errors, 408, 429 and 5xx responses other than 501
+    are transient; 401, 403, 501 and other 4xx responses are fatal.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in (408, 429) or (error.status >= 500 and error.status != 501)
+
+    return isinstance(
+        error,
+        (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError),
+    )
+
+
+def _was_not_stored(error: Exception) -> bool:
+    """
+    Check whether a failed request certainly did not reach the server
+
+    Only failed connection attempts and 4xx responses qualify.
+    """
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return True
+    return isinstance(error, aiohttp.ClientResponseError) and 400 <= error.status < 500
+
+
+def _is_unsupported_route(error: Exception) -> bool:
+    """
+    Check whether an error means the backend does not offer an endpoint
+    """
+    return isinstance(error, aiohttp.ClientResponseError) and error.status in (404, 405, 501)
+
+
+def _is_missing_upload(error: Exception) -> bool:
+    """
+    Check whether an error means the backend no longer knows a multipart upload
+    """
+    return isinstance(error, aiohttp.ClientResponseError) and error.status in (404, 410)
+
+
+_async_client_cache = OrderedDict()
+ASYNC_CLIENT_CACHE_SIZE = 8
+
+
+def get_async_client(api_key: str, resume_store=None) -> AsyncAssetManagerAPIClient:
+    """
+    Get a pooled asyncio API client for an API key
+
+    Clients are cached per API key so repeated calls share one session and
+    its keep-alive connections. Must be called on the event loop. Once more
+    than ASYNC_CLIENT_CACHE_SIZE keys are cached, the least recently used
+    client is dropped and closed after the calls still using it finish.
+
+    Args:
+        api_key: API authentication key
+        resume_store: Optional multipart state store to attach to the client
+
+    Returns:
+        Cached AsyncAssetManagerAPIClient for the key
+    """
+    client = _async_client_cache.get(api_key)
+    if client is not None:
+        _async_client_cache.move_to_end(api_key)
+        if resume_store is not None:
+            client.resume_store = resume_store
+        return client
+
+    client = AsyncAssetManagerAPIClient(api_key=api_key, resume_store=resume_store)
+    _async_client_cache[api_key] = client
+
+    while len(_async_client_cache) > ASYNC_CLIENT_CACHE_SIZE:
+        _, evicted = _async_client_cache.popitem(last=False)
+        asyncio.ensure_future(evicted.retire())
+
+    return client
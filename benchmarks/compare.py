@@ -0,0 +1,68 @@
+"""
+Compare two benchmark result files written by run.py
+
+Usage:
+
+    python benchmarks/compare.py baseline.json current.json --threshold 10
+
+Exits with status 1 when a measurement got slower by more than threshold percent.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+
+def iter_measurements(report: Dict) -> Iterator[Tuple[str, float]]:
+    """
+    Yield (name, seconds) for every median timing in a report; lower is better
+    """
+    results = report.get("results", {})
+    for case in results.get("upload", []):
+        name = (
+            f"upload size={case['file_size']} files={case['files']} "
+            f"parts={case['part_concurrency']} concurrent_files={case['file_concurrency']}"
+        )
+        yield name, case["seconds"]["median"]
+    for case in results.get("listing", []):
+        for timing in ("cold_seconds", "cached_seconds", "rescan_seconds"):
+            name = f"listing files={case['files']} depth={case['depth']} {timing[:-8]}"
+            yield name, case[timing]["median"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare Asset Manager benchmark results")
+    parser.add_argument("baseline", help="Result file to compare against")
+    parser.add_argument("current", help="New result file")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="Percent slowdown reported as regression"
+    )
+    options = parser.parse_args(argv)
+
+    with open(options.baseline, encoding="utf-8") as f:
+        baseline = dict(iter_measurements(json.load(f)))
+    with open(options.current, encoding="utf-8") as f:
+        current = dict(iter_measurements(json.load(f)))
+
+    regressions = 0
+    for name, seconds in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"  new   {name}: {seconds:.4f}s")
+            continue
+        change = (seconds - before) / before * 100 if before else 0.0
+        marker = "  "
+        if change > options.threshold:
+            marker = "!!"
+            regressions += 1
+        print(f"{marker} {change:+6.1f}% {name}: {before:.4f}s -> {seconds:.4f}s")
+
+    if regressions:
+        print(f"{regressions} measurements regressed by more than {options.threshold:g}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Benchmark runner for Asset Manager
+Measures upload throughput against the local stand-in API and output folder
+listing time against synthetic output trees, and writes the results as JSON
+
+Usage (from the ComfyUI directory, so folder_paths can be imported):
+
+    python custom_nodes/ComfyUI-Lumin-Upload/benchmarks/run.py --output results.json
+
+Compare two result files with benchmarks/compare.py.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from typing import Dict, List
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from stub_server import StubAPIServer  # noqa: E402
+
+
+# Modules are imported under this name without running the package __init__,
+# which registers routes on a running ComfyUI server
+PACKAGE_NAME = "asset_manager_bench"
+RESULTS_VERSION = 1
+MIB = 1024 * 1024
+LISTING_EXTENSIONS = (".png", ".jpg", ".webp", ".mp4", ".json")
+
+
+def load_module(name: str):
+    """Import a module of the repository, e.g. load_module("api_client")"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+def parse_list(value: str, cast=float) -> List:
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+
+def write_file(path: str, size: int):
+    """Write size random bytes, so compressing transports cannot shortcut the upload"""
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            block = min(remaining, 4 * MIB)
+            f.write(os.urandom(block))
+            remaining -= block
+
+
+def bench_upload(options, work_dir: str) -> List[Dict]:
+    """
+    Upload batches of files against the stand-in API
+
+    Every combination of file size, part concurrency and file concurrency is
+    measured options.repeat times with a new client, so throughput estimates
+    of earlier runs do not carry over.
+
+    Returns:
+        One result per combination
+    """
+    api_client = load_module("api_client")
+
+    server = StubAPIServer(
+        latency=options.latency,
+        bandwidth=options.bandwidth * MIB if options.bandwidth else None,
+        error_rate=options.error_rate,
+        seed=options.seed,
+    ).start()
+    results = []
+    try:
+        for size_mib in options.file_sizes:
+            size = int(size_mib * MIB)
+            file_paths = []
+            for index in range(options.files):
+                path = os.path.join(work_dir, f"upload_{size}_{index}.bin")
+                write_file(path, size)
+                file_paths.append(path)
+
+            for part_concurrency in options.part_concurrency:
+                for file_concurrency in options.file_concurrency:
+                    samples = []
+                    stats = None
+                    failed = 0
+                    for _ in range(options.repeat):
+                        client = api_client.AssetManagerAPIClient(
+                            "benchmark",
+                            base_url=f"{server.url}/api",
+                            part_concurrency=part_concurrency,
+                            file_concurrency=file_concurrency,
+                        )
+                        client.upload_base_url = server.url
+                        client.backoff_base = 0.0
+                        if options.chunk_size:
+                            client.chunk_size = int(options.chunk_size * MIB)
+                        client.direct_upload_threshold = int(options.direct_threshold * 1024)
+                        server.reset_stats()
+
+                        started = time.perf_counter()
+                        batch = client.batch_upload_assets(file_paths, "project-bench")
+                        samples.append(time.perf_counter() - started)
+                        client.close()
+
+                        failed += batch["failed"]
+                        stats = server.get_stats()
+
+                    timing = summarize(samples)
+                    total_bytes = size * options.files
+                    results.append(
+                        {
+                            "file_size": size,
+                            "files": options.files,
+                            "part_concurrency": part_concurrency,
+                            "file_concurrency": file_concurrency,
+                            "seconds": timing,
+                            "throughput_mib_s": total_bytes / MIB / timing["median"],
+                            "failed_files": failed,
+                            "routes": batch["routes"],
+                            "server": stats,
+                        }
+                    )
+                    print(
+                        f"upload size={size_mib:g}MiB parts={part_concurrency} "
+                        f"files={file_concurrency}: {results[-1]['throughput_mib_s']:.1f} MiB/s"
+                    )
+
+            for path in file_paths:
+                os.remove(path)
+    finally:
+        server.stop()
+    return results
+
+
+def build_output_tree(root: str, file_count: int, depth: int, fanout: int) -> int:
+    """
+    Create file_count small files spread over directories depth levels deep
+
+    Returns:
+        Number of directories created
+    """
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [
+            os.path.join(parent, f"dir_{index}") for parent in level for index in range(fanout)
+        ]
+        directories.extend(level)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    for index in range(file_count):
+        directory = directories[index % len(directories)]
+        extension = LISTING_EXTENSIONS[index % len(LISTING_EXTENSIONS)]
+        with open(os.path.join(directory, f"ComfyUI_{index:06d}_{extension}"), "wb") as f:
+            f.write(b"\0" * 64)
+    return len(directories)
+
+
+def bench_listing(options, work_dir: str) -> List[Dict]:
+    """
+    Time get_output_images against output trees of different size and depth
+
+    cold is the first listing with a new index, cached a listing within the
+    index refresh interval, rescan a forced refresh of the unchanged tree.
+
+    Returns:
+        One result per tree
+    """
+    try:
+        import folder_paths
+    except ImportError:
+        print("Skipping listing benchmark: folder_paths not found, run from the ComfyUI directory")
+        return []
+
+    api_routes = load_module("api_routes")
+    output_index = load_module("output_index")
+
+    previous_output = folder_paths.get_output_directory()
+    empty_dir = os.path.join(work_dir, "empty")
+    os.makedirs(empty_dir, exist_ok=True)
+    results = []
+    try:
+        for file_count in options.listing_files:
+            for depth in options.listing_depth:
+                root = os.path.join(work_dir, f"output_{file_count}_{depth}")
+                directories = build_output_tree(root, file_count, depth, options.fanout)
+                folder_paths.set_output_directory(root)
+
+                cold, cached, rescan = [], [], []
+                for _ in range(options.repeat):
+                    # Switching the shared index away and back drops its state
+                    output_index.get_output_index(empty_dir)
+
+                    started = time.perf_counter()
+                    listing = api_routes.get_output_images(limit=options.page_size)
+                    cold.append(time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    api_routes.get_output_images(limit=options.page_size)
+                    cached.append(time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    api_routes.get_index(root).refresh(force=True)
+                    rescan.append(time.perf_counter() - started)
+
+                results.append(
+                    {
+                        "files": file_count,
+                        "depth": depth,
+                        "directories": directories,
+                        "listed": listing.get("count"),
+                        "cold_seconds": summarize(cold),
+                        "cached_seconds": summarize(cached),
+                        "rescan_seconds": summarize(rescan),
+                    }
+                )
+                print(
+                    f"listing files={file_count} depth={depth}: "
+                    f"cold {statistics.median(cold) * 1000:.1f}ms, "
+                    f"rescan {statistics.median(rescan) * 1000:.1f}ms"
+                )
+                shutil.rmtree(root, ignore_errors=True)
+    finally:
+        folder_paths.set_output_directory(previous_output)
+    return results
+
+
+def get_environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit or None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Asset Manager uploads and listings")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON result file")
+    parser.add_argument("--only", choices=("upload", "listing"), help="Run one benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--work-dir", help="Directory for generated files (default: temp dir)")
+
+    upload = parser.add_argument_group("upload")
+    upload.add_argument("--file-sizes", type=parse_list, default=[1, 16, 64], help="MiB, comma separated")
+    upload.add_argument("--files", type=int, default=4, help="Files per batch")
+    upload.add_argument("--part-concurrency", type=lambda v: parse_list(v, int), default=[1, 4, 8])
+    upload.add_argument("--file-concurrency", type=lambda v: parse_list(v, int), default=[1, 4])
+    upload.add_argument("--chunk-size", type=float, help="Initial part size in MiB")
+    upload.add_argument(
+        "--direct-threshold", type=float, default=0, help="KiB up to which files use direct uploads"
+    )
+    upload.add_argument("--latency", type=float, default=0.02, help="Seconds per request")
+    upload.add_argument("--bandwidth", type=float, help="Upload MiB/s (default: unlimited)")
+    upload.add_argument("--error-rate", type=float, default=0.0, help="Share of failed parts")
+    upload.add_argument("--seed", type=int, default=0)
+
+    listing = parser.add_argument_group("listing")
+    listing.add_argument("--listing-files", type=lambda v: parse_list(v, int), default=[1000, 10000])
+    listing.add_argument("--listing-depth", type=lambda v: parse_list(v, int), default=[0, 2, 4])
+    listing.add_argument("--fanout", type=int, default=3, help="Subdirectories per directory")
+    listing.add_argument("--page-size", type=int, default=100)
+    options = parser.parse_args(argv)
+
+    work_dir = options.work_dir or tempfile.mkdtemp(prefix="asset-manager-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    report = {
+        "version": RESULTS_VERSION,
+        "started_at": time.time(),
+        "environment": get_environment(),
+        "config": {
+            name: value for name, value in vars(options).items() if name not in ("output", "work_dir")
+        },
+        "results": {},
+    }
+    try:
+        if options.only in (None, "upload"):
+            report["results"]["upload"] = bench_upload(options, work_dir)
+        if options.only in (None, "listing"):
+            report["results"]["listing"] = bench_listing(options, work_dir)
+    finally:
+        if not options.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report["seconds"] = time.time() - report["started_at"]
+    with open(options.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
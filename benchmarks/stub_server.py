@@ -0,0 +1,343 @@
+"""
+Local stand-in for the Asset Manager API
+Implements the upload (multipart and direct) and folder endpoints the client uses, with configurable
+latency, bandwidth and error injection, using only the standard library
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class Link:
+    """Bandwidth shared by every connection to the server, like one uplink"""
+
+    def __init__(self, bandwidth: Optional[float] = None):
+        """
+        Args:
+            bandwidth: Bytes per second accepted over all connections (None is unlimited)
+        """
+        self.bandwidth = bandwidth
+        self._available_at = 0.0
+        self._lock = threading.Lock()
+
+    def transfer(self, nbytes: int):
+        """Block until nbytes fit through the link"""
+        if not self.bandwidth:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._available_at)
+            self._available_at = start + nbytes / self.bandwidth
+            done_at = self._available_at
+        delay = done_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    """HTTP server answering like the upload and folder APIs
+
+    Upload endpoints live under /api/upload, folder endpoints under /api, so
+    one server can stand in for both hosts: point base_url at f"{url}/api"
+    and upload_base_url at url.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        direct_uploads: bool = True,
+    ):
+        """
+        Initialize the server
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            latency: Seconds added before every response
+            bandwidth: Bytes per second accepted for request bodies (None is unlimited)
+            error_rate: Share of part uploads answered with a retryable 503
+            seed: Seed for error injection, so runs fail the same requests
+            direct_uploads: Answer /api/upload/direct; otherwise it returns 404
+                like a backend without small-file uploads
+        """
+        super().__init__((host, port), StubRequestHandler)
+        self.latency = latency
+        self.link = Link(bandwidth)
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.direct_uploads = direct_uploads
+        self.uploads = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubAPIServer":
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.uploads.clear()
+            self.stats = {
+                "requests": {},
+                "bytes_received": 0,
+                "injected_errors": 0,
+                "completed_uploads": 0,
+                "aborted_uploads": 0,
+                "max_inflight_parts": 0,
+            }
+            self._inflight_parts = 0
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def count(self, endpoint: str):
+        with self.lock:
+            requests = self.stats["requests"]
+            requests[endpoint] = requests.get(endpoint, 0) + 1
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        self.server.count(path)
+        self._wait()
+
+        if path == "/api/health":
+            return self._send_json(200, {"ok": True})
+        if path == "/api/organizations":
+            return self._send_json(
+                200,
+                {
+                    "success": True,
+                    "organizations": [{"id": "org-bench", "name": "Benchmark"}],
+                },
+            )
+        if path == "/api/projects":
+            return self._send_json(
+                200,
+                {"success": True, "folders": [{"id": "project-bench", "name": "Benchmark"}]},
+            )
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        self.server.count(path)
+
+        if path == "/api/upload/part":
+            server = self.server
+            with server.lock:
+                server._inflight_parts += 1
+                server.stats["max_inflight_parts"] = max(
+                    server.stats["max_inflight_parts"], server._inflight_parts
+                )
+            try:
+                body = self._read_body()
+                self._wait()
+                return self._upload_part(body)
+            finally:
+                with server.lock:
+                    server._inflight_parts -= 1
+
+        body = self._read_body()
+        self._wait()
+
+        if path == "/api/upload/create":
+            payload = json.loads(body)
+            upload_id = uuid.uuid4().hex
+            key = f"bench/{upload_id}/{payload.get('fileName', 'file')}"
+            with self.server.lock:
+                self.server.uploads[upload_id] = {"key": key, "parts": {}}
+            return self._send_json(200, {"uploadId": upload_id, "key": key})
+
+        if path == "/api/upload/complete":
+            payload = json.loads(body)
+            with self.server.lock:
+                upload = self.server.uploads.pop(payload.get("uploadId"), None)
+                if upload is not None:
+                    self.server.stats["completed_uploads"] += 1
+            if upload is None:
+                return self._send_json(404, {"error": "Upload not found"})
+            return self._send_json(
+                200,
+                {
+                    "success": True,
+                    "asset": {
+                        "id": payload["uploadId"],
+                        "key": upload["key"],
+                        "size": sum(upload["parts"].values()),
+                    },
+                },
+            )
+
+        if path == "/api/upload/direct":
+            if not self.server.direct_uploads:
+                return self._send_json(404, {"error": "Not found"})
+            return self._upload_direct(body)
+
+        if path == "/api/upload/abort":
+            payload = json.loads(body)
+            with self.server.lock:
+                if self.server.uploads.pop(payload.get("uploadId"), None) is not None:
+                    self.server.stats["aborted_uploads"] += 1
+            return self._send_json(200, {"success": True})
+
+        self._send_json(404, {"error": "Not found"})
+
+    def _upload_part(self, body: bytes):
+        server = self.server
+        upload_id = self.headers.get("X-Upload-Id")
+        part_number = int(self.headers.get("X-Part-Number") or 0)
+
+        with server.lock:
+            fail = server.error_rate > 0 and server.random.random() < server.error_rate
+            if fail:
+                server.stats["injected_errors"] += 1
+            upload = server.uploads.get(upload_id)
+            if upload is not None and not fail:
+                upload["parts"][part_number] = len(body)
+
+        if fail:
+            return self._send_json(503, {"error": "Injected failure"}, {"Retry-After": "0"})
+        if upload is None:
+            return self._send_json(404, {"error": "Upload not found"})
+        return self._send_json(
+            200, {"partNumber": part_number, "etag": f"etag-{upload_id[:8]}-{part_number}"}
+        )
+
+    def _upload_direct(self, body: bytes):
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8") + body
+        )
+        fields = {
+            part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.get_payload()
+        }
+        payload = json.loads(fields["payload"])
+
+        results = []
+        for entry in payload.get("files", []):
+            content = fields.get(entry["field"])
+            if content is None or len(content) != entry["fileSize"]:
+                results.append({"success": False, "error": "Size mismatch"})
+                continue
+            results.append(
+                {"success": True, "asset": {"id": uuid.uuid4().hex, "size": len(content)}}
+            )
+        with self.server.lock:
+            self.server.stats["completed_uploads"] += sum(
+                result["success"] for result in results
+            )
+        return self._send_json(200, {"results": results})
+
+    def _read_body(self) -> bytes:
+        blocks = []
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                blocks.append(self._read_exact(size))
+                self.rfile.readline()
+        else:
+            blocks.append(self._read_exact(int(self.headers.get("Content-Length") or 0)))
+
+        body = b"".join(blocks)
+        with self.server.lock:
+            self.server.stats["bytes_received"] += len(body)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def _read_exact(self, length: int) -> bytes:
+        blocks = []
+        remaining = length
+        while remaining > 0:
+            block = self.rfile.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            self.server.link.transfer(len(block))
+            blocks.append(block)
+            remaining -= len(block)
+        return b"".join(blocks)
+
+    def _wait(self):
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the stand-in Asset Manager API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added per request")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Upload bytes per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failed parts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-direct", action="store_true", help="Reject direct uploads")
+    options = parser.parse_args()
+
+    stub = StubAPIServer(
+        options.host,
+        options.port,
+        options.latency,
+        options.bandwidth,
+        options.error_rate,
+        options.seed,
+        not options.no_direct,
+    )
+    print(f"Stand-in API listening on {stub.url} (base_url {stub.url}/api)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server_close()
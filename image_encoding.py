@@ -0,0 +1,171 @@
+"""
+In-memory image encoding for Asset Manager
+Encodes IMAGE tensors to PNG bytes on a worker pool, so uploads do not need a file on disk
+"""
+
+import io
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+import folder_paths
+
+
+# zlib releases the GIL while compressing, so threads encode frames in parallel
+ENCODE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_encode_pool = None
+_encode_pool_lock = threading.Lock()
+
+# Counters handed out for files that are not written yet, by output folder and prefix
+_reserved_counters = {}
+_reserved_counters_lock = threading.Lock()
+
+
+def get_encode_pool() -> ThreadPoolExecutor:
+    global _encode_pool
+
+    with _encode_pool_lock:
+        if _encode_pool is None:
+            _encode_pool = ThreadPoolExecutor(
+                max_workers=ENCODE_WORKERS, thread_name_prefix="asset-manager-encode"
+            )
+        return _encode_pool
+
+
+def build_png_text(prompt=None, extra_pnginfo=None) -> Dict[str, str]:
+    """
+    Build the PNG text chunks ComfyUI's SaveImage embeds
+
+    Args:
+        prompt: Prompt (API format) of the current execution
+        extra_pnginfo: Extra PNG info, usually {"workflow": ...}
+
+    Returns:
+        Dictionary of chunk name to JSON text; empty when metadata is disabled
+    """
+    try:
+        from comfy.cli_args import args
+
+        if args.disable_metadata:
+            return {}
+    except ImportError:
+        pass
+
+    text = {}
+    if prompt is not None:
+        text["prompt"] = json.dumps(prompt)
+    if extra_pnginfo is not None:
+        for name, value in extra_pnginfo.items():
+            text[name] = json.dumps(value)
+    return text
+
+
+def encode_png(image, text: Dict[str, str] = None, compress_level: int = 4) -> bytes:
+    """
+    Encode one IMAGE frame as PNG
+
+    Args:
+        image: Tensor or array of shape (height, width, channels) with values in 0..1
+        text: PNG text chunks to embed
+        compress_level: zlib compression level (0-9)
+
+    Returns:
+        PNG file content
+    """
+    if hasattr(image, "cpu"):
+        image = image.cpu().numpy()
+    pixels = np.clip(255.0 * image, 0, 255).astype(np.uint8)
+
+    pnginfo = None
+    if text:
+        pnginfo = PngInfo()
+        for name, value in text.items():
+            pnginfo.add_text(name, value)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(
+        buffer, format="PNG", pnginfo=pnginfo, compress_level=compress_level
+    )
+    return buffer.getvalue()
+
+
+def start_encoding(
+    images, text: Dict[str, str] = None, compress_level: int = 4
+) -> List[Future]:
+    """
+    Start encoding a batch of IMAGE frames as PNG on the encode pool
+
+    The frames are only referenced until they are encoded, so callers that
+    keep the futures hold PNG bytes instead of the tensor.
+
+    Args:
+        images: IMAGE tensor of shape (batch, height, width, channels)
+        text: PNG text chunks embedded in every frame
+        compress_level: zlib compression level (0-9)
+
+    Returns:
+        Futures resolving to the PNG file contents, in batch order
+    """
+    pool = get_encode_pool()
+    return [pool.submit(encode_png, image, text, compress_level) for image in images]
+
+
+def reserve_output_names(
+    filename_prefix: str, width: int, height: int, count: int
+) -> List[Tuple[str, str]]:
+    """
+    Pick unique output file names like SaveImage, without writing the files yet
+
+    Counters handed out earlier in this process are skipped as well, so
+    several pending uploads never pick the same name.
+
+    Args:
+        filename_prefix: Prefix as entered on the node (may contain a subfolder)
+        width: Image width, used by prefix placeholders
+        height: Image height, used by prefix placeholders
+        count: Number of names needed
+
+    Returns:
+        List of (path relative to the output dir, absolute path) tuples
+    """
+    output_dir = folder_paths.get_output_directory()
+    full_output_folder, filename, counter, subfolder, _ = folder_paths.get_save_image_path(
+        filename_prefix, output_dir, width, height
+    )
+
+    reservation = (full_output_folder, filename)
+    with _reserved_counters_lock:
+        counter = max(counter, _reserved_counters.get(reservation, 0))
+        _reserved_counters[reservation] = counter + count
+
+    names = []
+    for batch_number in range(count):
+        file = f"{filename.replace('%batch_num%', str(batch_number))}_{counter + batch_number:05}_.png"
+        relative_path = f"{subfolder}/{file}" if subfolder else file
+        names.append((relative_path, os.path.join(full_output_folder, file)))
+    return names
+
+
+def write_output_file(full_path: str, content: bytes):
+    """
+    Write encoded content to the output folder
+
+    The file is written under a temporary name and renamed, so the output
+    watcher never sees a partially written image.
+
+    Args:
+        full_path: Absolute destination path
+        content: File content
+    """
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    temp_path = f"{full_path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    os.replace(temp_path, full_path)
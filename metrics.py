@@ -0,0 +1,255 @@
+"""
+In-process metrics for Asset Manager
+Counters and latency histograms, exported in Prometheus text format and as JSON
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+
+# Request and scan latencies in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Queue waits and whole jobs take longer
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{_escape_label_value(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {"labels": dict(zip(self.labelnames, key)), "value": value}
+                for key, value in self._values.items()
+            ]
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(sample['labels'])} {_format_value(sample['value'])}"
+            for sample in self.samples()
+        ]
+
+
+class Histogram:
+    """Distribution of observed values per label set, in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of a block
+
+        Labels may be changed inside the block, e.g. to record the outcome:
+
+            with histogram.time(stage="part", outcome="error") as labels:
+                ...
+                labels["outcome"] = "success"
+        """
+        labels = dict(labels)
+        started = time.monotonic()
+        try:
+            yield labels
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def samples(self) -> List[Dict]:
+        with self._lock:
+            values = [(key, list(state["counts"]), state["sum"]) for key, state in self._values.items()]
+
+        samples = []
+        for key, counts, total in values:
+            cumulative = []
+            running = 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            samples.append(
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "count": running,
+                    "sum": total,
+                    "buckets": {
+                        _format_value(bound): count
+                        for bound, count in zip(self.buckets, cumulative)
+                    },
+                }
+            )
+        return samples
+
+    def render(self) -> List[str]:
+        lines = []
+        for sample in self.samples():
+            labels = sample["labels"]
+            for bound, count in sample["buckets"].items():
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(dict(labels, le=bound))} {count}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {sample['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format (version 0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict:
+        """
+        Get all metrics as a JSON-serializable dictionary
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return {
+            metric.name: {"type": metric.kind, "help": metric.help, "samples": metric.samples()}
+            for metric in metrics
+        }
+
+
+registry = MetricsRegistry()
+
+request_seconds = registry.histogram(
+    "asset_manager_request_seconds",
+    "Latency of remote API request attempts by upload stage",
+    ("stage", "outcome"),
+)
+request_retries = registry.counter(
+    "asset_manager_request_retries_total",
+    "Remote API requests retried after a transient failure",
+    ("stage",),
+)
+bytes_uploaded = registry.counter(
+    "asset_manager_uploaded_bytes_total",
+    "File bytes in successfully uploaded parts",
+)
+files_uploaded = registry.counter(
+    "asset_manager_files_total",
+    "Files processed by the upload pipeline by outcome",
+    ("outcome",),
+)
+scan_seconds = registry.histogram(
+    "asset_manager_scan_seconds",
+    "Duration of output folder scans and listings",
+    ("operation",),
+)
+queue_wait_seconds = registry.histogram(
+    "asset_manager_queue_wait_seconds",
+    "Time upload jobs waited in the queue before starting",
+    buckets=JOB_BUCKETS,
+)
+job_seconds = registry.histogram(
+    "asset_manager_job_seconds",
+    "Duration of upload jobs by final status",
+    ("status",),
+    buckets=JOB_BUCKETS,
+)
+thumbnail_seconds = registry.histogram(
+    "asset_manager_thumbnail_seconds",
+    "Time to render a gallery thumbnail",
+)
+recompress_bytes_saved = registry.counter(
+    "asset_manager_recompress_saved_bytes_total",
+    "Bytes saved by lossless recompression before upload, by format and project",
+    ("format", "project"),
+)
+recompress_cpu_seconds = registry.counter(
+    "asset_manager_recompress_cpu_seconds_total",
+    "CPU time spent on lossless recompression, by format and project",
+    ("format", "project"),
+)
@@ -24,10 +24,61 @@ class AssetManagerNode:
         return os.path.join(os.path.dirname(os.path.realpath(__file__)), "web")
 
 
+class AssetManagerUploadImage:
+    """Uploads images straight from the graph, without waiting for files on disk"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "images": ("IMAGE",),
+                "filename_prefix": ("STRING", {"default": "ComfyUI"}),
+                "save_local": ("BOOLEAN", {"default": False}),
+            },
+            "optional": {
+                "project_id": ("STRING", {"default": ""}),
+                "compress_level": ("INT", {"default": 4, "min": 0, "max": 9}),
+            },
+            "hidden": {"prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},
+        }
+
+    RETURN_TYPES = ()
+    FUNCTION = "upload"
+    OUTPUT_NODE = True
+    CATEGORY = "custom"
+
+    def upload(
+        self,
+        images,
+        filename_prefix="ComfyUI",
+        save_local=False,
+        project_id="",
+        compress_level=4,
+        prompt=None,
+        extra_pnginfo=None,
+    ):
+        from .api_routes import submit_image_upload
+
+        # Encoding and uploading run in the background, so the next prompt
+        # in the queue starts right away
+        submit_image_upload(
+            images,
+            filename_prefix=filename_prefix,
+            save_local=save_local,
+            prompt=prompt,
+            extra_pnginfo=extra_pnginfo,
+            project_id=project_id.strip() or None,
+            compress_level=compress_level,
+        )
+        return ()
+
+
 NODE_CLASS_MAPPINGS = {
     "AssetManagerNode": AssetManagerNode,
+    "AssetManagerUploadImage": AssetManagerUploadImage,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "AssetManagerNode": "Asset Manager",
+    "AssetManagerUploadImage": "Asset Manager Upload Image",
 }
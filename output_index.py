@@ -0,0 +1,474 @@
+"""
+Incremental index of the ComfyUI output folder
+Keeps file entries in memory and only rescans directories whose mtime changed; directories
+are visited in parallel, which hides per-call latency on network file systems
+"""
+
+import fnmatch
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from .metrics import scan_seconds
+from .thumbnails import can_thumbnail
+
+
+FILE_TYPE_MAP = {
+    # images
+    ".png": "image",
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".webp": "image",
+    ".svg": "image",
+    # videos
+    ".mp4": "video",
+    ".mov": "video",
+    ".avi": "video",
+    # audio
+    ".mp3": "audio",
+    ".wav": "audio",
+    ".flac": "audio",
+    # text
+    ".txt": "text",
+    ".json": "text",
+    # 3D
+    ".obj": "3D",
+    ".fbx": "3D",
+    ".gltf": "3D",
+    ".glb": "3D",
+}
+
+# Files modified this recently are re-checked on every refresh, because
+# writes to an existing file do not change the mtime of its directory
+HOT_FILE_WINDOW = 30.0
+# Directories listed and stat'ed at the same time
+SCAN_WORKERS = 8
+
+
+def build_view_url(relative_path: str) -> str:
+    """
+    Build a ComfyUI /view URL for a file in the output folder
+
+    Args:
+        relative_path: Path relative to the output dir, with forward slashes
+
+    Returns:
+        URL for ComfyUI's /view endpoint
+    """
+    # ComfyUI's /view endpoint expects: filename=basename&subfolder=path&type=output
+    if "/" in relative_path:
+        subfolder, basename = relative_path.rsplit("/", 1)
+        encoded_basename = quote(basename)
+        encoded_subfolder = quote(subfolder, safe="/")
+        return f"/view?filename={encoded_basename}&subfolder={encoded_subfolder}&type=output"
+
+    encoded_basename = quote(relative_path)
+    return f"/view?filename={encoded_basename}&type=output"
+
+
+def build_thumbnail_url(relative_path: str, modified: float) -> str:
+    """
+    Build an /asset-manager/thumbnail URL for a file in the output folder
+
+    The modification time is part of the URL, so browsers may cache the
+    preview until the file changes.
+
+    Args:
+        relative_path: Path relative to the output dir, with forward slashes
+        modified: Modification time as a UNIX timestamp
+
+    Returns:
+        URL of the preview
+    """
+    return f"/asset-manager/thumbnail?path={quote(relative_path, safe='/')}&v={int(modified)}"
+
+
+def build_file_entry(relative_path: str, size: int, modified: float) -> Dict:
+    """
+    Build the file description returned by get_output_images
+
+    Args:
+        relative_path: Path relative to the output dir, with forward slashes
+        size: File size in bytes
+        modified: Modification time as a UNIX timestamp
+
+    Returns:
+        Dictionary describing the file
+    """
+    name = relative_path.rsplit("/", 1)[-1]
+    file_ext = os.path.splitext(name.lower())[1]
+    return {
+        "name": name,
+        "path": relative_path,
+        "url": build_view_url(relative_path),
+        "thumbnail_url": build_thumbnail_url(relative_path, modified)
+        if can_thumbnail(name)
+        else None,
+        "size": size,
+        "modified": modified,
+        "file_type": FILE_TYPE_MAP[file_ext],
+        "extension": file_ext,
+    }
+
+
+class OutputIndex:
+    """In-process index of supported files below an output directory"""
+
+    def __init__(
+        self,
+        root: str,
+        min_refresh_interval: float = 1.0,
+        max_changes: int = 50000,
+        max_depth: Optional[int] = None,
+        exclude: Iterable[str] = (),
+        max_workers: int = SCAN_WORKERS,
+    ):
+        """
+        Initialize the index
+
+        Args:
+            root: Output directory to index
+            min_refresh_interval: Refreshes closer together than this reuse the last scan
+            max_changes: Number of change records kept for delta queries
+            max_depth: Levels of subdirectories below root to index (None is unlimited)
+            exclude: Glob patterns of directories and files to leave out, matched
+                against the relative path and the name (e.g. "_temp", "archive/*")
+            max_workers: Number of directories scanned at the same time
+        """
+        self.root = root
+        self.min_refresh_interval = min_refresh_interval
+        self.max_changes = max_changes
+        self.max_depth = max_depth
+        self.exclude = tuple(exclude)
+        self.max_workers = max_workers
+        self.epoch = f"{int(time.time() * 1000):x}"
+        self._dirs = {}
+        self._generation = 0
+        self._oldest_generation = 0
+        self._changes = deque()
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}-{self._generation}"
+
+    def refresh(self, force: bool = False, on_directory: Optional[Callable[[List[Dict]], None]] = None):
+        """
+        Bring the index up to date with the file system
+
+        Args:
+            force: Rescan even if the last refresh was very recent
+            on_directory: Optional callback run with the file entries of each
+                directory as soon as it is scanned, so callers can show partial
+                results of a slow scan. It also receives every directory when
+                the last scan is reused.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh and now - self._last_refresh < self.min_refresh_interval:
+                if on_directory is not None:
+                    for directory in self._dirs.values():
+                        if directory["files"]:
+                            on_directory(list(directory["files"].values()))
+                return
+            with scan_seconds.time(operation="index_refresh"):
+                self._scan(on_directory)
+            self._last_refresh = time.monotonic()
+
+    def list_files(self) -> List[Dict]:
+        """
+        Get all indexed files (call refresh first)
+
+        Returns:
+            List of file entries in no particular order
+        """
+        with self._lock:
+            return [
+                entry
+                for directory in self._dirs.values()
+                for entry in directory["files"].values()
+            ]
+
+    def changes_since(self, cursor: Optional[str]) -> Dict:
+        """
+        Get files added or removed since a cursor (call refresh first)
+
+        Args:
+            cursor: Cursor returned by an earlier call, or None for a full listing
+
+        Returns:
+            Dictionary with the new cursor, added entries, removed paths and
+            reset=True when the cursor was unknown and added holds every file
+        """
+        with self._lock:
+            since = self._parse_cursor(cursor)
+            if since is None:
+                return {
+                    "cursor": self.cursor,
+                    "reset": True,
+                    "added": [
+                        entry
+                        for directory in self._dirs.values()
+                        for entry in directory["files"].values()
+                    ],
+                    "removed": [],
+                }
+
+            latest = {}
+            for generation, action, path in reversed(self._changes):
+                if generation <= since:
+                    break
+                latest.setdefault(path, action)
+
+            added = []
+            removed = []
+            for path, action in latest.items():
+                entry = self._lookup(path)
+                if action == "added" and entry is not None:
+                    added.append(entry)
+                elif action == "removed" and entry is None:
+                    removed.append(path)
+
+            return {
+                "cursor": self.cursor,
+                "reset": False,
+                "added": added,
+                "removed": removed,
+            }
+
+    def _parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        if not cursor:
+            return None
+        epoch, _, generation = cursor.partition("-")
+        if epoch != self.epoch or not generation.isdigit():
+            return None
+        generation = int(generation)
+        if generation < self._oldest_generation or generation > self._generation:
+            return None
+        return generation
+
+    def _lookup(self, path: str) -> Optional[Dict]:
+        rel_dir = path.rsplit("/", 1)[0] if "/" in path else ""
+        directory = self._dirs.get(rel_dir)
+        if directory is None:
+            return None
+        return directory["files"].get(path.rsplit("/", 1)[-1])
+
+    def _record(self, action: str, path: str):
+        self._generation += 1
+        self._changes.append((self._generation, action, path))
+        while len(self._changes) > self.max_changes:
+            self._oldest_generation = self._changes.popleft()[0]
+
+    def _scan(self, on_directory: Optional[Callable[[List[Dict]], None]] = None):
+        seen_dirs = set()
+        results = queue.Queue()
+        executor = get_scan_pool(self.max_workers)
+
+        def submit(rel_dir):
+            future = executor.submit(self._visit, rel_dir, self._dirs.get(rel_dir))
+            future.add_done_callback(lambda done: results.put((rel_dir, done)))
+
+        # Workers only read and update their own directory; the index itself
+        # and the change records are updated on this thread
+        submit("")
+        pending = 1
+        while pending:
+            rel_dir, future = results.get()
+            pending -= 1
+            directory, records = future.result()
+            if directory is None:
+                continue
+
+            seen_dirs.add(rel_dir)
+            self._dirs[rel_dir] = directory
+            for action, path in records:
+                self._record(action, path)
+            if on_directory is not None and directory["files"]:
+                on_directory(list(directory["files"].values()))
+
+            for subdir in directory["subdirs"]:
+                submit(subdir)
+                pending += 1
+
+        for rel_dir in set(self._dirs) - seen_dirs:
+            for entry in self._dirs.pop(rel_dir)["files"].values():
+                self._record("removed", entry["path"])
+
+    def _visit(self, rel_dir: str, previous: Optional[Dict]):
+        """
+        Scan one directory on a worker thread
+
+        Returns:
+            Tuple of (directory state or None if it is gone, list of (action, path) change records)
+        """
+        abs_dir = os.path.join(self.root, rel_dir.replace("/", os.sep)) if rel_dir else self.root
+        records = []
+
+        try:
+            dir_mtime = os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            return None, records
+
+        if previous is None or previous["mtime"] != dir_mtime:
+            return self._scan_dir(rel_dir, abs_dir, dir_mtime, previous, records), records
+
+        self._recheck_hot_files(rel_dir, abs_dir, previous, records)
+        return previous, records
+
+    def _excluded(self, relative_path: str, name: str) -> bool:
+        return any(
+            fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(name, pattern)
+            for pattern in self.exclude
+        )
+
+    def _scan_dir(
+        self, rel_dir: str, abs_dir: str, dir_mtime: int, previous: Optional[Dict], records: List
+    ) -> Dict:
+        old_files = previous["files"] if previous else {}
+        files = {}
+        subdirs = []
+        hot = set()
+        hot_after = time.time() - HOT_FILE_WINDOW
+        depth = rel_dir.count("/") + 1 if rel_dir else 0
+        descend = self.max_depth is None or depth < self.max_depth
+
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            entries = []
+
+        for dir_entry in entries:
+            relative_path = f"{rel_dir}/{dir_entry.name}" if rel_dir else dir_entry.name
+            try:
+                # Like os.walk, list symlinked directories but do not follow them.
+                # is_dir() uses the file type from the directory listing, no stat call
+                if dir_entry.is_dir():
+                    if (
+                        descend
+                        and not dir_entry.is_symlink()
+                        and not self._excluded(relative_path, dir_entry.name)
+                    ):
+                        subdirs.append(relative_path)
+                    continue
+
+                file_ext = os.path.splitext(dir_entry.name.lower())[1]
+                if file_ext not in FILE_TYPE_MAP:
+                    continue
+                if self.exclude and self._excluded(relative_path, dir_entry.name):
+                    continue
+
+                stat_info = dir_entry.stat()
+            except OSError:
+                continue
+
+            old_entry = old_files.get(dir_entry.name)
+            if (
+                old_entry is not None
+                and old_entry["size"] == stat_info.st_size
+                and old_entry["modified"] == stat_info.st_mtime
+            ):
+                files[dir_entry.name] = old_entry
+            else:
+                files[dir_entry.name] = build_file_entry(
+                    relative_path, stat_info.st_size, stat_info.st_mtime
+                )
+                records.append(("added", relative_path))
+
+            if stat_info.st_mtime > hot_after:
+                hot.add(dir_entry.name)
+
+        for name, old_entry in old_files.items():
+            if name not in files:
+                records.append(("removed", old_entry["path"]))
+
+        return {"mtime": dir_mtime, "files": files, "subdirs": subdirs, "hot": hot}
+
+    def _recheck_hot_files(self, rel_dir: str, abs_dir: str, directory: Dict, records: List):
+        if not directory["hot"]:
+            return
+
+        hot_after = time.time() - HOT_FILE_WINDOW
+        for name in list(directory["hot"]):
+            entry = directory["files"].get(name)
+            try:
+                stat_info = os.stat(os.path.join(abs_dir, name))
+            except OSError:
+                continue
+
+            if entry is None or entry["size"] != stat_info.st_size or entry["modified"] != stat_info.st_mtime:
+                relative_path = f"{rel_dir}/{name}" if rel_dir else name
+                directory["files"][name] = build_file_entry(
+                    relative_path, stat_info.st_size, stat_info.st_mtime
+                )
+                records.append(("added", relative_path))
+
+            if stat_info.st_mtime <= hot_after:
+                directory["hot"].discard(name)
+
+
+_index = None
+_index_lock = threading.Lock()
+_scan_pool = None
+_scan_pool_workers = 0
+_scan_pool_lock = threading.Lock()
+
+
+def get_scan_pool(max_workers: int = SCAN_WORKERS) -> ThreadPoolExecutor:
+    """
+    Get the thread pool directory scans run on
+
+    Args:
+        max_workers: Number of threads; a different number replaces the pool
+            (threads of the old one exit once running scans release it)
+
+    Returns:
+        Shared ThreadPoolExecutor
+    """
+    global _scan_pool, _scan_pool_workers
+
+    max_workers = max(1, max_workers)
+    with _scan_pool_lock:
+        if _scan_pool is None or _scan_pool_workers != max_workers:
+            _scan_pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="asset-manager-scan"
+            )
+            _scan_pool_workers = max_workers
+        return _scan_pool
+
+
+def get_output_index(
+    root: str, max_depth: Optional[int] = None, exclude: Iterable[str] = (), max_workers: int = SCAN_WORKERS
+) -> OutputIndex:
+    """
+    Get the shared index for an output directory
+
+    Args:
+        root: Output directory
+        max_depth: Levels of subdirectories to index (None is unlimited)
+        exclude: Glob patterns of directories and files to leave out
+        max_workers: Number of directories scanned at the same time
+
+    Returns:
+        OutputIndex for root (a new one if the output directory or the
+        depth and exclude options changed)
+    """
+    global _index
+
+    exclude = tuple(exclude)
+    with _index_lock:
+        if (
+            _index is None
+            or _index.root != root
+            or _index.max_depth != max_depth
+            or _index.exclude != exclude
+        ):
+            _index = OutputIndex(root, max_depth=max_depth, exclude=exclude, max_workers=max_workers)
+        _index.max_workers = max_workers
+        return _index
@@ -0,0 +1,167 @@
+"""
+Server-side watcher for the ComfyUI output folder
+Detects new output files without a browser and hands them to the upload pipeline
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .output_index import OutputIndex
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+
+# With native file system events, polling is only a safety net
+NATIVE_POLL_INTERVAL = 30.0
+
+
+class OutputWatcher:
+    """Watches the output index and reports files once they stop changing"""
+
+    def __init__(
+        self,
+        get_index: Callable[[], OutputIndex],
+        on_ready: Callable[[List[str]], None],
+        poll_interval: float = 2.0,
+        settle_seconds: float = 3.0,
+        on_poll: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Initialize the watcher
+
+        Args:
+            get_index: Returns the OutputIndex of the current output directory
+            on_ready: Called with relative paths of new files that finished writing
+            poll_interval: Seconds between index refreshes without native events
+            settle_seconds: Size and mtime must stay unchanged this long before
+                a file counts as fully written
+            on_poll: Optional callback run after every poll, e.g. to retry
+                files deferred earlier
+        """
+        self.get_index = get_index
+        self.on_ready = on_ready
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.on_poll = on_poll
+        self.native_events = False
+        self._pending = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="asset-manager-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        index = self.get_index()
+        index.refresh(force=True)
+        # Files that exist when the watcher starts are not uploaded
+        cursor = index.cursor
+        observer = self._start_observer(index.root)
+
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self._wait_timeout())
+                self._wake.clear()
+                if self._stop.is_set():
+                    break
+
+                try:
+                    cursor = self._poll(cursor)
+                    if self.on_poll is not None:
+                        self.on_poll()
+                except Exception:
+                    import traceback
+
+                    traceback.print_exc()
+
+                # Coalesce bursts of native events (e.g. while a video is written)
+                self._stop.wait(0.25)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join(timeout=5)
+
+    def _wait_timeout(self) -> float:
+        if self._pending:
+            return max(0.2, self.settle_seconds / 2)
+        if self.native_events:
+            return max(self.poll_interval, NATIVE_POLL_INTERVAL)
+        return self.poll_interval
+
+    def _poll(self, cursor: str) -> str:
+        index = self.get_index()
+        index.refresh(force=True)
+        changes = index.changes_since(cursor)
+
+        if changes["reset"]:
+            # The output directory changed; start over from its current state
+            self._pending.clear()
+            return changes["cursor"]
+
+        now = time.monotonic()
+        for entry in changes["added"]:
+            # A changed size or mtime shows up as "added" again and restarts the timer
+            self._pending[entry["path"]] = now
+        for path in changes["removed"]:
+            self._pending.pop(path, None)
+
+        ready = [
+            path
+            for path, last_change in self._pending.items()
+            if now - last_change >= self.settle_seconds
+        ]
+        for path in ready:
+            del self._pending[path]
+
+        if ready:
+            self.on_ready(ready)
+
+        return changes["cursor"]
+
+    def _start_observer(self, root: str):
+        """Start native file system notifications (inotify etc.) if watchdog is installed"""
+        self.native_events = False
+        if not WATCHDOG_AVAILABLE:
+            return None
+
+        wake = self._wake
+
+        class WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        try:
+            observer = Observer()
+            observer.schedule(WakeHandler(), root, recursive=True)
+            observer.start()
+        except Exception as e:
+            print(f"Warning: Asset Manager falls back to polling the output folder: {e}")
+            return None
+
+        self.native_events = True
+        return observer
@@ -0,0 +1,241 @@
+"""
+Lossless recompression of output images for Asset Manager uploads
+Images are re-encoded as optimized PNG or lossless WebP on a thread pool before they are
+uploaded, keeping the embedded workflow; results that are not smaller are discarded
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+
+RECOMPRESS_FORMATS = ("png", "webp")
+# Formats stored without (or with weak) compression; JPEG and WebP sources
+# would only grow when re-encoded losslessly
+RECOMPRESS_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff")
+RECOMPRESS_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# 8-bit modes lossless WebP stores exactly (after an exact conversion to RGB/RGBA)
+WEBP_SOURCE_MODES = ("1", "L", "LA", "P", "PA", "RGB", "RGBA")
+# Modes holding more than 8 bits per channel; Pillow cannot write them back losslessly
+HIGH_DEPTH_MODES = ("I", "I;16", "I;16B", "I;16L", "I;16N", "F")
+# ComfyUI's WebP savers store the prompt in Model and other chunks downwards from Make
+EXIF_PROMPT_TAG = 0x0110
+EXIF_FIRST_TEXT_TAG = 0x010F
+
+_recompress_pool = None
+_recompress_pool_lock = threading.Lock()
+
+
+def can_recompress(path: str) -> bool:
+    return os.path.splitext(path.lower())[1] in RECOMPRESS_EXTENSIONS
+
+
+def has_high_bit_depth(image: Image.Image) -> bool:
+    """
+    Check whether an opened (not yet loaded) image stores more than 8 bits per channel
+
+    Pillow decodes 16-bit RGB(A) PNGs and TIFFs to 8-bit RGB(A); the raw mode
+    of the undecoded tiles (e.g. "RGB;16B") still shows the source depth.
+    """
+    if image.mode in HIGH_DEPTH_MODES:
+        return True
+    for tile in image.tile:
+        rawmode = tile.args[0] if isinstance(tile.args, tuple) else tile.args
+        if isinstance(rawmode, str) and (";16" in rawmode or ";32" in rawmode):
+            return True
+    return False
+
+
+def same_pixels(source: Image.Image, path: str) -> bool:
+    """
+    Check that a re-encoded file decodes to the pixels of the source image
+    """
+    with Image.open(path) as result:
+        result.load()
+        if result.size != source.size:
+            return False
+        if result.mode == source.mode and source.mode not in ("P", "PA"):
+            return result.tobytes() == source.tobytes()
+        return result.convert("RGBA").tobytes() == source.convert("RGBA").tobytes()
+
+
+def get_recompress_pool() -> ThreadPoolExecutor:
+    """
+    Get the shared recompression pool
+
+    Pillow's zlib and libwebp encoders release the GIL, so threads encode in
+    parallel without forking the ComfyUI process (which has CUDA and many
+    threads running).
+    """
+    global _recompress_pool
+
+    with _recompress_pool_lock:
+        if _recompress_pool is None:
+            _recompress_pool = ThreadPoolExecutor(
+                max_workers=RECOMPRESS_WORKERS, thread_name_prefix="asset-manager-recompress"
+            )
+        return _recompress_pool
+
+
+def build_webp_exif(text: Dict[str, str]) -> bytes:
+    """
+    Store PNG text chunks in EXIF the way ComfyUI's WebP savers do, so the
+    workflow still loads from the WebP file
+    """
+    exif = Image.Exif()
+    tag = EXIF_FIRST_TEXT_TAG
+    for name, value in text.items():
+        if name == "prompt":
+            exif[EXIF_PROMPT_TAG] = f"prompt:{value}"
+        else:
+            exif[tag] = f"{name}:{value}"
+            tag -= 1
+    return exif.tobytes()
+
+
+def recompress_file(source_path: str, target_path: str, target_format: str) -> Dict:
+    """
+    Re-encode one image losslessly (runs in a pool worker)
+
+    Args:
+        source_path: Image to re-encode
+        target_path: Where the result is written, without extension
+        target_format: "png" or "webp"
+
+    Returns:
+        Dictionary with path (None when the image was kept as is), size,
+        original_size, cpu_seconds and an optional skip reason
+    """
+    started = time.thread_time()
+    original_size = os.path.getsize(source_path)
+    result = {"path": None, "size": original_size, "original_size": original_size}
+
+    try:
+        with Image.open(source_path) as image:
+            if getattr(image, "is_animated", False):
+                result["reason"] = "animated"
+                return result
+            if has_high_bit_depth(image):
+                result["reason"] = "more than 8 bits per channel"
+                return result
+            if target_format == "webp" and image.mode not in WEBP_SOURCE_MODES:
+                result["reason"] = f"{image.mode} images cannot be stored in WebP"
+                return result
+
+            image.load()
+            text = dict(getattr(image, "text", None) or {})
+            options = {}
+            if image.info.get("icc_profile"):
+                options["icc_profile"] = image.info["icc_profile"]
+
+            if target_format == "png":
+                pnginfo = PngInfo()
+                for name, value in text.items():
+                    # zTXt keeps the workflow readable by ComfyUI at a fraction of the size
+                    pnginfo.add_text(name, value, zip=True)
+                for name in ("transparency", "dpi"):
+                    if name in image.info:
+                        options[name] = image.info[name]
+                encoded = image
+                options.update(format="PNG", optimize=True, pnginfo=pnginfo)
+            else:
+                has_alpha = image.mode in ("LA", "PA", "RGBA") or "transparency" in image.info
+                encoded = image.convert("RGBA" if has_alpha else "RGB")
+                options.update(
+                    format="WEBP",
+                    lossless=True,
+                    # Lossless quality is encoder effort; method 6 costs several
+                    # times the CPU for a few percent
+                    quality=80,
+                    method=4,
+                    exif=build_webp_exif(text),
+                )
+
+            path = f"{target_path}.{target_format}"
+            encoded.save(path, **options)
+
+            result["size"] = os.path.getsize(path)
+            if result["size"] >= original_size:
+                os.remove(path)
+                result["size"] = original_size
+                result["reason"] = "not smaller"
+                return result
+            # Only upload a copy that is known to decode to the same pixels
+            if not same_pixels(image, path):
+                os.remove(path)
+                result["size"] = original_size
+                result["reason"] = "pixels changed"
+                return result
+    finally:
+        result["cpu_seconds"] = time.thread_time() - started
+
+    result["path"] = path
+    return result
+
+
+def recompress_files(
+    source_paths: List[str], target_dir: str, target_format: str, cancel_event=None
+) -> Tuple[Dict[str, Dict], Dict]:
+    """
+    Re-encode images on the recompression pool
+
+    Args:
+        source_paths: Files to consider; only RECOMPRESS_EXTENSIONS are re-encoded
+        target_dir: Directory for the re-encoded files (removed by the caller)
+        target_format: "png" or "webp"
+        cancel_event: Optional event; files not started yet are left as they are
+
+    Returns:
+        Tuple of (result per source path that got smaller, see recompress_file,
+        and a report with file counts, bytes before/after/saved, CPU and wall seconds)
+    """
+    started = time.monotonic()
+    pool = get_recompress_pool()
+    futures = {}
+    for index, source_path in enumerate(source_paths):
+        if not can_recompress(source_path):
+            continue
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        # One directory per file keeps the original name without collisions
+        file_dir = os.path.join(target_dir, str(index))
+        os.makedirs(file_dir, exist_ok=True)
+        futures[source_path] = pool.submit(
+            recompress_file, source_path, os.path.join(file_dir, name), target_format
+        )
+
+    recompressed = {}
+    report = {
+        "format": target_format,
+        "files": len(futures),
+        "recompressed": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+        "cpu_seconds": 0.0,
+    }
+    for source_path, future in futures.items():
+        if cancel_event is not None and cancel_event.is_set():
+            future.cancel()
+        if future.cancelled():
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Warning: Could not recompress {source_path}: {e}")
+            continue
+
+        report["bytes_before"] += result["original_size"]
+        report["bytes_after"] += result["size"]
+        report["cpu_seconds"] += result["cpu_seconds"]
+        if result["path"]:
+            report["recompressed"] += 1
+            recompressed[source_path] = result
+
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    report["cpu_seconds"] = round(report["cpu_seconds"], 3)
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return recompressed, report
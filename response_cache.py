@@ -0,0 +1,125 @@
+"""
+In-process cache for remote API responses
+Entries expire after a TTL; stale entries are served at once while a background refresh runs
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+
+def hash_api_key(api_key: str) -> str:
+    """Cache keys hold a hash, so API keys are not kept in memory twice"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class StaleWhileRevalidateCache:
+    """TTL cache that coalesces loads and refreshes stale entries in the background"""
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_stale: float = 3600.0,
+        max_entries: int = 256,
+        is_cacheable: Optional[Callable[[Dict], bool]] = None,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            ttl: Seconds an entry is served without refreshing it
+            max_stale: Seconds after which a stale entry is not served anymore
+                and callers wait for a fresh load
+            max_entries: Oldest entries are dropped above this count
+            is_cacheable: Decides whether a loaded value is stored (e.g. only
+                successful responses); all values are stored by default
+        """
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.is_cacheable = is_cacheable or (lambda value: True)
+        self._entries = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    async def get_async(self, key: Hashable, loader: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Get a value, loading it if it is missing or too old
+
+        Loads and background refreshes run as tasks on the event loop.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function loading the value; concurrent callers
+                for the same key share one call
+
+        Returns:
+            The cached or loaded value
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = now - loaded_at
+                if age < self.ttl:
+                    return value
+                if age < self.max_stale:
+                    if key not in self._tasks:
+                        self._tasks[key] = asyncio.ensure_future(self._load_async(key, loader))
+                    return value
+
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._load_async(key, loader))
+                self._tasks[key] = task
+
+        # A cancelled caller must not cancel the load other callers wait for
+        return await asyncio.shield(task)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        Remove entries so the next get loads them again
+
+        Loads of the removed keys that are still running are detached: their
+        callers get the result, but it is not stored, and later gets start a
+        new load.
+
+        Args:
+            predicate: Selects the keys to remove; all entries by default
+
+        Returns:
+            Number of removed entries
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            for key in [key for key in self._tasks if predicate is None or predicate(key)]:
+                del self._tasks[key]
+            return len(keys)
+
+    async def _load_async(self, key: Hashable, loader: Callable[[], Awaitable[Dict]]) -> Dict:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+            self._store(key, value, task)
+            return value
+        finally:
+            with self._lock:
+                if self._tasks.get(key) is task:
+                    del self._tasks[key]
+
+    def _store(self, key: Hashable, value: Dict, task: asyncio.Task):
+        if not self.is_cacheable(value):
+            return
+        with self._lock:
+            # Started before an invalidate, so the value may be outdated
+            if self._tasks.get(key) is not task:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
@@ -0,0 +1,123 @@
+"""
+Server-side settings for Asset Manager
+Stored as JSON in the data directory so headless instances keep their configuration
+"""
+
+import json
+import os
+import threading
+from typing import Dict
+
+
+DEFAULT_SETTINGS = {
+    # Server-side automatic upload
+    "auto_upload": False,
+    "api_key": "",
+    "organization_id": "",
+    "project_id": "",
+    "poll_interval": 2.0,
+    "settle_seconds": 3.0,
+    # Upload client options
+    "compress_requests": False,
+    "metadata_by_reference": False,
+    # Unfinished multipart uploads are aborted after this many failed attempts
+    # or this many hours
+    "resume_max_attempts": 3,
+    "resume_max_age_hours": 24.0,
+    # MiB per second shared by all uploads, 0 is unlimited
+    "upload_bandwidth_limit": 0.0,
+    # Files up to this many KiB are sent in single or grouped direct requests
+    # instead of create/part/complete (0 disables; backend must support it)
+    "direct_upload_threshold_kb": 0,
+    "direct_upload_max_files": 16,
+    # Content KiB per grouped direct request
+    "direct_upload_max_kb": 8192,
+    # Re-encode PNG/BMP/TIFF outputs losslessly before upload: "", "png" or "webp"
+    "recompress_images": "",
+    # Instances sharing one output folder take leases so each file is uploaded once
+    "coordinate_uploads": False,
+    # Shared lease folder ("" uses .asset-manager-leases in the output folder)
+    "lease_directory": "",
+    # Seconds after which the lease of a crashed instance is taken over
+    "lease_seconds": 300.0,
+    # Files claimed per watcher round, so other instances get a share
+    "lease_batch_size": 16,
+    # Output folder scanning: subdirectory levels to index (-1 is unlimited),
+    # comma separated glob patterns to skip and directories scanned in parallel
+    "scan_max_depth": -1,
+    "scan_exclude": "",
+    "scan_workers": 8,
+}
+
+
+class SettingsStore:
+    """Thread-safe settings dictionary persisted to a JSON file"""
+
+    def __init__(self, path: str, defaults: Dict = None):
+        """
+        Load settings from disk
+
+        Args:
+            path: JSON file holding the settings
+            defaults: Values used for keys missing from the file
+        """
+        self.path = path
+        self.defaults = dict(defaults if defaults is not None else DEFAULT_SETTINGS)
+        self._lock = threading.Lock()
+        self._settings = dict(self.defaults)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            self._settings.update(
+                {key: value for key, value in stored.items() if key in self.defaults}
+            )
+            # Files saved by earlier versions were readable by everyone
+            os.chmod(path, 0o600)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: Could not load Asset Manager settings from {path}: {e}")
+
+    def get(self) -> Dict:
+        with self._lock:
+            return dict(self._settings)
+
+    def update(self, values: Dict) -> Dict:
+        """
+        Update known keys, converting values to the type of their default, and save
+
+        Args:
+            values: New setting values; unknown keys are ignored
+
+        Returns:
+            The updated settings
+
+        Raises:
+            ValueError: If a value cannot be converted
+        """
+        with self._lock:
+            updated = dict(self._settings)
+            for key, value in values.items():
+                if key not in self.defaults:
+                    continue
+                default = self.defaults[key]
+                if isinstance(default, bool):
+                    value = value in (True, 1, "1", "true", "True")
+                elif isinstance(default, (int, float)):
+                    value = type(default)(value)
+                elif isinstance(default, str):
+                    value = "" if value is None else str(value)
+                updated[key] = value
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # The file holds the API key, so only the owner may read it
+            temp_path = f"{self.path}.tmp"
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.chmod(temp_path, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(updated, f, indent=2)
+            os.replace(temp_path, self.path)
+
+            self._settings = updated
+            return dict(updated)
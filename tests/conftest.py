@@ -0,0 +1,112 @@
+"""
+Shared fixtures for the Asset Manager tests
+Modules are imported without running the package __init__, which registers
+routes on a running ComfyUI server
+"""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "asset_manager_tests"
+
+
+def load_module(name: str):
+    """Import a module of the repository, e.g. load_module("api_client")"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+@pytest.fixture
+def api_client():
+    return load_module("api_client")
+
+
+@pytest.fixture
+def upload_io():
+    return load_module("upload_io")
+
+
+@pytest.fixture
+def upload_jobs():
+    return load_module("upload_jobs")
+
+
+@pytest.fixture
+def upload_ledger():
+    return load_module("upload_ledger")
+
+
+@pytest.fixture
+def upload_leases():
+    return load_module("upload_leases")
+
+
+@pytest.fixture
+def output_index():
+    return load_module("output_index")
+
+
+@pytest.fixture
+def response_cache():
+    return load_module("response_cache")
+
+
+@pytest.fixture
+def settings_store():
+    return load_module("settings_store")
+
+
+@pytest.fixture
+def async_api_client():
+    return load_module("async_api_client")
+
+
+@pytest.fixture
+def stub_server():
+    """Local stand-in for the API (see benchmarks/stub_server.py)"""
+    server = load_module("benchmarks.stub_server").StubAPIServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def api_routes(tmp_path, monkeypatch):
+    """api_routes with the output directory in tmp_path (needs ComfyUI's folder_paths)"""
+    folder_paths = pytest.importorskip("folder_paths")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    monkeypatch.setattr(folder_paths, "get_output_directory", lambda: str(output_dir))
+
+    module = load_module("api_routes")
+    monkeypatch.setattr(module, "_deferred_uploads", {})
+    monkeypatch.setattr(module, "_leased_jobs", [])
+    return module
+
+
+class FakeClock:
+    """Stands in for the time module; sleep() advances monotonic() instantly"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+        self.slept += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,484 @@
+import email.utils
+import gzip
+import itertools
+import json
+import threading
+import time
+import types
+
+import pytest
+import requests
+
+
+MIB = 1024 * 1024
+
+
+def plan(api_client, sizes, threshold=1000, max_files=3, max_bytes=2000):
+    file_data = {f"file{i}.png": bytes(size) for i, size in enumerate(sizes)}
+    return api_client.plan_direct_uploads(
+        list(file_data), file_data, threshold, max_files, max_bytes
+    )
+
+
+def test_plan_direct_uploads_disabled_by_zero_threshold(api_client):
+    assert plan(api_client, [10, 20, 30], threshold=0) == ([], [0, 1, 2])
+
+
+def test_plan_direct_uploads_sends_large_files_as_multipart(api_client):
+    groups, multipart = plan(api_client, [1000, 1001, 10, 5000])
+
+    assert groups == [[0, 2]]
+    assert multipart == [1, 3]
+
+
+def test_plan_direct_uploads_splits_at_max_files(api_client):
+    groups, multipart = plan(api_client, [10] * 7, max_files=3)
+
+    assert groups == [[0, 1, 2], [3, 4, 5], [6]]
+    assert multipart == []
+
+
+def test_plan_direct_uploads_splits_at_max_bytes(api_client):
+    groups, _ = plan(api_client, [900, 900, 200, 1000, 1000], max_files=10)
+
+    # 900 + 900 + 200 fits exactly; the next file would exceed max_bytes
+    assert groups == [[0, 1, 2], [3, 4]]
+
+
+def test_plan_direct_uploads_reads_sizes_from_disk(api_client, tmp_path):
+    small = tmp_path / "small.png"
+    small.write_bytes(bytes(100))
+    large = tmp_path / "large.png"
+    large.write_bytes(bytes(5000))
+    missing = tmp_path / "missing.png"
+
+    groups, multipart = api_client.plan_direct_uploads(
+        [str(small), str(large), str(missing)], None, 1000, 16, MIB
+    )
+
+    assert groups == [[0]]
+    # Files that cannot be statted are left to the multipart path, which reports the error
+    assert multipart == [1, 2]
+
+
+def parse_form_data(body, headers):
+    boundary = headers["Content-Type"].split("boundary=")[1].encode("utf-8")
+    parts = body.split(b"--" + boundary)
+    assert parts[-1] == b"--\r\n"
+
+    fields = {}
+    for part in parts[1:-1]:
+        head, content = part[2:-2].split(b"\r\n\r\n", 1)
+        disposition = head.decode("utf-8").split("\r\n")[0]
+        name = disposition.split('name="')[1].split('"')[0]
+        fields[name] = (disposition, content)
+    return fields
+
+
+def test_build_direct_body(api_client):
+    files = [("/out/a.png", b"\x89PNG first"), ("/out/b.webp", b"RIFF second")]
+    payload = api_client.build_direct_payload(files, "project", organization_id="org")
+    metadata = api_client.PreparedMetadata({"workflow": {"nodes": []}})
+    transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+
+    body, headers = api_client.build_direct_body(files, payload, metadata, transfer)
+    fields = parse_form_data(body, headers)
+
+    sent = json.loads(fields["payload"][1])
+    assert sent["metadata"] == {"workflow": {"nodes": []}}
+    assert sent["folderId"] == "project"
+    assert [entry["fileSize"] for entry in sent["files"]] == [10, 11]
+    assert fields["file0"] == (
+        'Content-Disposition: form-data; name="file0"; filename="a.png"',
+        b"\x89PNG first",
+    )
+    assert fields["file1"][1] == b"RIFF second"
+    assert transfer["json_bytes"] == len(fields["payload"][1])
+    assert transfer["metadata_bytes"] == metadata.size
+
+
+def test_build_direct_body_sends_null_without_metadata(api_client):
+    files = [("/out/a.png", b"content")]
+    payload = api_client.build_direct_payload(files, "project")
+    transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+
+    body, headers = api_client.build_direct_body(
+        files, payload, api_client.PreparedMetadata(None), transfer
+    )
+
+    assert json.loads(parse_form_data(body, headers)["payload"][1])["metadata"] is None
+
+
+def test_build_json_body_splices_prepared_metadata(api_client):
+    metadata = api_client.PreparedMetadata({"workflow": {"nodes": [1, 2]}})
+    transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+
+    body, headers = api_client.build_json_body({"key": "k"}, metadata, transfer)
+
+    assert json.loads(body) == {"key": "k", "metadata": {"workflow": {"nodes": [1, 2]}}}
+    assert headers == {"Content-Type": "application/json"}
+    assert transfer["metadata_bytes"] == metadata.size
+    assert transfer["json_bytes"] == transfer["json_bytes_uncompressed"] == len(body)
+
+
+def test_build_json_body_sends_null_and_omits_metadata(api_client):
+    transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+
+    body, _ = api_client.build_json_body({}, api_client.PreparedMetadata(None), transfer)
+    assert json.loads(body) == {"metadata": None}
+
+    body, _ = api_client.build_json_body({"key": "k"}, None, transfer)
+    assert json.loads(body) == {"key": "k"}
+
+
+def test_build_json_body_compresses(api_client):
+    metadata = api_client.PreparedMetadata({"workflow": {"nodes": [{}] * 500}})
+    transfer = {"json_bytes": 0, "json_bytes_uncompressed": 0, "metadata_bytes": 0}
+
+    body, headers = api_client.build_json_body({"key": "k"}, metadata, transfer, compress=True)
+
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body))["metadata"] == {"workflow": {"nodes": [{}] * 500}}
+    assert transfer["json_bytes"] == len(body) < transfer["json_bytes_uncompressed"]
+
+
+def test_chunk_size_policy_single_part_for_small_files(api_client):
+    policy = api_client.ChunkSizePolicy()
+
+    assert policy.part_size(0, 10 * MIB) == 1
+    assert policy.part_size(3 * MIB, 10 * MIB) == 3 * MIB
+    assert policy.part_size(5 * MIB, 10 * MIB) == 5 * MIB
+
+
+def test_chunk_size_policy_uses_default_before_measuring(api_client):
+    policy = api_client.ChunkSizePolicy()
+
+    assert policy.throughput is None
+    assert policy.part_size(100 * MIB, 10 * MIB) == 10 * MIB
+    # Split so every concurrent stream gets a part
+    assert policy.part_size(20 * MIB, 10 * MIB, concurrency=4) == 5 * MIB
+
+
+def test_chunk_size_policy_sizes_parts_by_throughput(api_client):
+    policy = api_client.ChunkSizePolicy(target_part_seconds=10.0)
+    policy.record(4 * MIB, 1.0)
+
+    assert policy.throughput == 4 * MIB
+    assert policy.part_size(1024 * MIB, 10 * MIB) == 40 * MIB
+    # Rounded up to whole MiB
+    policy.record(int(1.55 * MIB), 1.0)
+    assert policy.part_size(1024 * MIB, 10 * MIB) % MIB == 0
+
+
+def test_chunk_size_policy_respects_limits(api_client):
+    policy = api_client.ChunkSizePolicy(max_part_size=64 * MIB, max_parts=100)
+    policy.record(100 * MIB, 1.0)
+    assert policy.part_size(1024 * MIB, 10 * MIB) == 64 * MIB
+
+    slow = api_client.ChunkSizePolicy(max_parts=100)
+    slow.record(10 * 1024, 1.0)
+    assert slow.part_size(1000 * MIB, 10 * MIB) == 10 * MIB
+    assert slow.part_size(20 * MIB, 10 * MIB) == 5 * MIB
+
+
+def test_chunk_size_policy_ignores_empty_samples(api_client):
+    policy = api_client.ChunkSizePolicy()
+    policy.record(0, 1.0)
+    policy.record(MIB, 0)
+
+    assert policy.throughput is None
+
+
+def test_chunk_size_policy_averages_samples(api_client):
+    policy = api_client.ChunkSizePolicy()
+    policy.record(10 * MIB, 1.0)
+    policy.record(20 * MIB, 1.0)
+
+    assert policy.throughput == pytest.approx(13 * MIB)
+
+
+def test_part_timeout_never_below_twice_base(api_client):
+    policy = api_client.ChunkSizePolicy()
+    assert policy.part_timeout(10 * MIB, 30) == 60
+
+    policy.record(100 * MIB, 1.0)
+    assert policy.part_timeout(10 * MIB, 30) == 60
+
+    policy = api_client.ChunkSizePolicy()
+    policy.record(MIB, 1.0)
+    assert policy.part_timeout(100 * MIB, 30) == pytest.approx(300)
+
+
+def make_client(api_client, stub_server, **options):
+    """Client for the stand-in API with 1 MiB parts and short backoff"""
+    client = api_client.AssetManagerAPIClient(
+        "key", base_url=f"{stub_server.url}/api", **options
+    )
+    client.upload_base_url = stub_server.url
+    client.chunk_size = MIB
+    client.chunk_policy = api_client.ChunkSizePolicy(min_part_size=MIB)
+    client.backoff_base = 0.01
+    return client
+
+
+def fail_part_requests(stub_server, *numbers):
+    """Answer the given part requests (counted from 1 as they arrive) with a 503"""
+    count = itertools.count(1)
+    stub_server.error_rate = 0.5
+    stub_server.random = types.SimpleNamespace(
+        random=lambda: 0.0 if next(count) in numbers else 1.0
+    )
+
+
+def record_completions(client, monkeypatch):
+    """Collect the payloads of complete requests sent by the client"""
+    completions = []
+    post_json = client._post_json
+
+    def recording_post_json(url, payload, metadata, transfer):
+        if url.endswith("/complete"):
+            completions.append(payload)
+        return post_json(url, payload, metadata, transfer)
+
+    monkeypatch.setattr(client, "_post_json", recording_post_json)
+    return completions
+
+
+@pytest.fixture
+def resumable_upload(api_client, upload_ledger, stub_server, tmp_path, monkeypatch):
+    """A 4-part upload whose last part failed, with the first three saved in a ledger"""
+    ledger = upload_ledger.UploadLedger(str(tmp_path / "ledger.db"))
+    client = make_client(api_client, stub_server, part_concurrency=1, resume_store=ledger)
+    client.max_retries = 0
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(4 * MIB))
+
+    fail_part_requests(stub_server, 4)
+    result = client.upload_asset(str(path), "project")
+    assert result["status"] == "error"
+    assert "progress saved" in result["message"]
+
+    resume_key = client._resume_key(str(path), "project")
+    assert sorted(ledger.load_multipart(resume_key)["parts"]) == [1, 2, 3]
+    return types.SimpleNamespace(
+        client=client,
+        ledger=ledger,
+        path=str(path),
+        resume_key=resume_key,
+        completions=record_completions(client, monkeypatch),
+    )
+
+
+def test_failed_upload_resumes_from_first_missing_part(resumable_upload, stub_server):
+    upload = resumable_upload
+
+    result = upload.client.upload_asset(upload.path, "project")
+
+    assert result["status"] == "success"
+    assert result["resumed_parts"] == 3
+    assert result["data"]["asset"]["size"] == 4 * MIB
+    [completion] = upload.completions
+    assert [part["partNumber"] for part in completion["parts"]] == [1, 2, 3, 4]
+    assert all(part["etag"] for part in completion["parts"])
+    stats = stub_server.get_stats()
+    # 4 parts in the failed attempt, then only the missing one
+    assert stats["requests"]["/api/upload/part"] == 5
+    assert stats["requests"]["/api/upload/create"] == 1
+    assert stats["aborted_uploads"] == 0
+    assert upload.ledger.load_multipart(upload.resume_key) is None
+
+
+def test_resume_restarts_when_backend_forgot_the_upload(resumable_upload, stub_server):
+    upload = resumable_upload
+    stub_server.uploads.clear()
+
+    result = upload.client.upload_asset(upload.path, "project")
+
+    assert result["status"] == "success"
+    assert result["resumed_parts"] == 0
+    assert result["data"]["asset"]["size"] == 4 * MIB
+    [completion] = upload.completions
+    assert [part["partNumber"] for part in completion["parts"]] == list(
+        range(1, len(completion["parts"]) + 1)
+    )
+    stats = stub_server.get_stats()
+    assert stats["requests"]["/api/upload/create"] == 2
+    assert stats["completed_uploads"] == 1
+    assert upload.ledger.load_multipart(upload.resume_key) is None
+
+
+def test_upload_is_aborted_after_max_resume_attempts(resumable_upload, stub_server):
+    upload = resumable_upload
+    upload.client.max_resume_attempts = 2
+    fail_part_requests(stub_server, 1)
+
+    result = upload.client.upload_asset(upload.path, "project")
+
+    assert result["status"] == "error"
+    assert "progress saved" not in result["message"]
+    assert stub_server.get_stats()["aborted_uploads"] == 1
+    assert upload.ledger.load_multipart(upload.resume_key) is None
+
+
+@pytest.mark.parametrize("status, missing", [(404, True), (410, True), (500, False), (403, False)])
+def test_missing_upload_statuses(api_client, status, missing):
+    response = requests.Response()
+    response.status_code = status
+
+    assert api_client._is_missing_upload(requests.HTTPError(response=response)) is missing
+
+
+def test_retry_delay_honors_retry_after(api_client):
+    assert api_client.retry_delay(0, "3", 0.5, 30.0) == 3.0
+    assert api_client.retry_delay(0, "120", 0.5, 30.0) == 30.0
+
+    retry_at = email.utils.formatdate(time.time() + 10, usegmt=True)
+    assert 8.0 <= api_client.retry_delay(0, retry_at, 0.5, 30.0) <= 10.0
+
+
+def test_retry_delay_backs_off_exponentially_with_jitter(api_client):
+    for attempt in range(8):
+        delay = api_client.retry_delay(attempt, None, 0.5, 30.0)
+        assert 0 <= delay <= min(30.0, 0.5 * 2**attempt)
+
+    # Unparseable Retry-After falls back to backoff
+    assert 0 <= api_client.retry_delay(0, "soon", 0.5, 30.0) <= 0.5
+
+
+@pytest.mark.parametrize(
+    "status, retryable",
+    [
+        (408, True),
+        (429, True),
+        (500, True),
+        (503, True),
+        (400, False),
+        (401, False),
+        (403, False),
+        (404, False),
+        (501, False),
+    ],
+)
+def test_retryable_statuses(api_client, status, retryable):
+    response = requests.Response()
+    response.status_code = status
+
+    assert api_client.is_retryable_error(requests.HTTPError(response=response)) is retryable
+
+
+def test_connection_errors_are_retryable(api_client):
+    assert api_client.is_retryable_error(requests.exceptions.ConnectionError())
+    assert api_client.is_retryable_error(requests.exceptions.ReadTimeout())
+    assert not api_client.is_retryable_error(ValueError())
+
+
+def test_transient_part_failures_are_retried_after_retry_after(
+    api_client, stub_server, monkeypatch
+):
+    client = make_client(api_client, stub_server, part_concurrency=1)
+    client.backoff_base = 60.0
+    delays = []
+    retry_delay = client._retry_delay
+
+    def recording_retry_delay(attempt, response=None):
+        delays.append(retry_delay(attempt, response))
+        return delays[-1]
+
+    monkeypatch.setattr(client, "_retry_delay", recording_retry_delay)
+    completions = record_completions(client, monkeypatch)
+    fail_part_requests(stub_server, 1, 2)
+
+    result = client.upload_asset("video.mp4", "project", data=bytes(3 * MIB))
+
+    assert result["status"] == "success"
+    # The stand-in sends Retry-After: 0, which replaces the 60 s backoff
+    assert delays == [0.0, 0.0]
+    assert stub_server.get_stats()["requests"]["/api/upload/part"] == 5
+    assert [part["partNumber"] for part in completions[0]["parts"]] == [1, 2, 3]
+
+
+def test_client_errors_are_not_retried(api_client, stub_server, monkeypatch):
+    client = make_client(api_client, stub_server)
+    post_json = client._post_json
+
+    def forgetting_post_json(url, payload, metadata, transfer):
+        response = post_json(url, payload, metadata, transfer)
+        if url.endswith("/create"):
+            # Parts of an upload the backend does not know get a 404
+            stub_server.uploads.clear()
+        return response
+
+    monkeypatch.setattr(client, "_post_json", forgetting_post_json)
+
+    result = client.upload_asset("image.png", "project", data=bytes(1000))
+
+    assert result["status"] == "error"
+    assert result["retryable"] is False
+    requests_sent = stub_server.get_stats()["requests"]
+    assert requests_sent["/api/upload/part"] == 1
+    assert requests_sent["/api/upload/abort"] == 1
+    assert "/api/upload/complete" not in requests_sent
+
+
+def test_upload_parts_returns_parts_in_order(api_client, monkeypatch):
+    client = api_client.AssetManagerAPIClient("key", part_concurrency=4)
+    uploaded = []
+
+    def upload_part(
+        source, file_size, part_number, upload_id, key, chunk_size, stop_event, on_part, on_read
+    ):
+        # Later parts finish first
+        time.sleep(0.01 * (6 - part_number))
+        uploaded.append(part_number)
+        part = {"partNumber": part_number, "etag": f"etag-{part_number}"}
+        on_part(part)
+        return part
+
+    monkeypatch.setattr(client, "_upload_part", upload_part)
+    saved = []
+
+    parts = client._upload_parts(
+        bytes(6 * MIB), 6 * MIB, "upload", "key", MIB, {2: "saved-2"}, saved.append
+    )
+
+    assert parts == [
+        {"partNumber": number, "etag": "saved-2" if number == 2 else f"etag-{number}"}
+        for number in range(1, 7)
+    ]
+    assert sorted(uploaded) == [1, 3, 4, 5, 6]
+    assert uploaded != sorted(uploaded)
+    assert sorted(part["partNumber"] for part in saved) == [1, 3, 4, 5, 6]
+
+
+def test_first_failing_part_stops_the_others(api_client, monkeypatch):
+    client = api_client.AssetManagerAPIClient("key", part_concurrency=2)
+    lock = threading.Lock()
+    started = []
+    finished = []
+
+    def upload_part(
+        source, file_size, part_number, upload_id, key, chunk_size, stop_event, on_part, on_read
+    ):
+        with lock:
+            started.append(part_number)
+        try:
+            if part_number == 1:
+                raise ValueError("part 1 failed")
+            if stop_event.wait(5):
+                raise RuntimeError(f"Part {part_number} stopped")
+            return {"partNumber": part_number, "etag": "etag"}
+        finally:
+            with lock:
+                finished.append(part_number)
+
+    monkeypatch.setattr(client, "_upload_part", upload_part)
+    began = time.monotonic()
+
+    with pytest.raises(ValueError, match="part 1 failed"):
+        client._upload_parts(bytes(8 * MIB), 8 * MIB, "upload", "key", MIB)
+
+    # Running parts were stopped instead of waiting out their upload
+    assert time.monotonic() - began < 2
+    # Queued parts were cancelled before they started
+    assert len(started) < 8
+    assert sorted(finished) == sorted(started)
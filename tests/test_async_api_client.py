@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+
+MIB = 1024 * 1024
+
+
+def make_client(async_api_client, stub_server, **options):
+    client = async_api_client.AsyncAssetManagerAPIClient(
+        "key", base_url=f"{stub_server.url}/api", **options
+    )
+    client.upload_base_url = stub_server.url
+    client.backoff_base = 0.01
+    return client
+
+
+def run(coroutine):
+    async def guarded():
+        return await asyncio.wait_for(coroutine, 30)
+
+    return asyncio.run(guarded())
+
+
+def test_batch_upload_streams_parts_and_groups_small_files(
+    async_api_client, stub_server, tmp_path
+):
+    client = make_client(async_api_client, stub_server)
+    client.direct_upload_threshold = 64 * 1024
+    paths = []
+    for name, size in [("a.png", 100), ("b.png", 2000), ("c.mp4", 12 * MIB)]:
+        path = tmp_path / name
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    statuses = []
+
+    async def upload():
+        try:
+            return await client.batch_upload_assets(
+                paths,
+                "project",
+                metadata={"workflow": {}},
+                on_file_status=lambda path, status, error: statuses.append(status),
+            )
+        finally:
+            await client.close()
+
+    result = run(upload())
+
+    assert result["status"] == "success"
+    assert result["routes"] == {"batch": 2, "multipart": 1}
+    assert statuses.count("success") == 3
+    stats = stub_server.get_stats()
+    assert stats["requests"]["/api/upload/direct"] == 1
+    assert stats["requests"]["/api/upload/part"] == 3
+    assert stats["completed_uploads"] == 3
+
+
+def test_part_failures_are_retried(async_api_client, stub_server):
+    stub_server.error_rate = 0.5
+    client = make_client(async_api_client, stub_server)
+    client.max_retries = 10
+
+    async def upload():
+        try:
+            return await client.upload_asset("a.mp4", "project", data=os.urandom(12 * MIB))
+        finally:
+            await client.close()
+
+    result = run(upload())
+
+    assert result["status"] == "success"
+    assert stub_server.get_stats()["injected_errors"] > 0
+
+
+def test_retired_client_closes_after_its_last_call(async_api_client, stub_server):
+    client = make_client(async_api_client, stub_server)
+
+    async def retire_during_upload():
+        upload = asyncio.ensure_future(
+            client.upload_asset("a.mp4", "project", data=os.urandom(12 * MIB))
+        )
+        await asyncio.sleep(0.01)
+        await client.retire()
+        session = client._session
+        assert session is not None and not session.closed
+
+        result = await upload
+        assert session.closed
+        return result
+
+    assert run(retire_during_upload())["status"] == "success"
@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    root = tmp_path / "output"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.png").write_bytes(b"a")
+    (root / "notes.md").write_bytes(b"not indexed")
+    (root / "sub" / "b.mp4").write_bytes(b"b")
+    return root
+
+
+@pytest.fixture
+def index(output_index, output_dir):
+    index = output_index.OutputIndex(str(output_dir))
+    index.refresh()
+    return index
+
+
+def paths(entries):
+    return sorted(entry["path"] for entry in entries)
+
+
+def test_first_listing_resets_with_every_file(index):
+    changes = index.changes_since(None)
+
+    assert changes["reset"] is True
+    assert paths(changes["added"]) == ["a.png", "sub/b.mp4"]
+    assert changes["cursor"] == index.cursor
+
+
+def test_changes_since_cursor_hold_only_the_delta(index, output_dir):
+    cursor = index.changes_since(None)["cursor"]
+    (output_dir / "sub" / "c.webp").write_bytes(b"c")
+    os.remove(output_dir / "a.png")
+    index.refresh(force=True)
+
+    changes = index.changes_since(cursor)
+
+    assert changes["reset"] is False
+    assert paths(changes["added"]) == ["sub/c.webp"]
+    assert changes["removed"] == ["a.png"]
+    assert changes["cursor"] != cursor
+    assert index.changes_since(changes["cursor"]) == {
+        "cursor": changes["cursor"],
+        "reset": False,
+        "added": [],
+        "removed": [],
+    }
+
+
+def test_unchanged_directories_are_not_listed_again(index, output_dir, monkeypatch):
+    scanned = []
+    scan_dir = index._scan_dir
+
+    def recording_scan_dir(rel_dir, *args):
+        scanned.append(rel_dir)
+        return scan_dir(rel_dir, *args)
+
+    monkeypatch.setattr(index, "_scan_dir", recording_scan_dir)
+    index.refresh(force=True)
+    assert scanned == []
+
+    (output_dir / "sub" / "c.png").write_bytes(b"c")
+    index.refresh(force=True)
+    assert scanned == ["sub"]
+
+
+def test_rewritten_recent_file_is_reported_again(index, output_dir):
+    cursor = index.cursor
+    path = output_dir / "a.png"
+    path.write_bytes(b"a new, longer version")
+    # Rewriting a file leaves the mtime of its directory alone
+    stat_info = os.stat(path)
+    os.utime(path, ns=(stat_info.st_atime_ns, stat_info.st_mtime_ns + 10**9))
+    index.refresh(force=True)
+
+    changes = index.changes_since(cursor)
+
+    assert paths(changes["added"]) == ["a.png"]
+    assert changes["added"][0]["size"] == len(b"a new, longer version")
+
+
+def test_removed_directory_reports_its_files(index, output_dir):
+    cursor = index.cursor
+    os.remove(output_dir / "sub" / "b.mp4")
+    os.rmdir(output_dir / "sub")
+    index.refresh(force=True)
+
+    assert index.changes_since(cursor)["removed"] == ["sub/b.mp4"]
+    assert paths(index.list_files()) == ["a.png"]
+
+
+def test_unknown_or_expired_cursor_resets(output_index, output_dir):
+    index = output_index.OutputIndex(str(output_dir), max_changes=2)
+    index.refresh()
+    first = index.cursor
+    (output_dir / "c.png").write_bytes(b"c")
+    (output_dir / "d.png").write_bytes(b"d")
+    (output_dir / "e.png").write_bytes(b"e")
+    index.refresh(force=True)
+
+    # The change records of first were dropped
+    assert index.changes_since(first)["reset"] is True
+    assert index.changes_since("other-epoch-1")["reset"] is True
+    assert index.changes_since(f"{index.epoch}-999")["reset"] is True
+    assert paths(index.changes_since(first)["added"]) == ["a.png", "c.png", "d.png", "e.png", "sub/b.mp4"]
+
+
+
+def test_max_depth_and_exclude_limit_the_index(output_index, output_dir):
+    (output_dir / "_temp").mkdir()
+    (output_dir / "_temp" / "preview.png").write_bytes(b"p")
+    (output_dir / "skip.png").write_bytes(b"s")
+
+    shallow = output_index.OutputIndex(str(output_dir), max_depth=0)
+    shallow.refresh()
+    assert paths(shallow.list_files()) == ["a.png", "skip.png"]
+
+    filtered = output_index.OutputIndex(str(output_dir), exclude=["_temp", "skip.*"])
+    filtered.refresh()
+    assert paths(filtered.list_files()) == ["a.png", "sub/b.mp4"]
+
+
+def test_directories_are_streamed_as_they_are_scanned(output_index, output_dir):
+    for number in range(5):
+        subdir = output_dir / f"dir{number}"
+        subdir.mkdir()
+        (subdir / f"{number}.png").write_bytes(b"x")
+    index = output_index.OutputIndex(str(output_dir), max_workers=4)
+    batches = []
+
+    index.refresh(on_directory=batches.append)
+
+    assert sorted(paths(batch) for batch in batches) == sorted(
+        [["a.png"], ["sub/b.mp4"]] + [[f"dir{number}/{number}.png"] for number in range(5)]
+    )
+    assert sorted(path for batch in batches for path in paths(batch)) == paths(index.list_files())
+
+    # A reused scan streams the indexed directories again
+    replayed = []
+    index.refresh(on_directory=replayed.append)
+    assert sorted(map(paths, replayed)) == sorted(map(paths, batches))
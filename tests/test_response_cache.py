@@ -0,0 +1,73 @@
+import asyncio
+
+
+def test_loads_are_shared_and_cached(response_cache):
+    cache = response_cache.StaleWhileRevalidateCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"status": "success", "value": len(calls)}
+
+    async def run():
+        first, second = await asyncio.gather(
+            cache.get_async("key", loader), cache.get_async("key", loader)
+        )
+        third = await cache.get_async("key", loader)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == second == third == {"status": "success", "value": 1}
+    assert len(calls) == 1
+
+
+def test_uncacheable_values_are_not_stored(response_cache):
+    cache = response_cache.StaleWhileRevalidateCache(
+        is_cacheable=lambda value: value["status"] == "success"
+    )
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"status": "error"}
+
+    async def run():
+        await cache.get_async("key", loader)
+        await cache.get_async("key", loader)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_invalidate_ignores_loads_started_before(response_cache):
+    cache = response_cache.StaleWhileRevalidateCache(ttl=60)
+    started = []
+    release = {}
+
+    async def loader():
+        number = len(started) + 1
+        started.append(number)
+        await release[number].wait()
+        return {"status": "success", "load": number}
+
+    async def run():
+        release[1] = asyncio.Event()
+        release[2] = asyncio.Event()
+        old = asyncio.ensure_future(cache.get_async("key", loader))
+        await asyncio.sleep(0)
+
+        assert cache.invalidate(lambda key: key == "key") == 0
+        new = asyncio.ensure_future(cache.get_async("key", loader))
+        await asyncio.sleep(0)
+        release[2].set()
+        # Before the fix this joined the older load, which never finishes here
+        assert (await asyncio.wait_for(new, 5))["load"] == 2
+
+        # The older load finishes last but must not replace the newer value
+        release[1].set()
+        assert (await old)["load"] == 1
+        return await cache.get_async("key", loader)
+
+    assert asyncio.run(run())["load"] == 2
+    assert started == [1, 2]
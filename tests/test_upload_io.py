@@ -0,0 +1,76 @@
+import pytest
+
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def limiter(upload_io, clock, monkeypatch):
+    monkeypatch.setattr(upload_io, "time", clock)
+    return upload_io.BandwidthLimiter(rate=MIB)
+
+
+def test_unlimited_never_waits(upload_io, clock, monkeypatch):
+    monkeypatch.setattr(upload_io, "time", clock)
+    limiter = upload_io.BandwidthLimiter()
+
+    for _ in range(10):
+        limiter.consume(100 * MIB)
+
+    assert clock.slept == 0
+
+
+def test_blocks_are_paced_at_the_rate(limiter, clock):
+    for _ in range(16):
+        limiter.consume(256 * 1024)
+
+    assert clock.slept == pytest.approx(4.0)
+
+
+def test_concurrent_reservations_share_the_rate(limiter):
+    # Debt accumulates, so the second caller waits behind the first
+    assert limiter.reserve(MIB // 2) == pytest.approx(0.5)
+    assert limiter.reserve(MIB // 2) == pytest.approx(1.0)
+
+
+def test_idle_time_allows_one_burst(limiter, clock):
+    clock.sleep(60)
+    clock.slept = 0
+
+    capacity = max(MIB * limiter.burst_seconds, 256 * 1024)
+    limiter.consume(int(capacity))
+    assert clock.slept == 0
+
+    limiter.consume(MIB)
+    assert clock.slept == pytest.approx(1.0)
+
+
+def test_set_rate_applies_to_next_block(limiter, clock):
+    limiter.consume(MIB)
+    assert clock.slept == pytest.approx(1.0)
+
+    limiter.set_rate(2 * MIB)
+    limiter.consume(MIB)
+    assert clock.slept == pytest.approx(1.5)
+
+    limiter.set_rate(0)
+    limiter.consume(100 * MIB)
+    assert clock.slept == pytest.approx(1.5)
+
+
+def test_window_reads_are_throttled_block_by_block(upload_io, limiter, clock):
+    consumed = []
+
+    def consume(nbytes):
+        consumed.append(nbytes)
+        limiter.consume(nbytes)
+
+    body = bytes(MIB)
+    with upload_io.open_window(body, 0, len(body), None, consume) as window:
+        # A read of the whole window still comes back in throttled blocks
+        data = b"".join(bytes(block) for block in iter(window.read, b""))
+
+    assert data == body
+    assert max(consumed) <= upload_io.READ_BLOCK_SIZE
+    assert sum(consumed) == len(body)
+    assert clock.slept == pytest.approx(1.0)
@@ -0,0 +1,171 @@
+import threading
+import time
+
+import pytest
+
+
+def wait_finished(*jobs, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not all(job.finished for job in jobs):
+        assert time.monotonic() < deadline, "jobs did not finish"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def blocked_queue(upload_jobs):
+    """A single-worker queue whose worker is held until release is set"""
+    queue = upload_jobs.UploadJobQueue(max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+        return {"status": "success"}
+
+    blocker = queue.submit(["blocker.png"], block)
+    assert started.wait(5)
+    yield queue, release
+    release.set()
+    wait_finished(blocker)
+
+
+def test_job_runs_in_background_and_keeps_its_result(upload_jobs):
+    queue = upload_jobs.UploadJobQueue()
+
+    def upload(job):
+        job.set_file_status("a.png", "success")
+        job.set_file_status("b.png", "error", "File not found")
+        return {"status": "partial", "message": "Uploaded 1/2 assets successfully"}
+
+    job = queue.submit(["a.png", "b.png"], upload)
+    wait_finished(job)
+
+    assert queue.get(job.job_id) is job
+    state = job.to_dict()
+    assert state["status"] == "partial"
+    assert state["result"]["message"] == "Uploaded 1/2 assets successfully"
+    assert state["files"] == [
+        {"file": "a.png", "status": "success"},
+        {"file": "b.png", "status": "error", "error": "File not found"},
+    ]
+    assert state["started_at"] <= state["finished_at"]
+
+
+def test_failing_worker_finishes_the_job_with_an_error(upload_jobs):
+    queue = upload_jobs.UploadJobQueue()
+
+    def upload(job):
+        raise RuntimeError("API unreachable")
+
+    job = queue.submit(["a.png"], upload)
+    wait_finished(job)
+
+    assert job.status == "error"
+    assert job.result == {"status": "error", "message": "API unreachable"}
+
+
+def test_cancelled_queued_job_never_runs(blocked_queue):
+    queue, release = blocked_queue
+    ran = []
+    finished = []
+
+    job = queue.submit(["a.png"], ran.append, on_finished=finished.append)
+    assert queue.cancel(job.job_id)
+
+    assert job.status == "cancelled"
+    assert finished == [job]
+    assert job.to_dict()["files"] == [{"file": "a.png", "status": "cancelled"}]
+    release.set()
+    later = queue.submit(["b.png"], lambda job: {"status": "success"})
+    wait_finished(later)
+    assert ran == []
+    assert not queue.cancel(job.job_id)
+
+
+def test_cancelled_running_job_ends_cancelled(upload_jobs):
+    queue = upload_jobs.UploadJobQueue()
+    started = threading.Event()
+
+    def upload(job):
+        started.set()
+        job.cancel_event.wait(5)
+        return {"status": "success"}
+
+    job = queue.submit(["a.png"], upload)
+    assert started.wait(5)
+    assert queue.cancel(job.job_id)
+    wait_finished(job)
+
+    assert job.status == "cancelled"
+    assert not queue.cancel(job.job_id)
+
+
+def test_finished_jobs_are_pruned(upload_jobs):
+    queue = upload_jobs.UploadJobQueue(max_finished_jobs=2)
+    jobs = []
+    for number in range(4):
+        jobs.append(queue.submit([f"{number}.png"], lambda job: {"status": "success"}))
+        wait_finished(jobs[-1])
+
+    last = queue.submit(["last.png"], lambda job: {"status": "success"})
+    wait_finished(last)
+
+    assert [job.job_id for job in queue.list_jobs()][:2] == [jobs[2].job_id, jobs[3].job_id]
+    assert queue.get(jobs[0].job_id) is None
+
+
+
+def record_run(order, name):
+    """Worker that appends name to order when the job runs"""
+    return lambda job: order.append(name) or {"status": "success"}
+
+
+def test_manual_jobs_run_before_automatic_ones(upload_jobs, blocked_queue):
+    queue, release = blocked_queue
+    automatic = upload_jobs.PRIORITY_AUTOMATIC
+    order = []
+
+    jobs = [
+        queue.submit(["a.png"], record_run(order, "auto-small"), priority=automatic, size=10),
+        queue.submit(["b.png"], record_run(order, "manual-large"), size=10**9),
+        queue.submit(["c.png"], record_run(order, "manual-small"), size=10),
+    ]
+    release.set()
+    wait_finished(*jobs)
+
+    assert order == ["manual-small", "manual-large", "auto-small"]
+
+
+def test_smaller_jobs_run_first_in_submission_order_on_ties(blocked_queue):
+    queue, release = blocked_queue
+    order = []
+
+    sizes = [("large", 5000), ("first-small", 10), ("medium", 100), ("second-small", 10)]
+    jobs = [
+        queue.submit([f"{name}.png"], record_run(order, name), size=size)
+        for name, size in sizes
+    ]
+    release.set()
+    wait_finished(*jobs)
+
+    assert order == ["first-small", "second-small", "medium", "large"]
+
+
+def test_job_waiting_past_max_wait_is_no_longer_passed(upload_jobs, blocked_queue):
+    queue, release = blocked_queue
+    queue.max_wait = 60
+    automatic = upload_jobs.PRIORITY_AUTOMATIC
+    order = []
+
+    old = queue.submit(["old.mp4"], record_run(order, "old"), priority=automatic, size=10**9)
+    old.created_at -= 120
+    jobs = [
+        queue.submit(["a.png"], record_run(order, "auto-small"), priority=automatic, size=10),
+        queue.submit(["b.png"], record_run(order, "manual-small"), size=10),
+    ]
+    release.set()
+    wait_finished(old, *jobs)
+
+    # Ahead of smaller automatic jobs, still behind manual ones
+    assert order == ["manual-small", "old", "auto-small"]
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+
+
+def age(path, seconds):
+    """Move a lease file's mtime into the past, as if its owner stopped renewing it"""
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_competing_stores_get_one_winner_per_key(upload_leases, tmp_path):
+    stores = [
+        upload_leases.LeaseStore(str(tmp_path), ttl=60, owner=owner) for owner in ("a", "b", "c")
+    ]
+    keys = [f"key{i}" for i in range(100)]
+    winners = {key: [] for key in keys}
+
+    def claim(store):
+        for key in keys:
+            if store.acquire(key, f"{key}.png") == "acquired":
+                winners[key].append(store.owner)
+
+    threads = [threading.Thread(target=claim, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(len(owners) == 1 for owners in winners.values())
+    assert sum(store.held_count() for store in stores) == len(keys)
+
+
+def test_held_lease_is_not_acquired_again(upload_leases, tmp_path):
+    first = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="first")
+    second = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="second")
+
+    assert first.acquire("key", "a.png") == "acquired"
+    assert first.acquire("key", "a.png") == upload_leases.LEASE_HELD
+    assert second.acquire("key", "a.png") == upload_leases.LEASE_HELD
+    assert second.read("key")["owner"] == "first"
+
+
+def test_expired_lease_is_taken_over(upload_leases, tmp_path):
+    crashed = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="crashed")
+    other = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="other")
+
+    assert crashed.acquire("key", "a.png") == "acquired"
+    age(os.path.join(str(tmp_path), "key.lease"), 120)
+
+    assert other.acquire("key", "a.png") == "acquired"
+    assert other.read("key")["owner"] == "other"
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".stale")]
+
+
+def test_renewed_lease_is_not_taken_over(upload_leases, tmp_path):
+    owner = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="owner")
+    other = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="other")
+
+    assert owner.acquire("key", "a.png") == "acquired"
+    age(os.path.join(str(tmp_path), "key.lease"), 120)
+    owner.renew()
+
+    assert other.acquire("key", "a.png") == upload_leases.LEASE_HELD
+
+
+def test_lease_taken_over_is_dropped_on_renew(upload_leases, tmp_path):
+    crashed = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="crashed")
+    other = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="other")
+
+    crashed.acquire("key", "a.png")
+    age(os.path.join(str(tmp_path), "key.lease"), 120)
+    other.acquire("key", "a.png")
+    crashed.renew()
+
+    assert crashed.held_count() == 0
+    assert other.read("key")["owner"] == "other"
+
+
+def test_take_over_leaves_lease_created_after_expiry(upload_leases, tmp_path):
+    crashed = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="crashed")
+    slow = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="slow")
+    fast = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="fast")
+    path = os.path.join(str(tmp_path), "key.lease")
+
+    crashed.acquire("key", "a.png")
+    age(path, 120)
+    expired = slow.read("key")
+    # fast takes the lease over before slow gets to it
+    assert fast.acquire("key", "a.png") == "acquired"
+    age(path, 120)
+
+    assert slow._take_over(path, expired) is False
+    assert fast.read("key")["owner"] == "fast"
+    fast.renew()
+    assert fast.held_count() == 1
+
+
+def test_lease_lost_during_take_over_is_not_finished(upload_leases, tmp_path, monkeypatch):
+    crashed = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="crashed")
+    slow = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="slow")
+    fast = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="fast")
+    third = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="third")
+    path = os.path.join(str(tmp_path), "key.lease")
+
+    crashed.acquire("key", "a.png")
+    age(path, 120)
+    expired = slow.read("key")
+    fast.acquire("key", "a.png")
+    age(path, 120)
+
+    # third creates the lease while slow has fast's lease renamed aside
+    link = os.link
+
+    def link_after_third_acquires(source, target):
+        assert third.acquire("key", "a.png") == "acquired"
+        link(source, target)
+
+    monkeypatch.setattr(upload_leases.os, "link", link_after_third_acquires)
+    assert slow._take_over(path, expired) is False
+    monkeypatch.setattr(upload_leases.os, "link", link)
+
+    fast.release("key", done=True)
+    assert third.read("key")["state"] == upload_leases.LEASE_HELD
+    assert third.read("key")["owner"] == "third"
+    third.release("key", done=True)
+    assert fast.acquire("key", "a.png") == upload_leases.LEASE_DONE
+
+
+def test_renew_drops_lease_replaced_by_other_owner(upload_leases, tmp_path):
+    crashed = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="crashed")
+    other = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="other")
+
+    crashed.acquire("key", "a.png")
+    os.remove(os.path.join(str(tmp_path), "key.lease"))
+    other.acquire("key", "a.png")
+    crashed.renew()
+
+    assert crashed.held_count() == 0
+
+
+def test_done_marker_blocks_acquire(upload_leases, tmp_path):
+    first = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="first")
+    second = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="second")
+
+    first.acquire("key", "a.png")
+    first.release("key", done=True)
+    # A done marker never expires
+    age(os.path.join(str(tmp_path), "key.lease"), 120)
+
+    assert first.held_count() == 0
+    assert second.acquire("key", "a.png") == upload_leases.LEASE_DONE
+    assert first.acquire("key", "a.png") == upload_leases.LEASE_DONE
+
+
+def test_released_lease_can_be_acquired(upload_leases, tmp_path):
+    first = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="first")
+    second = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="second")
+
+    first.acquire("key", "a.png")
+    first.release("key")
+
+    assert first.read("key") is None
+    assert second.acquire("key", "a.png") == "acquired"
+
+
+def test_release_leaves_lease_of_other_owner(upload_leases, tmp_path):
+    crashed = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="crashed")
+    other = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="other")
+
+    crashed.acquire("key", "a.png")
+    age(os.path.join(str(tmp_path), "key.lease"), 120)
+    other.acquire("key", "a.png")
+    crashed.release("key")
+
+    assert other.read("key")["owner"] == "other"
+
+
+def test_lease_key_changes_with_file_version(upload_leases, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"first")
+    first = upload_leases.lease_key("a.png", os.stat(path))
+    path.write_bytes(b"second version")
+
+    assert upload_leases.lease_key("a.png", os.stat(path)) != first
+
+
+def test_release_all_marks_uploaded_assets_done(upload_leases, tmp_path):
+    store = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="store")
+    other = upload_leases.LeaseStore(str(tmp_path), ttl=60, owner="other")
+    leases = {"a.png": "key-a", "b.png": "key-b"}
+    for asset_path, key in leases.items():
+        store.acquire(key, asset_path)
+
+    upload_leases.release_all(store, leases, ["a.png"])
+
+    assert store.held_count() == 0
+    assert other.acquire("key-a", "a.png") == upload_leases.LEASE_DONE
+    assert other.acquire("key-b", "b.png") == "acquired"
+
+
+def test_claim_output_files_claims_free_files_up_to_batch_size(
+    api_routes, upload_leases, settings_store
+):
+    output_dir = api_routes.folder_paths.get_output_directory()
+    paths = [f"image{i}.png" for i in range(5)]
+    for path in paths:
+        with open(os.path.join(output_dir, path), "wb") as f:
+            f.write(path.encode("utf-8"))
+
+    settings = dict(settings_store.DEFAULT_SETTINGS, lease_batch_size=3)
+    lease_dir = api_routes.get_lease_directory(settings)
+    other = upload_leases.LeaseStore(lease_dir, ttl=60, owner="other")
+    held_key = upload_leases.lease_key(paths[0], os.stat(os.path.join(output_dir, paths[0])))
+    other.acquire(held_key, paths[0])
+
+    store, claimed = api_routes.claim_output_files(paths, settings)
+    assert len(claimed) == 3
+    assert paths[0] not in claimed
+
+    upload_leases.release_all(store, claimed, claimed)
+    store, claimed_later = api_routes.claim_output_files([], settings)
+    assert set(claimed_later) == set(paths[1:]) - set(claimed)
+    # The file the other instance holds stays deferred for later rounds
+    assert list(api_routes._deferred_uploads) == [paths[0]]
+    upload_leases.release_all(store, claimed_later, [])
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def ledger(upload_ledger, tmp_path):
+    return upload_ledger.UploadLedger(str(tmp_path / "data" / "ledger.db"))
+
+
+def test_file_hash_is_reused_while_size_and_mtime_match(ledger, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"first")
+    first = ledger.file_hash("a.png", str(path))
+
+    # Same size and mtime: the stored hash is trusted without reading the file
+    stat_info = os.stat(path)
+    path.write_bytes(b"other")
+    os.utime(path, ns=(stat_info.st_atime_ns, stat_info.st_mtime_ns))
+    assert ledger.file_hash("a.png", str(path)) == first
+
+    os.utime(path, ns=(stat_info.st_atime_ns, stat_info.st_mtime_ns + 10**9))
+    assert ledger.file_hash("a.png", str(path)) != first
+
+
+def test_uploads_are_found_per_project(ledger):
+    ledger.record_upload("hash", "project", "a.png")
+
+    assert ledger.find_upload("hash", "project")["path"] == "a.png"
+    assert ledger.find_upload("hash", "other-project") is None
+    assert ledger.find_upload("other-hash", "project") is None
+
+
+def test_uploaded_paths_include_copies_of_uploaded_content(ledger, tmp_path):
+    for name, content in [("a.png", b"same"), ("copy.png", b"same"), ("b.png", b"different")]:
+        (tmp_path / name).write_bytes(content)
+        ledger.file_hash(name, str(tmp_path / name))
+    ledger.record_upload(ledger.file_hash("a.png", str(tmp_path / "a.png")), "project", "a.png")
+
+    assert sorted(ledger.uploaded_paths("project")) == ["a.png", "copy.png"]
+    assert ledger.uploaded_paths("other-project") == []
+    assert sorted(ledger.uploaded_paths()) == ["a.png", "copy.png"]
+
+
+def test_forget_removes_upload_records(ledger):
+    ledger.record_upload("a", "project", "a.png")
+    ledger.record_upload("b", "other-project", "b.png")
+
+    assert ledger.forget("project") == 1
+    assert ledger.find_upload("a", "project") is None
+    assert ledger.find_upload("b", "other-project") is not None
+    assert ledger.forget() == 1
+
+
+def test_records_survive_reopening(upload_ledger, ledger):
+    ledger.record_upload("hash", "project", "a.png")
+
+    reopened = upload_ledger.UploadLedger(ledger.db_path)
+
+    assert reopened.find_upload("hash", "project")["path"] == "a.png"
+
+
+def test_multipart_state_is_saved_per_resume_key(ledger):
+    ledger.save_multipart("resume", "upload", "key", 5 * 1024 * 1024, "owner")
+    ledger.add_part("resume", 2, "etag-2")
+    ledger.add_part("resume", 1, "etag-1")
+
+    state = ledger.load_multipart("resume")
+    assert state["upload_id"] == "upload"
+    assert state["api_key_hash"] == "owner"
+    assert state["parts"] == {1: "etag-1", 2: "etag-2"}
+    assert [ledger.record_failure("resume") for _ in range(2)] == [1, 2]
+
+    # A new upload for the same key starts without parts or failures
+    ledger.save_multipart("resume", "new-upload", "key", 5 * 1024 * 1024, "owner")
+    state = ledger.load_multipart("resume")
+    assert (state["upload_id"], state["parts"], state["attempts"]) == ("new-upload", {}, 0)
+
+    ledger.delete_multipart("resume")
+    assert ledger.load_multipart("resume") is None
+    assert ledger.record_failure("resume") == 0
+
+
+def test_expired_multipart_uploads_are_listed_per_api_key(ledger):
+    ledger.save_multipart("mine", "upload-1", "key-1", 1, "owner")
+    ledger.save_multipart("theirs", "upload-2", "key-2", 1, "other")
+
+    assert ledger.expired_multipart(3600, "owner") == []
+    assert ledger.expired_multipart(-1, "owner") == [
+        {"resume_key": "mine", "upload_id": "upload-1", "key": "key-1"}
+    ]
+
+
+def test_multipart_table_without_api_key_is_migrated(upload_ledger, tmp_path):
+    db_path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute(
+            """
+            CREATE TABLE multipart_uploads (
+                resume_key TEXT PRIMARY KEY,
+                upload_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        connection.execute(
+            "INSERT INTO multipart_uploads VALUES ('old', 'upload', 'key', 1, 0, 0)"
+        )
+    connection.close()
+
+    ledger = upload_ledger.UploadLedger(db_path)
+
+    assert ledger.load_multipart("old")["api_key_hash"] == ""
+    # Uploads saved before the migration belong to no API key, so none aborts them
+    assert ledger.expired_multipart(0, "owner") == []
+    ledger.save_multipart("new", "upload", "key", 1, "owner")
+    assert ledger.load_multipart("new")["api_key_hash"] == "owner"
+    # Opening a migrated database again leaves it alone
+    upload_ledger.UploadLedger(db_path)
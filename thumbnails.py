@@ -0,0 +1,207 @@
+"""
+Gallery thumbnails for Asset Manager
+Small previews are rendered on a worker pool and cached on disk with a byte-capped LRU
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from PIL import Image, features
+
+from .metrics import thumbnail_seconds
+
+
+# Raster formats PIL can preview; animated files use their first frame
+THUMBNAIL_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp")
+DEFAULT_THUMBNAIL_SIZE = 320
+MAX_THUMBNAIL_SIZE = 1024
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_CONTENT_TYPE = "image/webp" if THUMBNAIL_FORMAT == "WEBP" else "image/jpeg"
+
+
+def can_thumbnail(path: str) -> bool:
+    return os.path.splitext(path.lower())[1] in THUMBNAIL_EXTENSIONS
+
+
+def render_thumbnail(source_path: str, target_path: str, size: int):
+    """
+    Render a preview that fits in size x size pixels
+
+    Args:
+        source_path: Image to preview
+        target_path: Where the preview is written
+        size: Longest side of the preview in pixels
+    """
+    with Image.open(source_path) as image:
+        # Animated PNG/WebP/GIF open on their first frame; JPEGs decode at a reduced scale
+        image.draft("RGB", (size, size))
+
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        mode = "RGBA" if has_alpha and THUMBNAIL_FORMAT == "WEBP" else "RGB"
+        if image.mode != mode:
+            image = image.convert(mode)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        temp_path = f"{target_path}.{threading.get_ident()}.tmp"
+        image.save(temp_path, format=THUMBNAIL_FORMAT, quality=80)
+    os.replace(temp_path, target_path)
+
+
+class ThumbnailCache:
+    """On-disk cache of previews keyed by file path, mtime and size"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024, max_workers: int = 4):
+        """
+        Initialize the cache, picking up previews from earlier runs
+
+        Args:
+            cache_dir: Directory holding the cached previews
+            max_bytes: Least recently used previews are removed above this total size
+            max_workers: Number of previews rendered at the same time
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="asset-manager-thumbnail"
+        )
+
+        os.makedirs(cache_dir, exist_ok=True)
+        existing = []
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(".tmp"):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            try:
+                stat_info = entry.stat()
+            except OSError:
+                continue
+            existing.append((stat_info.st_mtime, entry.name, stat_info.st_size))
+
+        # Cache hits touch the mtime, so it orders previews by last use
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self.total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def get(self, source_path: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> Future:
+        """
+        Get the cached preview of a file, rendering it in the background if needed
+
+        Concurrent requests for the same preview share one render. This
+        stats the source and cache files, so call it off the event loop.
+
+        Args:
+            source_path: Absolute path of the image
+            size: Longest side of the preview in pixels
+
+        Returns:
+            Future resolving to the path of the preview file
+        """
+        stat_info = os.stat(source_path)
+        identity = f"{os.path.realpath(source_path)}|{stat_info.st_mtime_ns}|{stat_info.st_size}|{size}"
+        name = f"{hashlib.sha1(identity.encode('utf-8')).hexdigest()}.{THUMBNAIL_FORMAT.lower()}"
+        target_path = os.path.join(self.cache_dir, name)
+
+        with self._lock:
+            if name in self._entries and self._touch(target_path):
+                self._entries.move_to_end(name)
+                future = Future()
+                future.set_result(target_path)
+                return future
+            if name in self._entries:
+                # Removed from the cache directory behind our back
+                self.total_bytes -= self._entries.pop(name)
+
+            future = self._pending.get(name)
+            if future is None:
+                future = self._executor.submit(self._render, source_path, target_path, name, size)
+                self._pending[name] = future
+            return future
+
+    def _render(self, source_path: str, target_path: str, name: str, size: int) -> str:
+        try:
+            with thumbnail_seconds.time():
+                render_thumbnail(source_path, target_path, size)
+            file_size = os.path.getsize(target_path)
+            with self._lock:
+                self._entries[name] = file_size
+                self.total_bytes += file_size
+                self._evict(keep=name)
+            return target_path
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def _touch(self, path: str) -> bool:
+        """
+        Mark a preview as recently used
+
+        Returns:
+            False if the preview file is gone
+        """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.total_bytes > self.max_bytes and self._entries:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            del self._entries[name]
+            self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def read_thumbnail(thumbnail_path: str) -> bytes:
+    """
+    Read a rendered preview
+
+    Raises:
+        FileNotFoundError: If the preview was evicted since it was looked up
+    """
+    with open(thumbnail_path, "rb") as f:
+        return f.read()
+
+
+def get_thumbnail_cache(cache_dir: str) -> ThumbnailCache:
+    """
+    Get the shared thumbnail cache for a directory
+
+    The first call scans the cache directory, so call it off the event loop.
+
+    Args:
+        cache_dir: Directory holding the cached previews
+
+    Returns:
+        ThumbnailCache stored in cache_dir
+    """
+    global _thumbnail_cache
+
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None or _thumbnail_cache.cache_dir != cache_dir:
+            _thumbnail_cache = ThumbnailCache(cache_dir)
+        return _thumbnail_cache
@@ -0,0 +1,304 @@
+"""
+Memory-bounded part reading for Asset Manager uploads
+Parts are streamed from memory-mapped file windows (or in-memory buffers), a process-wide
+budget caps bytes in flight, and a shared token bucket caps upload bandwidth
+"""
+
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+READ_BLOCK_SIZE = 256 * 1024
+
+
+class Window:
+    """Read-only file-like view over a byte range held in a memoryview
+
+    read() returns memoryview slices, so the part is never copied into a
+    separate bytes object. requests sees __len__/tell and sends the window
+    with a Content-Length header. Subclasses set up _view.
+    """
+
+    def __init__(self, length: int, on_read=None, throttle=None):
+        """
+        Args:
+            length: Length of the window in bytes
+            on_read: Optional callback(nbytes) for bytes handed to the HTTP
+                stack; negative when a retry rewinds the window
+            throttle: Optional callable(nbytes) that blocks before a block is
+                returned, e.g. BandwidthLimiter.consume
+        """
+        self.length = length
+        self.on_read = on_read
+        self.throttle = throttle
+        # Time read() spent blocked in throttle, which is not transfer time
+        self.throttled_seconds = 0.0
+        self._position = 0
+        self._view = memoryview(b"")
+
+    def __len__(self) -> int:
+        return self.length
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, position: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            position += self._position
+        elif whence == os.SEEK_END:
+            position += self.length
+        position = min(max(0, position), self.length)
+        if self.on_read is not None and position != self._position:
+            self.on_read(position - self._position)
+        self._position = position
+        return self._position
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            size = self.length - self._position
+        size = min(size, READ_BLOCK_SIZE, self.length - self._position)
+        block = self._view[self._position : self._position + size]
+        self._position += len(block)
+        if self.throttle is not None and block:
+            throttle_started = time.monotonic()
+            self.throttle(len(block))
+            self.throttled_seconds += time.monotonic() - throttle_started
+        if self.on_read is not None and block:
+            self.on_read(len(block))
+        return block
+
+    def close(self):
+        try:
+            self._view.release()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FileWindow(Window):
+    """Window over a byte range of a file, backed by mmap"""
+
+    def __init__(self, file_path: str, offset: int, length: int, on_read=None, throttle=None):
+        """
+        Map a byte range of a file
+
+        Args:
+            file_path: File to read
+            offset: Start of the window in bytes
+            length: Length of the window in bytes
+            on_read: Optional callback(nbytes), see Window
+            throttle: Optional callable(nbytes), see Window
+        """
+        super().__init__(length, on_read, throttle)
+        self._file = open(file_path, "rb")
+        self._mmap = None
+
+        if length > 0:
+            # mmap offsets must be multiples of the allocation granularity
+            map_offset = offset - offset % mmap.ALLOCATIONGRANULARITY
+            self._mmap = mmap.mmap(
+                self._file.fileno(),
+                offset - map_offset + length,
+                access=mmap.ACCESS_READ,
+                offset=map_offset,
+            )
+            self._view = memoryview(self._mmap)[offset - map_offset :]
+
+    def close(self):
+        super().close()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A slice is still referenced by the HTTP stack; the mapping
+                # is released once it is garbage collected
+                pass
+        self._file.close()
+
+
+class BytesWindow(Window):
+    """Window over a byte range of an in-memory buffer
+
+    For content that was never written to disk, e.g. images encoded
+    directly from tensors.
+    """
+
+    def __init__(self, data, offset: int, length: int, on_read=None, throttle=None):
+        """
+        Wrap a byte range of a buffer without copying it
+
+        Args:
+            data: bytes, bytearray or memoryview holding the content
+            offset: Start of the window in bytes
+            length: Length of the window in bytes
+            on_read: Optional callback(nbytes), see Window
+            throttle: Optional callable(nbytes), see Window
+        """
+        super().__init__(length, on_read, throttle)
+        self._view = memoryview(data)[offset : offset + length]
+
+
+def open_window(source, offset: int, length: int, on_read=None, throttle=None):
+    """
+    Open a window over part of an upload source
+
+    Args:
+        source: File path, or bytes-like object with the content
+        offset: Start of the window in bytes
+        length: Length of the window in bytes
+        on_read: Optional callback(nbytes) for bytes read (see Window)
+        throttle: Optional blocking callable(nbytes) pacing reads (see Window)
+
+    Returns:
+        FileWindow for paths, BytesWindow for in-memory content
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesWindow(source, offset, length, on_read, throttle)
+    return FileWindow(source, offset, length, on_read, throttle)
+
+
+class ByteBudget:
+    """Process-wide cap on bytes held by in-flight part uploads"""
+
+    def __init__(self, limit: int):
+        """
+        Initialize the budget
+
+        Args:
+            limit: Maximum bytes in flight across all uploads. A single part
+                larger than the limit may still run, but only on its own.
+        """
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def set_limit(self, limit: int):
+        with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+    def acquire(self, nbytes: int, stop_event=None):
+        """
+        Wait until nbytes fit in the budget and reserve them
+
+        Args:
+            nbytes: Bytes to reserve
+            stop_event: Optional event that ends waiting early
+
+        Raises:
+            RuntimeError: If stop_event is set while waiting
+        """
+        with self._condition:
+            while self.in_flight > 0 and self.in_flight + nbytes > self.limit:
+                if stop_event is not None and stop_event.is_set():
+                    raise RuntimeError("Stopped while waiting for upload memory budget")
+                self._condition.wait(0.5)
+            self.in_flight += nbytes
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """
+        Reserve nbytes if they fit in the budget right now, without waiting
+
+        Returns:
+            True if the bytes were reserved
+        """
+        with self._condition:
+            if self.in_flight > 0 and self.in_flight + nbytes > self.limit:
+                return False
+            self.in_flight += nbytes
+            return True
+
+    def release(self, nbytes: int):
+        with self._condition:
+            self.in_flight -= nbytes
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int, stop_event=None):
+        self.acquire(nbytes, stop_event)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+
+inflight_budget = ByteBudget(256 * 1024 * 1024)
+
+
+class BandwidthLimiter:
+    """Token bucket capping the bytes per second sent by all uploads together
+
+    Callers take tokens for every block before sending it. The bucket may go
+    into debt, and the caller then waits until the debt is paid back at the
+    configured rate, so concurrent parts share the cap and the combined rate
+    stays at the cap instead of alternating between bursts and pauses.
+    """
+
+    def __init__(self, rate: float = 0, burst_seconds: float = 0.25):
+        """
+        Initialize the limiter
+
+        Args:
+            rate: Bytes per second, 0 for no limit
+            burst_seconds: Seconds of unused bandwidth that may be sent at once
+        """
+        self.rate = max(0.0, rate)
+        self.burst_seconds = burst_seconds
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        """
+        Change the limit; takes effect for the next block of every upload
+
+        Args:
+            rate: Bytes per second, 0 for no limit
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(0.0, rate)
+            self._tokens = min(self._tokens, self._capacity()) if self.rate else 0.0
+
+    def reserve(self, nbytes: int) -> float:
+        """
+        Take tokens for nbytes without waiting
+
+        Returns:
+            Seconds the caller must wait before sending the bytes
+        """
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill(time.monotonic())
+            self._tokens -= nbytes
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def consume(self, nbytes: int):
+        """Take tokens for nbytes, sleeping until they may be sent"""
+        delay = self.reserve(nbytes)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _capacity(self) -> float:
+        return max(self.rate * self.burst_seconds, READ_BLOCK_SIZE)
+
+    def _refill(self, now: float):
+        if self.rate:
+            self._tokens = min(
+                self._capacity(), self._tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+
+
+upload_bandwidth = BandwidthLimiter()
@@ -0,0 +1,271 @@
+"""
+Background upload job queue for Asset Manager
+Uploads run on worker threads so the ComfyUI event loop stays responsive
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from .metrics import job_seconds, queue_wait_seconds
+from .upload_progress import UploadProgress
+
+
+FINISHED_JOB_STATUSES = ("success", "partial", "error", "cancelled")
+# Manually triggered uploads start before automatic ones
+PRIORITY_MANUAL = 0
+PRIORITY_AUTOMATIC = 1
+
+
+class UploadJob:
+    """State of a single queued upload request"""
+
+    def __init__(self, assets: List[str], priority: int = PRIORITY_MANUAL, size: int = 0):
+        """
+        Initialize the job
+
+        Args:
+            assets: List of asset paths (relative to output dir) in this job
+            priority: PRIORITY_MANUAL or PRIORITY_AUTOMATIC; lower runs first
+            size: Total bytes of the assets; smaller jobs of the same priority run first
+        """
+        self.job_id = uuid.uuid4().hex
+        self.priority = priority
+        self.size = size
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.status = "queued"
+        self.result = None
+        self.files = OrderedDict((asset, {"status": "queued"}) for asset in assets)
+        self.cancel_event = threading.Event()
+        self.progress = UploadProgress(self.job_id)
+        self.on_finished = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_JOB_STATUSES
+
+    def set_file_status(self, asset: str, status: str, error: str = None):
+        """
+        Update the status of one file in this job
+
+        Args:
+            asset: Asset path as passed to the job
+            status: queued, uploading, success, error, skipped or cancelled
+            error: Optional error message
+        """
+        with self._lock:
+            entry = self.files.setdefault(asset, {})
+            entry["status"] = status
+            if error:
+                entry["error"] = error
+            else:
+                entry.pop("error", None)
+
+    def to_dict(self) -> Dict:
+        """
+        Serialize the job for JSON responses
+
+        Returns:
+            Dictionary describing the job and its per-file status
+        """
+        with self._lock:
+            files = [
+                dict({"file": asset}, **entry) for asset, entry in self.files.items()
+            ]
+
+        progress = self.progress.snapshot()
+        del progress["files"]
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "priority": "manual" if self.priority == PRIORITY_MANUAL else "automatic",
+            "size": self.size,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total": len(files),
+            "files": files,
+            "progress": progress,
+            "result": self.result,
+        }
+
+
+class UploadJobQueue:
+    """Runs upload jobs on a bounded set of worker threads and keeps their status
+
+    Queued jobs start by priority, then smallest first, so a few images are
+    not stuck behind a batch of large videos. A job that waited longer than
+    max_wait seconds starts next within its priority regardless of size.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished_jobs: int = 100, max_wait: float = 300.0):
+        """
+        Initialize the queue
+
+        Args:
+            max_workers: Number of jobs uploading at the same time
+            max_finished_jobs: Number of finished jobs kept for status queries
+            max_wait: Seconds after which a queued job is no longer passed by smaller jobs
+        """
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.max_wait = max_wait
+        self._jobs = OrderedDict()
+        self._pending = []
+        self._workers = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+
+    def submit(
+        self,
+        assets: List[str],
+        worker: Callable[[UploadJob], Dict],
+        priority: int = PRIORITY_MANUAL,
+        size: int = 0,
+        on_finished: Optional[Callable[[UploadJob], None]] = None,
+    ) -> UploadJob:
+        """
+        Enqueue a job and return immediately
+
+        Args:
+            assets: List of asset paths in the job
+            worker: Callable that performs the upload and returns a result dictionary
+            priority: PRIORITY_MANUAL or PRIORITY_AUTOMATIC
+            size: Total bytes of the assets, used to start small jobs first
+            on_finished: Optional callback run with the job once it finished,
+                also when it was cancelled before it started
+
+        Returns:
+            The queued UploadJob
+        """
+        job = UploadJob(assets, priority, size)
+        job.on_finished = on_finished
+
+        with self._condition:
+            self._jobs[job.job_id] = job
+            self._prune()
+            self._pending.append((next(self._sequence), job, worker))
+            if len(self._workers) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"asset-manager-upload_{len(self._workers)}",
+                    daemon=True,
+                )
+                self._workers.append(thread)
+                thread.start()
+            self._condition.notify()
+
+        return job
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[UploadJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job
+
+        Files that are already uploading finish; remaining files are skipped.
+
+        Args:
+            job_id: ID of the job to cancel
+
+        Returns:
+            True if the job exists and was not finished yet
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+
+        job.cancel_event.set()
+        with self._condition:
+            queued = [entry for entry in self._pending if entry[1] is job]
+            for entry in queued:
+                self._pending.remove(entry)
+        if queued:
+            self._finish_cancelled(job)
+        return True
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                entry = min(self._pending, key=self._schedule_key)
+                self._pending.remove(entry)
+            _, job, worker = entry
+            self._run(job, worker)
+
+    def _schedule_key(self, entry):
+        sequence, job, _ = entry
+        waited = time.time() - job.created_at
+        size = 0 if waited > self.max_wait else job.size
+        return (job.priority, size, sequence)
+
+    def _finish_cancelled(self, job: UploadJob):
+        for asset in job.files:
+            job.set_file_status(asset, "cancelled")
+        job.result = {"status": "cancelled", "message": "Upload cancelled"}
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        self._notify_finished(job)
+
+    def _run(self, job: UploadJob, worker: Callable[[UploadJob], Dict]):
+        if job.cancelled:
+            self._finish_cancelled(job)
+            return
+
+        job.started_at = time.time()
+        job.status = "running"
+        queue_wait_seconds.observe(job.started_at - job.created_at)
+
+        try:
+            result = worker(job)
+        except Exception as e:
+            import traceback
+
+            traceback.print_exc()
+            result = {"status": "error", "message": str(e)}
+
+        if job.cancelled and result.get("status") != "error":
+            result["status"] = "cancelled"
+
+        job.result = result
+        job.status = result.get("status", "error")
+        job.finished_at = time.time()
+        job_seconds.observe(job.finished_at - job.started_at, status=job.status)
+        self._notify_finished(job)
+
+    def _notify_finished(self, job: UploadJob):
+        if job.on_finished is None:
+            return
+        try:
+            job.on_finished(job)
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+
+upload_queue = UploadJobQueue()
@@ -0,0 +1,363 @@
+"""
+Upload leases for Asset Manager instances sharing one output folder
+Lease files on the shared file system make sure each output file is uploaded by one
+instance; leases of crashed instances expire and are claimed again
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+
+LEASE_DIR_NAME = ".asset-manager-leases"
+LEASE_HELD = "held"
+LEASE_DONE = "done"
+# Done markers are kept this long so late watchers skip the file
+DONE_MAX_AGE = 7 * 24 * 3600
+PRUNE_INTERVAL = 3600
+
+
+def lease_key(asset_path: str, stat_info: os.stat_result) -> str:
+    """
+    Key of one version of an output file
+
+    Size and mtime are part of the key, so a rewritten file is uploaded again.
+
+    Args:
+        asset_path: Path relative to the output directory, with forward slashes
+        stat_info: os.stat result of the file
+
+    Returns:
+        Hex digest naming the lease file
+    """
+    identity = f"{asset_path}|{stat_info.st_size}|{stat_info.st_mtime_ns}"
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+class LeaseStore:
+    """Lease files in a directory shared by all instances
+
+    A lease is taken by creating its file with O_EXCL, which is atomic on
+    local file systems and NFSv3+. Held leases are renewed by touching the
+    file; one whose mtime is older than ttl is taken over. Times are compared
+    against a file touched in the lease directory, so only the file server's
+    clock matters, not the clocks of the instances.
+    """
+
+    def __init__(self, lease_dir: str, ttl: float = 300.0, owner: Optional[str] = None):
+        """
+        Initialize the store
+
+        Args:
+            lease_dir: Directory on the shared file system holding the leases
+            ttl: Seconds without renewal after which a lease expires
+            owner: Name of this instance (default: host, process and a random suffix)
+        """
+        self.lease_dir = lease_dir
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._held = {}
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._last_prune = 0.0
+        os.makedirs(lease_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.lease_dir, f"{key}.lease")
+
+    def server_time(self) -> float:
+        """
+        Current time of the file server, read from the mtime of a touched file
+        """
+        clock_path = os.path.join(self.lease_dir, f".clock-{self.owner}")
+        try:
+            with open(clock_path, "a"):
+                pass
+            os.utime(clock_path)
+            return os.stat(clock_path).st_mtime
+        except OSError:
+            return time.time()
+
+    def read(self, key: str) -> Optional[Dict]:
+        """
+        Read a lease
+
+        Returns:
+            Lease dictionary (owner, asset, state, acquired_at) or None if
+            there is no lease; a lease still being written has state "held"
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            return {"state": LEASE_HELD}
+        try:
+            return json.loads(content)
+        except ValueError:
+            return {"state": LEASE_HELD}
+
+    def acquire(self, key: str, asset_path: str, now: Optional[float] = None) -> str:
+        """
+        Try to take the lease of a file
+
+        Args:
+            key: Lease key (see lease_key)
+            asset_path: Path of the file, stored in the lease for inspection
+            now: Server time from server_time(), to reuse it for several acquires
+
+        Returns:
+            "acquired" if this instance now holds the lease, "done" if the
+            file was uploaded already, "held" if another instance holds it
+        """
+        path = self._path(key)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                lease = self.read(key)
+                if lease is None:
+                    continue
+                if lease.get("state") == LEASE_DONE:
+                    return LEASE_DONE
+                if lease.get("owner") == self.owner:
+                    return LEASE_HELD
+                if not self._expired(path, now):
+                    return LEASE_HELD
+                if not self._take_over(path, lease):
+                    return LEASE_HELD
+                continue
+
+            lease = {
+                "owner": self.owner,
+                "asset": asset_path,
+                "state": LEASE_HELD,
+                "acquired_at": time.time(),
+                "token": uuid.uuid4().hex,
+            }
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(lease, f)
+            with self._lock:
+                self._held[key] = (asset_path, lease["token"])
+                self._start_heartbeat()
+            return "acquired"
+        return LEASE_HELD
+
+    def release(self, key: str, done: bool = False):
+        """
+        Give up a held lease
+
+        Args:
+            key: Lease key
+            done: Leave a done marker so no instance uploads the file again;
+                otherwise the lease is removed and another instance may take it
+        """
+        with self._lock:
+            held = self._held.pop(key, None)
+        if held is None:
+            return
+        asset_path, token = held
+
+        path = self._path(key)
+        try:
+            if not self._owns(key, token):
+                # Taken over while the upload ran; the new holder finishes it
+                print(f"Warning: Upload lease for {asset_path} was taken over by another instance")
+            elif done:
+                temp_path = f"{path}.{self.owner}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(
+                        {
+                            "owner": self.owner,
+                            "asset": asset_path,
+                            "state": LEASE_DONE,
+                            "finished_at": time.time(),
+                        },
+                        f,
+                    )
+                os.replace(temp_path, path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print(f"Warning: Could not release upload lease for {asset_path}: {e}")
+
+    def held_count(self) -> int:
+        with self._lock:
+            return len(self._held)
+
+    def renew(self):
+        """
+        Touch all held leases; leases another instance took over are dropped
+        """
+        with self._lock:
+            held = list(self._held.items())
+
+        for key, (asset_path, token) in held:
+            if not self._owns(key, token):
+                print(f"Warning: Upload lease for {asset_path} was taken over by another instance")
+                with self._lock:
+                    self._held.pop(key, None)
+                continue
+            try:
+                os.utime(self._path(key))
+            except OSError as e:
+                print(f"Warning: Could not renew upload lease for {asset_path}: {e}")
+
+    def prune(self, max_age: float = DONE_MAX_AGE):
+        """
+        Remove done markers and leftover files older than max_age seconds
+
+        Runs at most once per PRUNE_INTERVAL.
+        """
+        if time.monotonic() - self._last_prune < PRUNE_INTERVAL and self._last_prune:
+            return
+        self._last_prune = time.monotonic()
+
+        oldest = self.server_time() - max_age
+        try:
+            entries = list(os.scandir(self.lease_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime >= oldest:
+                    continue
+                if entry.name.endswith(".lease"):
+                    lease = self.read(entry.name[: -len(".lease")])
+                    if lease is None or lease.get("state") != LEASE_DONE:
+                        continue
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _owns(self, key: str, token: str) -> bool:
+        """
+        Check the lease file still is the one this instance created
+        """
+        lease = self.read(key)
+        return (
+            lease is not None
+            and lease.get("owner") == self.owner
+            and lease.get("token") == token
+            and lease.get("state") == LEASE_HELD
+        )
+
+    def _expired(self, path: str, now: Optional[float]) -> bool:
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return True
+        if now is None:
+            now = self.server_time()
+        return now - mtime > self.ttl
+
+    def _take_over(self, path: str, expired_lease: Dict) -> bool:
+        """
+        Remove an expired lease so it can be created again
+
+        The lease is renamed to a name of this instance first, so when
+        several instances take over the same lease only one removes it.
+        The renamed file must still be the expired lease read before;
+        another instance may have taken it over and created a fresh one
+        in between, which is put back.
+
+        Args:
+            path: Lease file
+            expired_lease: Content of the lease when it was found expired
+
+        Returns:
+            True if the lease is gone
+        """
+        stale_path = f"{path}.{self.owner}.stale"
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+
+        try:
+            with open(stale_path, "r", encoding="utf-8") as f:
+                renamed = json.load(f)
+        except (OSError, ValueError):
+            renamed = None
+        # A lease its owner crashed while writing has no content to compare
+        unchanged = renamed == expired_lease or (renamed is None and "owner" not in expired_lease)
+        if unchanged and self._expired(stale_path, None):
+            os.remove(stale_path)
+            return True
+
+        try:
+            os.link(stale_path, path)
+        except OSError:
+            # A third instance created the lease meanwhile; the owner of the
+            # lease put aside notices on its next renewal and drops the file
+            print(f"Warning: Upload lease {os.path.basename(path)} changed hands during a takeover")
+        os.remove(stale_path)
+        return False
+
+    def _start_heartbeat(self):
+        if self._heartbeat is not None and self._heartbeat.is_alive():
+            return
+        self._heartbeat = threading.Thread(
+            target=self._renew_loop, name="asset-manager-leases", daemon=True
+        )
+        self._heartbeat.start()
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(max(1.0, self.ttl / 3))
+            with self._lock:
+                if not self._held:
+                    self._heartbeat = None
+                    return
+            try:
+                self.renew()
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
+
+
+_lease_store = None
+_lease_store_lock = threading.Lock()
+
+
+def get_lease_store(lease_dir: str, ttl: float = 300.0) -> LeaseStore:
+    """
+    Get the shared lease store for a directory
+
+    Args:
+        lease_dir: Directory on the shared file system holding the leases
+        ttl: Seconds without renewal after which a lease expires
+
+    Returns:
+        LeaseStore of this instance for lease_dir
+    """
+    global _lease_store
+
+    with _lease_store_lock:
+        if _lease_store is None or _lease_store.lease_dir != lease_dir:
+            _lease_store = LeaseStore(lease_dir, ttl)
+        _lease_store.ttl = ttl
+        return _lease_store
+
+
+def release_all(store: LeaseStore, leases: Dict[str, str], done_assets: Iterable[str]):
+    """
+    Release leases after an upload job
+
+    Args:
+        store: LeaseStore holding the leases
+        leases: Lease key by asset path
+        done_assets: Assets that were uploaded (or found uploaded before)
+    """
+    done_assets = set(done_assets)
+    for asset_path, key in leases.items():
+        store.release(key, done=asset_path in done_assets)
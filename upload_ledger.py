@@ -0,0 +1,330 @@
+"""
+Persistent upload ledger for Asset Manager
+Records which file contents were uploaded to which project in a local SQLite database,
+and the state of unfinished multipart uploads so they can resume
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadLedger:
+    """SQLite-backed record of file hashes and completed uploads"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the ledger database
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    sha256 TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploads (
+                    sha256 TEXT NOT NULL,
+                    project_id TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    uploaded_at REAL NOT NULL,
+                    PRIMARY KEY (sha256, project_id)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS multipart_uploads (
+                    resume_key TEXT PRIMARY KEY,
+                    upload_id TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    chunk_size INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    api_key_hash TEXT NOT NULL DEFAULT ''
+                )
+                """
+            )
+            columns = {
+                row["name"]
+                for row in self._conn.execute("PRAGMA table_info(multipart_uploads)")
+            }
+            if "api_key_hash" not in columns:
+                self._conn.execute(
+                    "ALTER TABLE multipart_uploads ADD COLUMN api_key_hash TEXT NOT NULL DEFAULT ''"
+                )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS multipart_parts (
+                    resume_key TEXT NOT NULL,
+                    part_number INTEGER NOT NULL,
+                    etag TEXT NOT NULL,
+                    PRIMARY KEY (resume_key, part_number)
+                )
+                """
+            )
+
+    def file_hash(self, path: str, full_path: str) -> str:
+        """
+        Get the SHA-256 of a file, reusing the stored hash while size and mtime match
+
+        Args:
+            path: Ledger key of the file (path relative to the output dir)
+            full_path: Absolute path used to read the file
+
+        Returns:
+            Hex-encoded SHA-256 of the file content
+        """
+        stat_info = os.stat(full_path)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, sha256 FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row["size"] == stat_info.st_size and row["mtime"] == stat_info.st_mtime:
+            return row["sha256"]
+
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+                (path, stat_info.st_size, stat_info.st_mtime, sha256),
+            )
+        return sha256
+
+    def find_upload(self, sha256: str, project_id: str) -> Optional[Dict]:
+        """
+        Look up an earlier upload of the same content to a project
+
+        Returns:
+            Dictionary with path and uploaded_at, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, uploaded_at FROM uploads WHERE sha256 = ? AND project_id = ?",
+                (sha256, project_id),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record_upload(self, sha256: str, project_id: str, path: str):
+        """
+        Record a completed upload
+
+        Args:
+            sha256: Hash of the uploaded content
+            project_id: Project the file was uploaded to
+            path: Ledger key of the uploaded file
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (sha256, project_id, path, uploaded_at) VALUES (?, ?, ?, ?)",
+                (sha256, project_id, path, time.time()),
+            )
+
+    def uploaded_paths(self, project_id: str = None) -> List[str]:
+        """
+        Get known file paths whose content was already uploaded
+
+        Files with identical content under a different name are included.
+
+        Args:
+            project_id: Only consider uploads to this project (optional)
+
+        Returns:
+            List of ledger keys (paths relative to the output dir)
+        """
+        query = "SELECT DISTINCT f.path FROM files f JOIN uploads u ON u.sha256 = f.sha256"
+        params = ()
+        if project_id:
+            query += " WHERE u.project_id = ?"
+            params = (project_id,)
+
+        with self._lock:
+            return [row["path"] for row in self._conn.execute(query, params)]
+
+    def forget(self, project_id: str = None) -> int:
+        """
+        Remove upload records so files are uploaded again
+
+        Args:
+            project_id: Only forget uploads to this project (optional)
+
+        Returns:
+            Number of removed records
+        """
+        with self._lock, self._conn:
+            if project_id:
+                cursor = self._conn.execute(
+                    "DELETE FROM uploads WHERE project_id = ?", (project_id,)
+                )
+            else:
+                cursor = self._conn.execute("DELETE FROM uploads")
+            return cursor.rowcount
+
+    def load_multipart(self, resume_key: str) -> Optional[Dict]:
+        """
+        Load saved state of an unfinished multipart upload
+
+        Args:
+            resume_key: Key identifying the file version and upload target
+
+        Returns:
+            Dictionary with upload_id, key, chunk_size, attempts, created_at,
+            api_key_hash and parts ({partNumber: etag}), or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM multipart_uploads WHERE resume_key = ?", (resume_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            parts = {
+                part["part_number"]: part["etag"]
+                for part in self._conn.execute(
+                    "SELECT part_number, etag FROM multipart_parts WHERE resume_key = ?",
+                    (resume_key,),
+                )
+            }
+        return dict(row, parts=parts)
+
+    def save_multipart(
+        self,
+        resume_key: str,
+        upload_id: str,
+        key: str,
+        chunk_size: int,
+        api_key_hash: str = "",
+    ):
+        """
+        Save a newly created multipart upload
+
+        Args:
+            resume_key: Key identifying the file version and upload target
+            upload_id: Upload ID returned by the create request
+            key: Object key returned by the create request
+            chunk_size: Part size the upload was started with
+            api_key_hash: Hash of the API key that owns the upload
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM multipart_parts WHERE resume_key = ?", (resume_key,)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO multipart_uploads (resume_key, upload_id, key, chunk_size, attempts, created_at, api_key_hash) VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (resume_key, upload_id, key, chunk_size, time.time(), api_key_hash),
+            )
+
+    def add_part(self, resume_key: str, part_number: int, etag: str):
+        """
+        Save a completed part of a multipart upload
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO multipart_parts (resume_key, part_number, etag) VALUES (?, ?, ?)",
+                (resume_key, part_number, etag),
+            )
+
+    def record_failure(self, resume_key: str) -> int:
+        """
+        Count a failed attempt of a multipart upload
+
+        Returns:
+            Number of failed attempts so far
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE multipart_uploads SET attempts = attempts + 1 WHERE resume_key = ?",
+                (resume_key,),
+            )
+            row = self._conn.execute(
+                "SELECT attempts FROM multipart_uploads WHERE resume_key = ?",
+                (resume_key,),
+            ).fetchone()
+        return row["attempts"] if row else 0
+
+    def delete_multipart(self, resume_key: str):
+        """
+        Remove saved state of a finished or abandoned multipart upload
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM multipart_parts WHERE resume_key = ?", (resume_key,)
+            )
+            self._conn.execute(
+                "DELETE FROM multipart_uploads WHERE resume_key = ?", (resume_key,)
+            )
+
+    def expired_multipart(self, max_age: float, api_key_hash: str) -> List[Dict]:
+        """
+        Get multipart uploads of one API key saved more than max_age seconds ago
+
+        Uploads of other API keys are left alone, since only their owner can
+        abort them.
+
+        Args:
+            max_age: Seconds after which a saved upload has expired
+            api_key_hash: Hash of the API key whose uploads are returned
+
+        Returns:
+            List of dictionaries with resume_key, upload_id and key
+        """
+        with self._lock:
+            return [
+                dict(row)
+                for row in self._conn.execute(
+                    "SELECT resume_key, upload_id, key FROM multipart_uploads WHERE created_at < ? AND api_key_hash = ?",
+                    (time.time() - max_age, api_key_hash),
+                )
+            ]
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_upload_ledger(db_path: str) -> UploadLedger:
+    """
+    Get the shared ledger for a database path
+
+    Args:
+        db_path: Path of the SQLite database file
+
+    Returns:
+        UploadLedger opened on db_path
+    """
+    global _ledger
+
+    with _ledger_lock:
+        if _ledger is None or _ledger.db_path != db_path:
+            _ledger = UploadLedger(db_path)
+        return _ledger
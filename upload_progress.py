@@ -0,0 +1,214 @@
+"""
+Byte-level progress tracking for Asset Manager upload jobs
+Counts bytes and parts as they are sent and publishes throttled snapshots
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+
+# Throughput is measured over this many recent seconds
+THROUGHPUT_WINDOW = 5.0
+
+
+class UploadProgress:
+    """Progress of one upload job, fed by the API client while parts are sent
+
+    The client calls file_started, bytes_sent and part_done with the file
+    key it was given; set_file_status follows the per-file state changes.
+    emit receives a snapshot at most every min_interval seconds, holding the
+    totals plus the files that changed or are uploading.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        emit: Optional[Callable[[Dict], None]] = None,
+        min_interval: float = 0.5,
+    ):
+        """
+        Initialize the tracker
+
+        Args:
+            job_id: ID of the job, included in every snapshot
+            emit: Optional callback receiving throttled snapshots
+            min_interval: Minimum seconds between two emitted snapshots
+        """
+        self.job_id = job_id
+        self.emit = emit
+        self.min_interval = min_interval
+        self.started_at = time.time()
+        self._files = OrderedDict()
+        self._changed = set()
+        self._samples = deque()
+        self._bytes_sent = 0
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def add_file(self, key: str, name: str, size: int = 0, status: str = "queued"):
+        """
+        Register a file before the upload starts, so totals and ETA cover it
+
+        Args:
+            key: File key the client reports progress with
+            name: File name shown to users (path relative to the output dir)
+            size: File size in bytes
+            status: Initial file status
+        """
+        with self._lock:
+            self._files[key] = {
+                "file": name,
+                "status": status,
+                "size": size,
+                "bytes_sent": 0,
+                "parts_done": 0,
+                "parts_total": 0,
+            }
+
+    def file_started(self, key: str, size: int, parts_total: int, parts_done: int = 0, bytes_done: int = 0):
+        """
+        Called by the client once the parts of a file are known
+
+        Args:
+            key: File key
+            size: File size in bytes
+            parts_total: Number of parts of the upload
+            parts_done: Parts already uploaded by an earlier, resumed attempt
+            bytes_done: Bytes of those parts
+        """
+        with self._lock:
+            entry = self._entry(key)
+            self._add_bytes(entry, bytes_done - entry["bytes_sent"])
+            entry.update(size=size, parts_total=parts_total, parts_done=parts_done)
+            self._changed.add(key)
+        self._maybe_emit()
+
+    def bytes_sent(self, key: str, nbytes: int):
+        """
+        Called by the client as part bodies are read; negative when a retry rewinds a part
+        """
+        with self._lock:
+            self._add_bytes(self._entry(key), nbytes)
+        self._maybe_emit()
+
+    def part_done(self, key: str):
+        with self._lock:
+            self._entry(key)["parts_done"] += 1
+        self._maybe_emit()
+
+    def set_file_status(self, key: str, status: str, error: str = None):
+        with self._lock:
+            entry = self._entry(key)
+            entry["status"] = status
+            if error:
+                entry["error"] = error
+            if status == "success":
+                self._add_bytes(entry, entry["size"] - entry["bytes_sent"])
+            self._changed.add(key)
+        self._maybe_emit()
+
+    def snapshot(self, full: bool = True) -> Dict:
+        """
+        Get the current progress
+
+        Args:
+            full: Include every file; otherwise only files that changed since
+                the last emitted snapshot or are uploading
+
+        Returns:
+            Dictionary with byte, part and file totals, throughput (bytes/s),
+            ETA (seconds) and per-file progress
+        """
+        with self._lock:
+            return self._snapshot(full)
+
+    def flush(self):
+        """Emit a snapshot now, regardless of the throttle"""
+        self._maybe_emit(force=True)
+
+    def _entry(self, key: str) -> Dict:
+        entry = self._files.get(key)
+        if entry is None:
+            entry = self._files[key] = {
+                "file": key,
+                "status": "queued",
+                "size": 0,
+                "bytes_sent": 0,
+                "parts_done": 0,
+                "parts_total": 0,
+            }
+        return entry
+
+    def _add_bytes(self, entry: Dict, nbytes: int):
+        entry["bytes_sent"] += nbytes
+        self._bytes_sent += nbytes
+        now = time.monotonic()
+        self._samples.append((now, self._bytes_sent))
+        while len(self._samples) > 2 and now - self._samples[0][0] > THROUGHPUT_WINDOW:
+            self._samples.popleft()
+
+    def _snapshot(self, full: bool) -> Dict:
+        files = list(self._files.items())
+        bytes_total = sum(
+            entry["size"] for _, entry in files if entry["status"] not in ("skipped", "cancelled")
+        )
+        bytes_remaining = sum(
+            max(0, entry["size"] - entry["bytes_sent"])
+            for _, entry in files
+            if entry["status"] in ("queued", "uploading")
+        )
+
+        throughput = None
+        if len(self._samples) >= 2:
+            (first_time, first_bytes), (last_time, last_bytes) = self._samples[0], self._samples[-1]
+            if time.monotonic() - last_time > THROUGHPUT_WINDOW:
+                throughput = 0.0
+            elif last_time > first_time:
+                throughput = max(0.0, (last_bytes - first_bytes) / (last_time - first_time))
+
+        eta = None
+        if throughput:
+            eta = round(bytes_remaining / throughput, 1)
+
+        statuses = [entry["status"] for _, entry in files]
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "bytes_total": bytes_total,
+            "bytes_sent": self._bytes_sent,
+            "parts_total": sum(entry["parts_total"] for _, entry in files),
+            "parts_done": sum(entry["parts_done"] for _, entry in files),
+            "files_total": len(files),
+            "files_done": sum(
+                status in ("success", "error", "skipped", "cancelled") for status in statuses
+            ),
+            "files_uploading": statuses.count("uploading"),
+            "throughput": throughput,
+            "eta_seconds": eta,
+            "files": [
+                dict(entry)
+                for key, entry in files
+                if full or key in self._changed or entry["status"] == "uploading"
+            ],
+        }
+
+    def _maybe_emit(self, force: bool = False):
+        if self.emit is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+            snapshot = self._snapshot(full=False)
+            self._changed.clear()
+
+        try:
+            self.emit(snapshot)
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
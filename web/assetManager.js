@@ -14,10 +14,10 @@ const AssetManagerSystem = {
         selectedProject: '',
         selectedOrganization: '',
         uploadedAssets: new Set(),
-        hiddenAssets: new Set(),
-        knownFiles: new Set()
+        hiddenAssets: new Set()
     },
-    automaticUploadTimeout: null
+    lastServerSync: null,
+    showUploaded: false
 };
 
 function createAssetManagerModal() {
@@ -326,6 +326,9 @@ function buildMainContent(container) {
         AssetManagerSystem.state.selectedProject = projectDropdown.value;
         saveAssetState();
 
+        // Files uploaded to the newly selected project are hidden server-side
+        loadOutputImages();
+
         const statusElement = document.getElementById('asset-manager-auto-status');
         if (statusElement) {
             const updateFunc = window.assetManagerUpdateAutoModeStatus;
@@ -621,7 +624,7 @@ function buildSettingsContent(container) {
             showNotification('error', 'Please enter an API key first');
             return;
         }
-        await loadOrganizations(apiKey);
+        await loadOrganizations(apiKey, true);
     };
 
     const settingsButtonContainer = document.createElement('div');
@@ -750,16 +753,91 @@ function createModeToggle(id, initialValue, onChange) {
     return toggleContainer;
 }
 
-async function loadOutputImages() {
+const OUTPUT_PAGE_SIZE = 100;
+// The server scans the output folder on the first listing; later listings are served from its index
+let outputListingLoaded = false;
+
+// Show files while the server scans the output folder, so a slow first scan
+// of a large or network-mounted folder does not leave the gallery empty.
+// Cards arrive in scan order and are replaced by the sorted first page.
+async function streamOutputImages(capturedContentArea, filters) {
+    let response;
+    try {
+        response = await api.fetchApi("/asset-manager/get_output_images_stream", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify(filters)
+        });
+    } catch (error) {
+        return;
+    }
+    if (!(response instanceof Response) || !response.ok || !response.body) {
+        return;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let shown = 0;
+    capturedContentArea.innerHTML = '';
+
+    try {
+        while (shown < OUTPUT_PAGE_SIZE) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+
+            for (const line of lines) {
+                const message = line ? JSON.parse(line) : null;
+                if (!message || message.type !== 'images') {
+                    continue;
+                }
+                for (const image of message.images.slice(0, OUTPUT_PAGE_SIZE - shown)) {
+                    capturedContentArea.appendChild(createImageCard(image));
+                    shown++;
+                }
+            }
+        }
+    } finally {
+        reader.cancel().catch(() => {});
+    }
+}
+
+async function loadOutputImages(append = false) {
     const capturedContentArea = document.getElementById('asset-manager-captured-content');
     if (!capturedContentArea) {
         return;
     }
 
+    const offset = append ? capturedContentArea.querySelectorAll('.asset-manager-image-card').length : 0;
+    const filters = {
+        project_id: AssetManagerSystem.state.selectedProject,
+        exclude_uploaded: !AssetManagerSystem.showUploaded,
+        exclude: [
+            ...AssetManagerSystem.state.uploadedAssets,
+            ...AssetManagerSystem.state.hiddenAssets
+        ]
+    };
+
     try {
+        if (!append && !outputListingLoaded) {
+            await streamOutputImages(capturedContentArea, filters);
+        }
+
+        // Uploaded (server ledger and this browser) and hidden files are filtered
+        // out server-side, only one page is returned
         const response = await api.fetchApi("/asset-manager/get_output_images", {
-            method: "GET",
-            headers: { "Content-Type": "application/json" }
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                limit: OUTPUT_PAGE_SIZE,
+                offset: offset,
+                ...filters
+            })
         });
 
         let imageData;
@@ -770,35 +848,29 @@ async function loadOutputImages() {
         }
 
         if (imageData && imageData.status === 'success') {
-            console.log('[Asset Manager] Received image data:', imageData.count, 'total files');
+            outputListingLoaded = true;
+            console.log('[Asset Manager] Received image data:', imageData.images.length, 'of', imageData.count, 'files');
 
-            if (imageData.images && imageData.images.length > 0) {
-                // Log first few images for debugging
-                console.log('[Asset Manager] Sample images:', imageData.images.slice(0, 3));
-
-                const filteredImages = imageData.images.filter(image => {
-                    const isUploaded = AssetManagerSystem.state.uploadedAssets.has(image.path);
-                    const isHidden = AssetManagerSystem.state.hiddenAssets.has(image.path);
-                    const shouldShow = !isUploaded && !isHidden;
-                    if (!shouldShow) {
-                        console.log('[Asset Manager] Filtering out:', image.path, 'uploaded:', isUploaded, 'hidden:', isHidden);
-                    }
-                    return shouldShow;
-                });
+            const loadMoreBtn = document.getElementById('asset-manager-load-more-btn');
+            if (loadMoreBtn) {
+                loadMoreBtn.remove();
+            }
 
-                console.log('[Asset Manager] Filtered to', filteredImages.length, 'files to display');
+            if (!append) {
                 capturedContentArea.innerHTML = '';
+            }
 
-                if (filteredImages.length > 0) {
-                    filteredImages.forEach((image) => {
-                        const imageCard = createImageCard(image);
-                        capturedContentArea.appendChild(imageCard);
-                    });
-                } else {
-                    capturedContentArea.innerHTML = '<div style="color: #aaa; grid-column: 1 / -1; text-align: center; padding: 20px;">No new files to display (all files are uploaded or hidden)</div>';
+            if (imageData.images && imageData.images.length > 0) {
+                imageData.images.forEach((image) => {
+                    const imageCard = createImageCard(image);
+                    capturedContentArea.appendChild(imageCard);
+                });
+
+                if (imageData.has_more) {
+                    capturedContentArea.appendChild(createLoadMoreButton(imageData.count - offset - imageData.images.length));
                 }
-            } else {
-                capturedContentArea.innerHTML = '<div style="color: #aaa; grid-column: 1 / -1; text-align: center; padding: 20px;">No files found in output folder</div>';
+            } else if (!append) {
+                capturedContentArea.innerHTML = '<div style="color: #aaa; grid-column: 1 / -1; text-align: center; padding: 20px;">No new files to display (all files are uploaded or hidden)</div>';
             }
         } else {
             capturedContentArea.innerHTML = `<div style="color: #d64545; grid-column: 1 / -1; text-align: center; padding: 20px;">Error: ${imageData?.message || 'Failed to load files'}</div>`;
@@ -808,6 +880,28 @@ async function loadOutputImages() {
     }
 }
 
+function createLoadMoreButton(remaining) {
+    const loadMoreBtn = document.createElement('button');
+    loadMoreBtn.id = 'asset-manager-load-more-btn';
+    loadMoreBtn.textContent = `Load more (${remaining} remaining)`;
+    loadMoreBtn.style.cssText = `
+        grid-column: 1 / -1;
+        padding: 8px 15px;
+        background-color: #4a5568;
+        border: none;
+        border-radius: 3px;
+        color: #fff;
+        cursor: pointer;
+        font-size: 12px;
+    `;
+    loadMoreBtn.onclick = () => {
+        loadMoreBtn.disabled = true;
+        loadOutputImages(true);
+    };
+
+    return loadMoreBtn;
+}
+
 function createImageCard(imageInfo) {
     const card = document.createElement('div');
     card.className = 'asset-manager-image-card';
@@ -883,7 +977,10 @@ function createImageCard(imageInfo) {
 
     if (fileType === 'image') {
         previewElement = document.createElement('img');
-        previewElement.src = imageInfo.url || imageInfo.path;
+        // Small cached preview; the full image is only loaded if it fails
+        previewElement.src = imageInfo.thumbnail_url || imageInfo.url || imageInfo.path;
+        previewElement.loading = 'lazy';
+        previewElement.decoding = 'async';
         previewElement.alt = imageInfo.name;
         previewElement.style.cssText = `
             width: 100%;
@@ -893,6 +990,10 @@ function createImageCard(imageInfo) {
         `;
 
         previewElement.onerror = (e) => {
+            if (imageInfo.thumbnail_url && imageInfo.url && previewElement.src.indexOf('/asset-manager/thumbnail') !== -1) {
+                previewElement.src = imageInfo.url;
+                return;
+            }
             console.error('[Asset Manager] Failed to load image:', imageInfo.name, 'url:', previewElement.src, 'error:', e);
             previewElement.style.backgroundColor = '#d64545';
             previewElement.alt = `Failed to load: ${imageInfo.name}`;
@@ -1106,13 +1207,22 @@ function createImageCard(imageInfo) {
     return card;
 }
 
-async function loadOrganizations(apiKey) {
+async function loadOrganizations(apiKey, refresh = false) {
     if (!apiKey) {
         showNotification('error', 'API key is required');
         return;
     }
 
     try {
+        if (refresh) {
+            // Explicit reload: drop cached organizations and projects on the server
+            await api.fetchApi('/asset-manager/invalidate_cache', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ api_key: apiKey })
+            });
+        }
+
         const response = await api.fetchApi(`/asset-manager/get_organizations?api_key=${encodeURIComponent(apiKey)}`, {
             method: "GET",
             headers: { "Content-Type": "application/json" }
@@ -1244,6 +1354,7 @@ function saveSettings() {
     // Save to localStorage or API (to be implemented)
     try {
         localStorage.setItem('asset-manager-settings', JSON.stringify(AssetManagerSystem.settings));
+        syncServerAutoUpload();
         showNotification('success', 'Settings saved successfully!');
 
         // Update auto mode status if available
@@ -1312,6 +1423,7 @@ function saveAssetState() {
             uploadMode: AssetManagerSystem.state.uploadMode
         };
         localStorage.setItem('asset-manager-state', JSON.stringify(state));
+        syncServerAutoUpload();
     } catch (error) {
         console.error('Error saving asset state:', error);
     }
@@ -1395,7 +1507,7 @@ function showAllFiles() {
     const uploadedCount = AssetManagerSystem.state.uploadedAssets.size;
     const hiddenCount = AssetManagerSystem.state.hiddenAssets.size;
 
-    if (uploadedCount === 0 && hiddenCount === 0) {
+    if (uploadedCount === 0 && hiddenCount === 0 && AssetManagerSystem.showUploaded) {
         showNotification('info', 'No hidden or uploaded files to show');
         return;
     }
@@ -1410,6 +1522,7 @@ function showAllFiles() {
     if (confirmReset) {
         AssetManagerSystem.state.uploadedAssets.clear();
         AssetManagerSystem.state.hiddenAssets.clear();
+        AssetManagerSystem.showUploaded = true;
         saveAssetState();
 
         showNotification('success', 'Showing all files');
@@ -1419,133 +1532,188 @@ function showAllFiles() {
     }
 }
 
-// Check for new files and automatically upload them if in automatic mode
-async function checkAndAutoUpload() {
-    // Only proceed if automatic mode is enabled
-    if (AssetManagerSystem.state.uploadMode !== 'automatic') {
-        return;
+function formatBytes(bytes) {
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let value = bytes || 0;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
     }
+    return `${value.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+}
 
-    // Check if we have all required settings
-    const apiKey = AssetManagerSystem.settings.apiKey;
-    const organizationId = AssetManagerSystem.state.selectedOrganization || AssetManagerSystem.settings.organization;
-    const projectId = AssetManagerSystem.state.selectedProject;
+function formatDuration(seconds) {
+    if (seconds === null || seconds === undefined) {
+        return '';
+    }
+    const total = Math.round(seconds);
+    const minutes = Math.floor(total / 60);
+    return minutes > 0 ? `${minutes}m ${total % 60}s` : `${total}s`;
+}
 
-    if (!apiKey || !organizationId || !projectId) {
-        return;
+// Short progress text for upload buttons, e.g. "Uploading 45% · 12.3 MB/s · 1m 20s left"
+function formatUploadProgress(progress) {
+    if (!progress || !progress.bytes_total) {
+        return 'Uploading...';
+    }
+    const percent = Math.min(100, Math.floor(100 * progress.bytes_sent / progress.bytes_total));
+    let text = `Uploading ${percent}%`;
+    if (progress.throughput) {
+        text += ` · ${formatBytes(progress.throughput)}/s`;
     }
+    if (progress.eta_seconds) {
+        text += ` · ${formatDuration(progress.eta_seconds)} left`;
+    }
+    return text;
+}
 
-    try {
-        // Get current files from output folder
-        const response = await api.fetchApi("/asset-manager/get_output_images", {
+// Wait for a queued upload job to finish and return its result
+async function waitForUploadJob(jobId, pollInterval = 1000, onProgress = null) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, pollInterval));
+
+        const response = await api.fetchApi(`/asset-manager/upload_jobs/${encodeURIComponent(jobId)}`, {
             method: "GET",
             headers: { "Content-Type": "application/json" }
         });
 
-        let imageData;
+        let jobData;
         if (response instanceof Response) {
-            imageData = await response.json();
+            jobData = await response.json();
         } else {
-            imageData = response;
+            jobData = response;
         }
 
-        if (imageData && imageData.status === 'success' && imageData.images) {
-            const newFiles = [];
+        if (!jobData || jobData.status !== 'success') {
+            return { status: 'error', message: jobData?.message || 'Upload job not found' };
+        }
 
-            // Check for new files
-            imageData.images.forEach(image => {
-                if (!AssetManagerSystem.state.knownFiles.has(image.path) &&
-                    !AssetManagerSystem.state.uploadedAssets.has(image.path) &&
-                    !AssetManagerSystem.state.hiddenAssets.has(image.path)) {
-                    newFiles.push(image);
-                    AssetManagerSystem.state.knownFiles.add(image.path);
-                }
-            });
+        const job = jobData.job;
+        if (['success', 'partial', 'error', 'cancelled'].includes(job.status)) {
+            return job.result || { status: job.status, message: `Upload ${job.status}` };
+        }
 
-            // Upload new files
-            if (newFiles.length > 0) {
-                showNotification('info', `Auto-uploading ${newFiles.length} new file(s)...`);
+        if (onProgress && job.progress) {
+            onProgress(job.progress);
+        }
+    }
+}
 
-                // Get current workflow JSON
-                let workflowJson = null;
-                try {
-                    const graph = await app.graphToPrompt();
-                    workflowJson = graph["output"];
-                } catch (error) {
-                    console.warn('Failed to get workflow JSON:', error);
-                }
+// Submit an upload request and wait for the background job to finish
+// onProgress receives progress snapshots pushed over the websocket while the job runs
+async function submitUpload(body, onProgress = null) {
+    const response = await api.fetchApi('/asset-manager/upload_assets', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
 
-                // Upload files
-                const response = await api.fetchApi('/asset-manager/upload_assets', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        assets: newFiles.map(f => f.path),
-                        project_id: projectId,
-                        folder_id: projectId,
-                        organization_id: organizationId,
-                        api_key: apiKey,
-                        metadata: {
-                            automatic_upload: true,
-                            count: newFiles.length,
-                            workflow: workflowJson
-                        }
-                    })
-                });
+    let result;
+    if (response instanceof Response) {
+        result = await response.json();
+    } else {
+        result = response;
+    }
 
-                let result;
-                if (response instanceof Response) {
-                    result = await response.json();
-                } else {
-                    result = response;
-                }
+    if (result && result.status === 'queued' && result.job_id) {
+        const handleProgress = (event) => {
+            if (onProgress && event.detail && event.detail.job_id === result.job_id) {
+                onProgress(event.detail);
+            }
+        };
 
-                if (result.status === 'success' || result.status === 'partial') {
-                    // Mark files as uploaded
-                    newFiles.forEach(file => {
-                        AssetManagerSystem.state.uploadedAssets.add(file.path);
-                    });
-                    saveAssetState();
+        api.addEventListener('asset-manager.upload_progress', handleProgress);
+        try {
+            // Polling stays as a fallback when websocket events are not delivered
+            return await waitForUploadJob(result.job_id, 2000, onProgress);
+        } finally {
+            api.removeEventListener('asset-manager.upload_progress', handleProgress);
+        }
+    }
 
-                    showNotification('success', `Auto-uploaded ${newFiles.length} file(s)`);
+    return result;
+}
 
-                    // Refresh the UI if modal is open
-                    const modal = document.getElementById('asset-manager-modal-overlay');
-                    if (modal && modal.style.display === 'flex') {
-                        loadOutputImages();
-                    }
-                } else {
-                    showNotification('error', 'Automatic upload failed');
-                }
-            }
-        }
-    } catch (error) {
-        // Silent fail for auto-upload
+function setUploadButtonProgress(button, progress) {
+    const label = button && button.querySelector('.asset-manager-upload-progress');
+    if (label) {
+        label.textContent = formatUploadProgress(progress);
     }
 }
 
-// Initialize known files list
-async function initializeKnownFiles() {
+function getAutoUploadConfig() {
+    return {
+        auto_upload: AssetManagerSystem.state.uploadMode === 'automatic',
+        api_key: AssetManagerSystem.settings.apiKey,
+        organization_id: AssetManagerSystem.state.selectedOrganization || AssetManagerSystem.settings.organization,
+        project_id: AssetManagerSystem.state.selectedProject
+    };
+}
+
+// Push automatic upload configuration to the server-side output watcher
+async function syncServerAutoUpload() {
+    const config = getAutoUploadConfig();
+    const configKey = JSON.stringify(config);
+    if (configKey === AssetManagerSystem.lastServerSync) {
+        return;
+    }
+
+    // Never clear an API key configured on the server from a browser without one
+    if (!config.api_key) {
+        delete config.api_key;
+    }
+
     try {
-        const response = await api.fetchApi("/asset-manager/get_output_images", {
-            method: "GET",
-            headers: { "Content-Type": "application/json" }
+        const response = await api.fetchApi('/asset-manager/auto_upload_settings', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(config)
         });
 
-        let imageData;
+        let result;
         if (response instanceof Response) {
-            imageData = await response.json();
+            result = await response.json();
         } else {
-            imageData = response;
+            result = response;
         }
 
-        if (imageData && imageData.status === 'success' && imageData.images) {
-            imageData.images.forEach(image => {
-                AssetManagerSystem.state.knownFiles.add(image.path);
-            });
+        if (result && result.status === 'success') {
+            AssetManagerSystem.lastServerSync = configKey;
+        } else {
+            console.error('[Asset Manager] Failed to update automatic upload settings:', result?.message);
         }
     } catch (error) {
-        // Silent fail
+        console.error('[Asset Manager] Failed to update automatic upload settings:', error);
+    }
+}
+
+// Handle uploads finished on the server (automatic uploads and manual jobs)
+function handleUploadFinished(event) {
+    const { automatic, result } = event.detail || {};
+    if (!automatic || !result) {
+        return;
+    }
+
+    const files = result.files || [];
+    const failedFiles = files.filter(file => file.status === 'error');
+    files.forEach(file => {
+        if (file.status === 'success' || file.status === 'skipped') {
+            AssetManagerSystem.state.uploadedAssets.add(file.file);
+        }
+    });
+    saveAssetState();
+
+    if (failedFiles.length > 0) {
+        showNotification('error', `Auto-upload failed for ${failedFiles.length} of ${files.length} file(s)`);
+    } else if (result.successful > 0) {
+        showNotification('success', `Auto-uploaded ${result.successful} file(s)`);
+    }
+
+    // Refresh the UI if modal is open
+    const modal = document.getElementById('asset-manager-modal-overlay');
+    if (modal && modal.style.display === 'flex') {
+        loadOutputImages();
     }
 }
 
@@ -1604,7 +1772,7 @@ async function uploadSingleImage(imageInfo, cardElement, buttonElement) {
         buttonElement.innerHTML = `
             <div style="display: inline-flex; align-items: center; gap: 5px;">
                 <div class="asset-manager-spinner"></div>
-                <span>Uploading...</span>
+                <span class="asset-manager-upload-progress">Uploading...</span>
             </div>
         `;
 
@@ -1632,30 +1800,19 @@ async function uploadSingleImage(imageInfo, cardElement, buttonElement) {
 
     try {
         // Call upload API
-        const response = await api.fetchApi('/asset-manager/upload_assets', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                assets: [imageInfo.path],
-                project_id: projectId,
-                folder_id: projectId, // Using project_id as folder_id for now
-                organization_id: organizationId,
-                api_key: apiKey,
-                metadata: {
-                    filename: imageInfo.name,
-                    size: imageInfo.size,
-                    modified: imageInfo.modified,
-                    workflow: workflowJson
-                }
-            })
-        });
-
-        let result;
-        if (response instanceof Response) {
-            result = await response.json();
-        } else {
-            result = response;
-        }
+        const result = await submitUpload({
+            assets: [imageInfo.path],
+            project_id: projectId,
+            folder_id: projectId, // Using project_id as folder_id for now
+            organization_id: organizationId,
+            api_key: apiKey,
+            metadata: {
+                filename: imageInfo.name,
+                size: imageInfo.size,
+                modified: imageInfo.modified,
+                workflow: workflowJson
+            }
+        }, progress => setUploadButtonProgress(buttonElement, progress));
 
         if (result.status === 'success' || result.status === 'partial') {
             showNotification('success', result.message || `Uploaded ${imageInfo.name}`);
@@ -1833,36 +1990,25 @@ async function bulkUploadSelected() {
         bulkUploadBtn.innerHTML = `
             <div style="display: inline-flex; align-items: center; gap: 5px;">
                 <div class="asset-manager-spinner"></div>
-                <span>Uploading...</span>
+                <span class="asset-manager-upload-progress">Uploading...</span>
             </div>
         `;
     }
 
     try {
         // Call bulk upload API
-        const response = await api.fetchApi('/asset-manager/upload_assets', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                assets: selectedImages.map(img => img.path),
-                project_id: projectId,
-                folder_id: projectId, // Using project_id as folder_id for now
-                organization_id: organizationId,
-                api_key: apiKey,
-                metadata: {
-                    bulk_upload: true,
-                    count: selectedImages.length,
-                    workflow: workflowJson
-                }
-            })
-        });
-
-        let result;
-        if (response instanceof Response) {
-            result = await response.json();
-        } else {
-            result = response;
-        }
+        const result = await submitUpload({
+            assets: selectedImages.map(img => img.path),
+            project_id: projectId,
+            folder_id: projectId, // Using project_id as folder_id for now
+            organization_id: organizationId,
+            api_key: apiKey,
+            metadata: {
+                bulk_upload: true,
+                count: selectedImages.length,
+                workflow: workflowJson
+            }
+        }, progress => setUploadButtonProgress(bulkUploadBtn, progress));
 
         if (result.status === 'success' || result.status === 'partial') {
             showNotification('success', result.message || `Successfully uploaded ${selectedImages.length} files`);
@@ -1931,33 +2077,20 @@ async function showAssetManagerModal() {
     loadOutputImages();
 }
 
-// Setup automatic upload listeners
+// Setup automatic upload: new outputs are detected and uploaded by the server,
+// the browser only configures it and shows the results
 function setupAutomaticUpload() {
-    // Initialize known files
-    initializeKnownFiles();
-
-    // Listen to execution events
-    api.addEventListener("executed", (event) => {
-        // Debounce automatic uploads (wait 2 seconds after last execution)
-        if (AssetManagerSystem.automaticUploadTimeout) {
-            clearTimeout(AssetManagerSystem.automaticUploadTimeout);
-        }
-
-        AssetManagerSystem.automaticUploadTimeout = setTimeout(() => {
-            checkAndAutoUpload();
-        }, 2000); // Wait 2 seconds after execution completes
-    });
+    loadSettings();
 
-    // Also listen for execution_success event if available
-    api.addEventListener("execution_success", () => {
-        if (AssetManagerSystem.automaticUploadTimeout) {
-            clearTimeout(AssetManagerSystem.automaticUploadTimeout);
-        }
+    // Only push on load when this browser has automatic mode enabled, so a
+    // tab in manual mode does not overwrite a headless configuration
+    if (AssetManagerSystem.state.uploadMode === 'automatic') {
+        syncServerAutoUpload();
+    } else {
+        AssetManagerSystem.lastServerSync = JSON.stringify(getAutoUploadConfig());
+    }
 
-        AssetManagerSystem.automaticUploadTimeout = setTimeout(() => {
-            checkAndAutoUpload();
-        }, 2000);
-    });
+    api.addEventListener("asset-manager.upload_finished", handleUploadFinished);
 }
 
 // Initialize the extension